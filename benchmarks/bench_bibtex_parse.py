@@ -0,0 +1,69 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+#
+# Parses a synthetic BibTeX file with an increasing number of worker processes, as BibTeXImporter does, and checks
+# that the records come out the same whatever the number of workers.
+import pathlib
+import sys
+
+# Run as a script, only the benchmarks directory is importable; the package lives one level up
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from scistash.bibtex.parser import iterchunks, parsechunk
+from concurrent.futures import ProcessPoolExecutor
+import tempfile
+import time
+import os
+
+ENTRIES = 100000
+
+
+def records(path, workers):
+    with open(path, 'rb') as stream:
+        chunks = list(iterchunks(stream))
+
+    if workers == 1:
+        return [r for text, macros, _ in chunks for r in parsechunk(text, macros)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = pool.map(parsechunk, [c[0] for c in chunks], [c[1] for c in chunks])
+        return [r for part in parsed for r in part]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'bench.bib'
+
+        with path.open('w') as f:
+            f.write('@string{jphys = "Journal of Physics"}\n\n')
+
+            for i in range(ENTRIES):
+                f.write(f'@article{{key{i},\n  author = {{Last{i % 7919}, First and von Other, A. B. and {{Some '
+                        f'Consortium}}}},\n  title = {{On the {{Theory}} of Item {i}}},\n  journal = jphys # " A",\n'
+                        f'  year = {1950 + i % 70}, volume = {{{i % 90}}}, number = "{i % 12}",\n'
+                        f'  pages = {{{i}--{i + 12}}}\n}}\n\n')
+
+        size = path.stat().st_size / 2**20
+        baseline = None
+        reference = None
+
+        print(f'{ENTRIES} entries, {size:.1f} MB')
+
+        for workers in sorted({1, 2, 4, 8, os.cpu_count()}):
+            t0 = time.perf_counter()
+            parsed = records(path, workers)
+            elapsed = time.perf_counter() - t0
+
+            baseline = baseline or elapsed
+            reference = reference or parsed
+            print(f'    {workers} worker(s): {elapsed:.3f} s ({size / elapsed:.1f} MB/s, {baseline / elapsed:.2f}x)'
+                  f'{"" if parsed == reference else "  RECORDS DIFFER"}')
+
+
+if __name__ == '__main__':
+    main()
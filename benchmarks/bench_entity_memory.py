@@ -0,0 +1,117 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+#
+# Bytes per entity object before and after slotted entities. The entities of an earlier revision (by default, the one
+# right before __slots__ was introduced) are extracted from git and measured in a separate interpreter next to the
+# current ones. Field values are created before measuring, so only the objects themselves (and their ids) count.
+# Ids are created on first use since they became lazy, so every id is read before the objects are compared; the size
+# the current objects have before that is reported on its own.
+#
+#     python benchmarks/bench_entity_memory.py [REVISION]
+from pathlib import Path
+import subprocess
+import tempfile
+import tarfile
+import sys
+import io
+
+COUNT = 100000
+
+MEASURE = '''
+import tracemalloc, pathlib, uuid, sys
+from scistash.entities.author import Author
+from scistash.entities.article import Article
+from scistash.entities.annotation import Annotation
+from scistash.entities.tag import Tag
+from scistash.entities.reference import Reference
+from scistash.entities.rfile import RefFile
+
+n = int(sys.argv[1])
+owner = uuid.uuid4()
+path = pathlib.Path('paper.pdf')
+texts = [f'text-{i}' for i in range(n)]
+refs = [uuid.uuid4() for _ in range(n)]
+blob = b'%PDF'
+makers = {
+    'Author': lambda i: Author(texts[i], 'Last', False),
+    'Article': lambda i: Article(texts[i], [], 'Title', 2000, 'Journal', 1, 2, (3, 4)),
+    'Annotation': lambda i: Annotation(owner, 'article', texts[i], 'info', False),
+    'Tag': lambda i: Tag(owner, 'article', texts[i], False),
+    'Reference': lambda i: Reference(owner, 'article', refs[i], False),
+    'RefFile': lambda i: RefFile(owner, 'article', path, 'pdf', texts[i], 4, blob, False),
+}
+
+for name, make in makers.items():
+    try:
+        make(0)
+    except Exception as e:
+        print(name, 'n/a')
+        continue
+
+    tracemalloc.start()
+    objs = [make(i) for i in range(n)]
+    untouched = tracemalloc.get_traced_memory()[0]
+
+    for obj in objs:
+        obj.id
+
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list holding the objects is not part of them
+    print(name, (size - sys.getsizeof(objs)) / n, (untouched - sys.getsizeof(objs)) / n)
+    del objs
+'''
+
+
+def git(root, *args):
+    return subprocess.run(['git', '-C', str(root), *args], check=True, capture_output=True).stdout
+
+
+def measure(root):
+    out = subprocess.run([sys.executable, '-c', MEASURE, str(COUNT)], cwd=root, check=True, capture_output=True,
+                         text=True, env={'PYTHONPATH': str(root)}).stdout
+    sizes = {}
+
+    for line in out.splitlines():
+        name, *size = line.split()
+        sizes[name] = None if size == ['n/a'] else [float(x) for x in size]
+
+    return sizes
+
+
+def main():
+    root = Path(__file__).resolve().parent.parent
+
+    if len(sys.argv) > 1:
+        before = sys.argv[1]
+    else:
+        introduced = git(root, 'log', '--format=%H', '-S__slots__', '--', 'scistash/entities/identifiable.py')
+        before = (introduced.split() or [b'HEAD'])[-1].decode() + '^'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with tarfile.open(fileobj=io.BytesIO(git(root, 'archive', before, 'scistash'))) as tar:
+            tar.extractall(tmp)
+
+        old = measure(tmp)
+
+    new = measure(root)
+
+    print(f'{COUNT} objects per type, bytes per object with its id (before: {before}), and after while no id is read')
+    print(f'    {"entity":<12} {"before":>10} {"after":>10} {"saved":>8} {"no ids":>10}')
+
+    for name, (after, untouched) in new.items():
+        prior = old.get(name)
+
+        if prior is None:
+            print(f'    {name:<12} {"n/a":>10} {after:>10.0f} {"":>8} {untouched:>10.0f}')
+        else:
+            print(f'    {name:<12} {prior[0]:>10.0f} {after:>10.0f} {1 - after / prior[0]:>8.0%} {untouched:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+#
+# Completion latency per keystroke over synthetic article labels. Every prefix of each query is searched, as typing it
+# at the prompt would, first through LabelIndex and then, on a smaller vocabulary, with fuzzyfinder over every label as
+# StashCompleter does. Building the index, and saving and deleting single objects once it is built, are timed too.
+#
+# The first keystroke of a session is timed apart, on a stash of STASH articles: once with the index built on first
+# use, and once prepared in the background as the session starts, typing at a steady pace until it is ready.
+#
+#     python benchmarks/bench_label_completion.py [ENTRIES [STASH]]
+import pathlib
+import sys
+
+# Run as a script, only the benchmarks directory is importable; the package lives one level up
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from scistash.database.labelindex import LabelIndex
+from scistash.database.sqlitedb import SQLiteHandler
+from scistash.entities.article import Article
+from scistash.entities.author import Author
+from fuzzyfinder import fuzzyfinder
+import contextlib
+import itertools
+import tempfile
+import resource
+import random
+import time
+import uuid
+
+ENTRIES = 1000000
+STASH = 100000
+FUZZY = 10000
+LIMIT = 20
+UPDATES = 2000
+PACE = 0.1
+
+random.seed(2019)
+SYLLABLES = ['an', 'ber', 'co', 'da', 'el', 'fon', 'gu', 'ha', 'is', 'jo', 'ka', 'lo', 'mar', 'ne', 'or', 'pe', 'qui',
+             'ro', 'san', 'te', 'u', 'vi', 'wa', 'xe', 'yo', 'zu']
+NAMES = sorted({''.join(random.choices(SYLLABLES, k=random.randint(2, 4))).capitalize() for _ in range(60000)})
+WORDS = sorted({''.join(random.choices(SYLLABLES, k=random.randint(1, 5))) for _ in range(30000)})
+CUMULATIVE = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(WORDS))))
+
+
+def labels(count):
+    for _ in range(count):
+        oid = uuid.UUID(int=random.getrandbits(128), version=4)
+        authors = random.sample(NAMES, random.randint(1, 4))
+        year = random.randint(1950, 2019)
+        title = ' '.join(random.choices(WORDS, cum_weights=CUMULATIVE, k=random.randint(4, 12))).capitalize()
+        label = '\t{0}\t \t{1}. {2}. {3}. {4}({5}: {6}--{7})'.format(oid, year, ' ,'.join(authors), title,
+                                                                     random.randint(1, 80), random.randint(1, 12),
+                                                                     1, 20)
+        yield oid, label, f'{authors[0].lower()}{year}{title.split()[0].lower()}'
+
+
+def keystrokes(queries):
+    return [query[:n] for query in queries for n in range(1, len(query) + 1)]
+
+
+def summary(name, seconds):
+    seconds = sorted(seconds)
+
+    def at(p):
+        return seconds[min(len(seconds) - 1, int(p * len(seconds)))] * 1000
+
+    print(f'    {name:<28} {len(seconds):>6} {at(0.5):>9.3f} {at(0.99):>9.3f} {at(1.0):>9.3f}')
+
+
+def timed(function, arguments):
+    seconds = []
+
+    for argument in arguments:
+        started = time.perf_counter()
+        function(argument)
+        seconds.append(time.perf_counter() - started)
+
+    return seconds
+
+
+# Articles are written through the handler, so that the search index used while preparing is filled as usual
+def makestash(path, count):
+    handler = SQLiteHandler(str(path), False, True)
+
+    def articles():
+        for n in range(count):
+            authors = [Author(name[0] + '.', name, False) for name in random.sample(NAMES, random.randint(1, 4))]
+            title = ' '.join(random.choices(WORDS, cum_weights=CUMULATIVE, k=random.randint(4, 12))).capitalize()
+            yield Article(f'{authors[0].lastname.lower()}{n}', authors, title, random.randint(1950, 2019), 'Journal',
+                          random.randint(1, 80), random.randint(1, 12), (1, 20))
+
+    handler.savemany(articles(), {})
+    handler.close()
+
+
+def cold(path, queries):
+    with contextlib.redirect_stdout(None):
+        handler = SQLiteHandler(str(path), False, False)
+
+    first = timed(lambda text: handler.contexthash().complete(text, LIMIT), keystrokes(queries)[:1])
+    summary('first keystroke, built on use', first)
+
+    with contextlib.redirect_stdout(None):
+        handler.close()
+        handler = SQLiteHandler(str(path), False, False)
+
+    cntxhash = handler.contexthash()
+    texts = itertools.cycle(keystrokes(queries))
+    seconds = []
+    started = time.perf_counter()
+    cntxhash.prepare()
+
+    while not cntxhash.ready:
+        seconds.extend(timed(lambda text: cntxhash.complete(text, LIMIT), [next(texts)]))
+        time.sleep(PACE)
+
+    prepared = time.perf_counter() - started
+    summary('keystroke while preparing', seconds)
+    summary('keystroke once prepared', timed(lambda text: cntxhash.complete(text, LIMIT), keystrokes(queries)))
+
+    with contextlib.redirect_stdout(None):
+        handler.close()
+
+    return prepared
+
+
+def main(entries=ENTRIES, articles=STASH):
+    entries = list(labels(entries))
+    queries = [str(entries[7][0])[:13], entries[11][2], NAMES[3].lower(), f'{NAMES[5]} {WORDS[40]}', WORDS[0],
+               f'{WORDS[1]} {WORDS[2]} 2001', 'xyzzy']
+
+    index = LabelIndex()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index.update(entries)
+    built = time.perf_counter() - started
+    grown = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024
+
+    print(f'{len(entries)} labels indexed in {built:.1f} s, peak resident set grew by {grown:.0f} MiB')
+    print(f'    {"operation":<28} {"count":>6} {"p50 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+    summary('keystroke, index', timed(lambda text: index.search(text, LIMIT), keystrokes(queries)))
+
+    fresh = list(labels(UPDATES))
+    summary('save new object', timed(lambda e: index.add(*e), fresh))
+    summary('save changed object', timed(lambda e: index.add(e[0], e[1] + ' revised', e[2]), fresh))
+    summary('keystroke after saves', timed(lambda text: index.search(text, LIMIT), keystrokes(queries)))
+    summary('delete object', timed(lambda e: index.remove(e[0]), fresh))
+
+    vocabulary = [label for _, label, _ in entries[:FUZZY]]
+    summary(f'keystroke, fuzzyfinder {FUZZY // 1000}k',
+            timed(lambda text: list(fuzzyfinder(text, vocabulary))[:LIMIT], keystrokes(queries[:3])))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / 'stash.db'
+        started = time.perf_counter()
+
+        with contextlib.redirect_stdout(None):
+            makestash(path, articles)
+
+        print(f'{articles} articles stashed in {time.perf_counter() - started:.1f} s')
+        print(f'    {"operation":<28} {"count":>6} {"p50 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+        prepared = cold(path, [NAMES[3].lower(), f'{NAMES[5]} {WORDS[40]}', WORDS[0], 'xyzzy'])
+        print(f'index ready {prepared:.1f} s after the session started')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
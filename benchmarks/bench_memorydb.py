@@ -0,0 +1,60 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+#
+# Stages a large number of objects in the in-memory stash and reports the cost per operation for successive
+# slices. With an id-keyed index per type, the cost per put, fetch and scratch must remain flat as the stash grows.
+import pathlib
+import sys
+
+# Run as a script, only the benchmarks directory is importable; the package lives one level up
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from scistash.database.memorydb import MemoryDBHandler
+from scistash.entities.tag import Tag
+import contextlib
+import time
+import uuid
+import io
+
+TOTAL = 100000
+SLICE = 10000
+
+
+def main():
+    mdb = MemoryDBHandler()
+    fhash = {}
+    owner = uuid.uuid4()
+    tags = [Tag(owner, 'article', f'tag-{i}', False) for i in range(TOTAL)]
+
+    print(f'{"staged":>10} {"put us/op":>12} {"fetch us/op":>12}')
+
+    for start in range(0, TOTAL, SLICE):
+        batch = tags[start:start + SLICE]
+
+        t0 = time.perf_counter()
+        for tag in batch:
+            mdb.put(tag, fhash)
+        t1 = time.perf_counter()
+        for tag in batch:
+            mdb.exists_fetch(tag.id, Tag)
+        t2 = time.perf_counter()
+
+        print(f'{start + SLICE:>10} {1e6 * (t1 - t0) / SLICE:>12.3f} {1e6 * (t2 - t1) / SLICE:>12.3f}')
+
+    # Scratching reports every object; keep that chatter out of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        for tag in tags:
+            mdb.scratch_fetch(tag.id, Tag, fhash)
+        t1 = time.perf_counter()
+
+    print(f'scratch: {1e6 * (t1 - t0) / TOTAL:.3f} us/op over {TOTAL} objects')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+#
+# Read latency while a bulk save is in progress. The stash starts with PRELOAD articles; a writer then inserts articles
+# in batches, committing after each one, while reader threads aggregate the articles table every PAUSE seconds, as
+# interactive queries would. This is run once with plain connections and the default rollback journal, and once per
+# profile through ConnectionManager, with readers from its pool. Under a rollback journal, reads that gave up waiting
+# for a commit are counted as locked. Under write-ahead logging, commits force a checkpoint whenever the log has grown
+# past the journal size limit of the profile; the size of the log at the end shows how far readers kept checkpoints
+# from completing.
+#
+#     python benchmarks/bench_sqlite_concurrency.py [PROFILE...]
+import pathlib
+import sys
+
+# Run as a script, only the benchmarks directory is importable; the package lives one level up
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from scistash.database.connections import ConnectionManager, profiles
+from scistash.database.sqlitedb import SQLiteHandler
+import contextlib
+import threading
+import tempfile
+import sqlite3
+import time
+import uuid
+import io
+
+PRELOAD = 50000
+BATCHES = 200
+BATCHSIZE = 1000
+READERS = 4
+PAUSE = 0.05
+
+INSERT = 'INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+QUERY = 'SELECT year, count(*) FROM articles GROUP BY year'
+
+
+def rows(batch, size=BATCHSIZE):
+    return [(str(uuid.uuid4()), f'key{batch}-{i}', 1900 + i % 120, f'Title {i}', 'Journal', i % 50, i % 12, 1, 10, 0)
+            for i in range(size)]
+
+
+def stash(directory, name):
+    path = pathlib.Path(directory) / name
+
+    # The structure is that of a real stash; only the handler's output is silenced
+    with contextlib.redirect_stdout(io.StringIO()):
+        SQLiteHandler(str(path), False, True).close()
+
+    # Start every run from the same contents and journaling mode
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = DELETE')
+    conn.executemany(INSERT, rows('preload', PRELOAD))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def run(writer, acquire, release, commit=None):
+    commit = commit or writer.commit
+    # Rows are made up front, so that the writer only measures the stash
+    batches = [rows(batch) for batch in range(BATCHES)]
+    done = threading.Event()
+    latencies = [[] for _ in range(READERS)]
+    locked = [0] * READERS
+
+    # Under a rollback journal, a reader gives up once a commit has kept it out for longer than its busy timeout
+    def read(n):
+        while not done.is_set():
+            conn = acquire()
+            started = time.perf_counter()
+
+            try:
+                conn.execute(QUERY).fetchall()
+                latencies[n].append(time.perf_counter() - started)
+            except sqlite3.OperationalError:
+                locked[n] += 1
+
+            release(conn)
+            done.wait(PAUSE)
+
+    threads = [threading.Thread(target=read, args=(n,)) for n in range(READERS)]
+
+    for t in threads:
+        t.start()
+
+    started = time.perf_counter()
+
+    for batch in batches:
+        writer.executemany(INSERT, batch)
+        commit()
+
+    written = time.perf_counter() - started
+    done.set()
+
+    for t in threads:
+        t.join()
+
+    return written, sorted(x for mine in latencies for x in mine), sum(locked)
+
+
+def report(name, path, written, latencies, locked):
+    wal = pathlib.Path(str(path) + '-wal')
+    size = wal.stat().st_size / 2 ** 20 if wal.exists() else 0
+
+    def at(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else float('nan')
+
+    print(f'    {name:<16} {written:>8.2f} {len(latencies):>8} {len(latencies) / written:>9.1f} '
+          f'{at(0.5):>8.1f} {at(0.99):>8.1f} {at(1.0):>8.1f} {locked:>8} {size:>8.1f}')
+
+
+def main(names=None):
+    names = names or ['default', 'wal']
+
+    print(f'{PRELOAD} articles, then {BATCHES} batches of {BATCHSIZE} articles, {READERS} reader threads')
+    print(f'    {"mode":<16} {"write s":>8} {"reads":>8} {"reads/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"max ms":>8} '
+          f'{"locked":>8} {"wal MiB":>8}')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Baseline: one connection per client, rollback journal
+        path = stash(tmp, 'baseline.db')
+        writer = sqlite3.connect(path, check_same_thread=False)
+        report('rollback journal', path, *run(writer, lambda: sqlite3.connect(path), lambda conn: conn.close()))
+        writer.close()
+
+        for profile in names:
+            path = stash(tmp, f'{profile}.db')
+            manager = ConnectionManager(path, profile, readers=READERS)
+            results = run(manager.writer, lambda: manager.acquire(own=True), manager.release, manager.commit)
+            report(f'{profile} ({profiles[profile]["journal_mode"].lower()})', path, *results)
+            manager.close()
+
+
+if __name__ == '__main__':
+    main([p for p in sys.argv[1:] if p in profiles])
@@ -0,0 +1,68 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+#
+# Compares existence lookups built as formatted SQL text (the former behaviour of SQLiteHandler.exists_fetch) against
+# the bound, cached statements now used by the handler.
+import pathlib
+import sys
+
+# Run as a script, only the benchmarks directory is importable; the package lives one level up
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from scistash.database.sqlitedb import SQLiteHandler
+from scistash.entities.author import Author
+import contextlib
+import tempfile
+import sqlite3
+import time
+import uuid
+import io
+
+CALLS = 50000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = str(pathlib.Path(tmp) / 'bench.stash')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler = SQLiteHandler(db, False, True)
+            handler.close()
+
+        ids = [uuid.uuid4() for _ in range(CALLS)]
+        conn = sqlite3.connect(db)
+        conn.executemany('INSERT INTO authors VALUES (?, ?, ?)', ((str(i), 'First', 'Last') for i in ids))
+        conn.commit()
+
+        # Before: a new statement text per call, parsed and planned every time
+        t0 = time.perf_counter()
+        for oid in ids:
+            conn.execute(f'SELECT uuid FROM authors WHERE uuid=\"{oid}\"').fetchone()
+        before = time.perf_counter() - t0
+        conn.close()
+
+        # After: the handler binds the identifier to a single cached statement
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler = SQLiteHandler(db, False, False)
+
+        t0 = time.perf_counter()
+        for oid in ids:
+            handler.exists_fetch(oid, Author)
+        after = time.perf_counter() - t0
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler.close()
+
+    print(f'{CALLS} exists_fetch calls')
+    print(f'    formatted SQL: {before:.3f} s ({1e6 * before / CALLS:.2f} us/call)')
+    print(f'    bound SQL:     {after:.3f} s ({1e6 * after / CALLS:.2f} us/call)')
+    print(f'    speedup:       {before / after:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
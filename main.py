@@ -5,18 +5,39 @@
 #
 # This software is intended for personal use and does not imply any guarantees
 # in functionality or performance.
+import time
+
+# Taken before anything else is imported, so that --timings accounts for imports too
+started = time.perf_counter()
+
 import click
+import sys
 from scistash.repl.loop import ReplHandler
+from scistash.repl.timings import PhaseTimer
+from scistash.database.connections import profiles
 
 
 @click.command()
 @click.argument('db', nargs=1)
 @click.option('--dryrun', default=False, help='Perform all operations in memory without altering the database.')
 @click.option('--create', default=False, help='Create a new database from scratch.')
-@click.option('--memquota', default=0, help='Set memory quota to avoid loading excessively large files.')
-def main(db, dryrun, create, memquota):
-    rh = ReplHandler(db, dryrun, create, memquota)
-    rh.run()
+@click.option('--memquota', default=0, help='Memory quota in MB for pending objects; beyond it they spill to disk (0 disables it).')
+@click.option('--labelcap', default=0,
+              help='Maximum number of object labels kept in memory for completion (0 for all). The completion index '
+                   'itself holds the words of every object regardless; pending show reports its size.')
+@click.option('--profile', default='default', type=click.Choice(sorted(profiles)),
+              help='SQLite tuning profile: journal mode and sync, cache, memory-mapped I/O and temporary storage.')
+@click.option('--script', default=None, type=click.File('r'),
+              help='Run the commands in a file (- for standard input) as one transaction instead of prompting.')
+@click.option('--timings', is_flag=True, default=False,
+              help='Report the time spent importing, connecting, building hashes and reaching the first prompt.')
+def main(db, dryrun, create, memquota, labelcap, profile, script, timings):
+    rh = ReplHandler(db, dryrun, create, memquota, labelcap, profile, PhaseTimer(timings, started))
+
+    if script is None:
+        rh.run()
+    else:
+        sys.exit(0 if rh.runscript(script) else 1)
 
 
 if __name__ == "__main__":
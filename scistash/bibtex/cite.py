@@ -0,0 +1,76 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+#
+# Citation formatters. They work on plain article rows, as stored in the articles table, together with the names of
+# the authors as (first, last) pairs, so that they can format what comes straight out of the stash without building
+# entities first.
+import re
+
+_special = re.compile(r'([&%$#])')
+
+
+def _escape(text: str):
+    return _special.sub(r'\\\1', text)
+
+
+def _initials(first: str):
+    # 'Jean-Paul A.' becomes 'J.-P. A.'
+    return ' '.join('-'.join(part[0] + '.' for part in word.split('-') if part)
+                    for word in first.replace('.', ' ').split())
+
+
+def _apaname(first: str, last: str):
+    initials = _initials(first)
+    return f'{last}, {initials}' if initials else last
+
+
+def tobibtex(row, names):
+    _, refkey, year, title, journal, volume, number, pstart, pend, retracted = row
+    fields = [('author', ' and '.join(f'{last}, {first}' if first else f'{{{last}}}' for first, last in names)),
+              ('title', '{' + _escape(title) + '}'),
+              ('journal', _escape(journal)),
+              ('year', year),
+              ('volume', volume),
+              ('number', number),
+              ('pages', f'{pstart}--{pend}' if pend and pend != pstart else pstart),
+              ('note', 'Retracted' if retracted else '')]
+
+    body = ',\n'.join(f'  {name} = {{{value}}}' for name, value in fields if value)
+    return f'@article{{{refkey},\n{body}\n}}\n'
+
+
+def toapa(row, names):
+    _, refkey, year, title, journal, volume, number, pstart, pend, retracted = row
+    authors = [_apaname(first, last) for first, last in names]
+
+    if len(authors) > 1:
+        authors = ', '.join(authors[:-1]) + ', & ' + authors[-1]
+    else:
+        authors = ''.join(authors)
+
+    parts = [f'{authors} ({year if year else "n.d."}).'.strip(),
+             title.rstrip('.') + ('. [Retracted].' if retracted else '.')]
+
+    if journal:
+        source = journal
+
+        if volume:
+            source += f', {volume}' + (f'({number})' if number else '')
+
+        if pstart:
+            source += f', {pstart}' + (f'–{pend}' if pend and pend != pstart else '')
+
+        parts.append(source + '.')
+
+    return ' '.join(parts) + '\n'
+
+
+formatters = {
+    'bibtex': tobibtex,
+    'apa': toapa
+}
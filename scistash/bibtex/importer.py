@@ -0,0 +1,153 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.bibtex.parser import iterchunks, parsechunk
+from scistash.entities.author import Author
+from scistash.entities.article import Article
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from pathlib import Path
+import click
+import os
+import time
+import re
+
+
+# Import BibTeX files into the stash. The file is read as a stream and entries become articles as they are parsed;
+# articles are written in batches, each one a single transaction, so that memory stays bounded by the batch rather than
+# by the file. Authors are deduplicated through an index by normalized name, seeded from the stash, so that every
+# spelling of a name already seen maps to the same author. Parsing can be spread over worker processes, while a single
+# writer (this process) builds the articles and batches them into the stash.
+class BibTeXImporter:
+    # Seconds between progress reports
+    __reportevery = 2.0
+
+    def __init__(self, dbhandler, fhash, batchsize=2000, workers=1, chunksize=1 << 20):
+        self.__db = dbhandler
+        self.__fhash = fhash
+        self.__batchsize = batchsize
+        self.__workers = workers if workers > 0 else os.cpu_count()
+        self.__chunksize = chunksize
+        self.__authors = None
+
+    @staticmethod
+    def __namekey(first: str, last: str):
+        return ' '.join(re.sub(r'[.\s]+', ' ', first).split()).lower(), ' '.join(last.split()).lower()
+
+    def __author(self, first: str, last: str):
+        key = self.__namekey(first, last)
+        author = self.__authors.get(key)
+
+        if author is None:
+            author = Author(first, last, False)
+            self.__authors[key] = author
+
+        return author
+
+    def __toarticle(self, record):
+        key, names, title, year, venue, volume, number, pages = record
+        authors = []
+
+        for first, last in names:
+            author = self.__author(first, last)
+
+            if author not in authors:
+                authors.append(author)
+
+        return Article(key, authors, title, year, venue, volume, number, pages)
+
+    # Records of every entry in a file, chunk by chunk, with the bytes each chunk consumed. With several workers,
+    # chunks are parsed in a pool of processes; at most two chunks per worker are in flight, and chunks are taken back
+    # in file order, so articles and their authors are built exactly as a sequential parse would build them.
+    def __records(self, stream):
+        chunks = iterchunks(stream, self.__chunksize)
+
+        if self.__workers <= 1:
+            for text, macros, consumed in chunks:
+                yield parsechunk(text, macros), consumed
+            return
+
+        with ProcessPoolExecutor(max_workers=self.__workers) as pool:
+            inflight = deque()
+
+            for text, macros, consumed in chunks:
+                inflight.append((pool.submit(parsechunk, text, macros), consumed))
+
+                if len(inflight) >= 2 * self.__workers:
+                    future, done = inflight.popleft()
+                    yield future.result(), done
+
+            while inflight:
+                future, done = inflight.popleft()
+                yield future.result(), done
+
+    def __report(self, stats, done, total, started):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        click.echo(click.style('[BibTeX] {0} entries, {1:.1f}/{2:.1f} MB, {3:.0f} entries/s, {4:.1f} MB/s'.format(
+            stats['entries'], done / 2**20, total / 2**20, stats['entries'] / elapsed, done / 2**20 / elapsed),
+            fg='blue'))
+
+    def __flush(self, batch, stats):
+        if batch:
+            outcome = self.__db.savemany(batch, self.__fhash)
+
+            if outcome is None:
+                stats['failed'] += len(batch)
+            else:
+                stats['articles'] += outcome['articles']
+                stats['authors'] += outcome['authors']
+
+            batch.clear()
+
+    # Returns a summary of the import, or None if the file cannot be read
+    def run(self, path):
+        path = Path(path).expanduser()
+
+        if not path.is_file():
+            click.echo(click.style(f'[BibTeX] File {path} does not exist.', fg='red'))
+            return None
+
+        if self.__authors is None:
+            self.__authors = {self.__namekey(a.firstname, a.lastname): a for a in self.__db.iterauthors()}
+
+        stats = {'entries': 0, 'articles': 0, 'authors': 0, 'duplicates': 0, 'failed': 0}
+        total = path.stat().st_size
+        done = 0
+        started = time.perf_counter()
+        reported = started
+        batch = []
+        batchkeys = set()
+
+        with path.open('rb') as stream:
+            for records, consumed in self.__records(stream):
+                done += consumed
+                held = self.__db.heldrefkeys(record[0] for record in records)
+
+                for record in records:
+                    stats['entries'] += 1
+
+                    # Reference keys are unique across the stash
+                    if record[0] in batchkeys or record[0] in held:
+                        stats['duplicates'] += 1
+                        continue
+
+                    batch.append(self.__toarticle(record))
+                    batchkeys.add(record[0])
+
+                if len(batch) >= self.__batchsize:
+                    self.__flush(batch, stats)
+                    batchkeys.clear()
+
+                    if time.perf_counter() - reported >= self.__reportevery:
+                        self.__report(stats, done, total, started)
+                        reported = time.perf_counter()
+
+        self.__flush(batch, stats)
+        self.__report(stats, done, total, started)
+
+        stats['seconds'] = time.perf_counter() - started
+        return stats
@@ -0,0 +1,335 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+import re
+
+# Standard month macros, available without an @string definition
+MONTHS = {m: str(i) for i, m in enumerate(['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct',
+                                          'nov', 'dec'], 1)}
+
+_entryhead = re.compile(r'@\s*(\w+)\s*([{(])')
+_citekey = re.compile(r'\s*([^,\s{}()]*)\s*,?')
+_fieldname = re.compile(r'[\s,]*([^\s=,{}()"#]+)\s*=\s*')
+_separator = re.compile(r'\s*(#?)\s*')
+_bareword = re.compile(r'[^\s,#{}()"]+')
+_braces = re.compile(r'(?<!\\)[{}]')
+_entrytoken = re.compile(r'(?<!\\)[{}()"]')
+_quoteorbraces = re.compile(r'(?<!\\)[{}"]')
+_nameseparator = re.compile(r'(?<!\\)[{}]|\s+and\s+', re.IGNORECASE)
+
+
+# Position right after the brace closing the group whose contents start at pos
+def _skipgroup(text, pos):
+    depth = 1
+
+    for m in _braces.finditer(text, pos):
+        depth += 1 if m.group() == '{' else -1
+
+        if depth == 0:
+            return m.end()
+
+    raise ValueError('unbalanced braces')
+
+
+# Position right after the quote closing the string whose contents start at pos. Quotes inside braces do not count,
+# unless the braces never balance: then the string ends at its first quote, as iterentries bounds it.
+def _skipquoted(text, pos):
+    depth = 0
+    first = None
+
+    for m in _quoteorbraces.finditer(text, pos):
+        if m.group() == '{':
+            depth += 1
+        elif m.group() == '}':
+            depth -= 1
+        elif depth <= 0:
+            return m.end()
+        elif first is None:
+            first = m.end()
+
+    if first is None:
+        raise ValueError('unterminated string')
+
+    return first
+
+
+# A field value is a concatenation (#) of braced groups, quoted strings, numbers and macros. Delimiters are removed,
+# while inner braces are kept: names and titles still need them.
+def _readvalue(text, pos, macros):
+    parts = []
+
+    while True:
+        if text.startswith('{', pos):
+            end = _skipgroup(text, pos + 1)
+            parts.append(text[pos + 1:end - 1])
+        elif text.startswith('"', pos):
+            end = _skipquoted(text, pos + 1)
+            parts.append(text[pos + 1:end - 1])
+        else:
+            m = _bareword.match(text, pos)
+
+            if not m:
+                raise ValueError('missing field value')
+
+            end = m.end()
+            word = m.group()
+            parts.append(macros.get(word.lower(), MONTHS.get(word.lower(), word)))
+
+        m = _separator.match(text, end)
+
+        if not m.group(1):
+            return ''.join(parts), m.end()
+
+        pos = m.end()
+
+
+# Fields up to the delimiter closing the entry
+def _readfields(text, pos, closer, macros):
+    fields = {}
+
+    while True:
+        m = _fieldname.match(text, pos)
+
+        if not m:
+            # Only separators and the closing delimiter may remain
+            end = text.find(closer, pos)
+
+            if end < 0 or text[pos:end].strip(' \t\r\n,'):
+                raise ValueError('malformed field list')
+
+            return fields, end + 1
+
+        value, pos = _readvalue(text, m.end(), macros)
+        fields[m.group(1).lower()] = value
+
+
+# Parse every entry found in a piece of BibTeX text. Yields (kind, key, fields) per entry, with lowercase kinds and
+# field names. @string definitions are added to macros as they are met, so they apply to the entries that follow them;
+# @comment and @preamble are skipped. Text outside entries is ignored, and so is any entry that cannot be parsed.
+def parseentries(text: str, macros=None):
+    macros = {} if macros is None else macros
+    pos = 0
+
+    while True:
+        at = text.find('@', pos)
+
+        if at < 0:
+            return
+
+        m = _entryhead.match(text, at)
+
+        if not m:
+            pos = at + 1
+            continue
+
+        kind = m.group(1).lower()
+        closer = '}' if m.group(2) == '{' else ')'
+        pos = m.end()
+
+        try:
+            if kind in ('comment', 'preamble'):
+                pos = _skipgroup(text, pos) if closer == '}' else text.index(')', pos) + 1
+            elif kind == 'string':
+                fields, pos = _readfields(text, pos, closer, macros)
+                macros.update({name: value for name, value in fields.items()})
+            else:
+                k = _citekey.match(text, pos)
+                fields, pos = _readfields(text, k.end(), closer, macros)
+
+                if k.group(1):
+                    yield kind, k.group(1), fields
+        except ValueError:
+            # Resynchronize on the next entry
+            continue
+
+
+# Split a stream of BibTeX into pieces of text holding whole entries, reading one line at a time, so that memory stays
+# bounded by the largest entry rather than by the size of the file. Entries are recognized by an '@' at the start of a
+# line and end at the delimiter matching the one they opened with, braces or parentheses; quoted values at the top
+# level of an entry are skipped whole, so that a brace inside one does not count. An entry may start on the line where
+# the previous one ends, in which case both come in the same piece. The stream must be binary: yields (text, bytes
+# consumed) pairs.
+def iterentries(stream, encoding='utf-8'):
+    pending = []
+    consumed = 0
+    # Delimiter closing the current entry (None until its opening one is seen), braces open inside it, and whether a
+    # quoted value is open at its top level
+    closer = None
+    depth = 0
+    quoted = False
+
+    for raw in stream:
+        consumed += len(raw)
+        line = raw.decode(encoding, errors='replace')
+        pos = 0
+
+        if not pending:
+            if not line.lstrip().startswith('@'):
+                # Comment text between entries
+                yield '', consumed
+                consumed = 0
+                continue
+
+            closer, depth, quoted = None, 0, False
+            pos = line.index('@') + 1
+        elif closer == '}' and not quoted and '@' not in line and line.count('"') == line.count('\\"'):
+            # Most lines only hold braces: when these cannot close the entry, counting them is enough
+            change = line.count('{') - line.count('\\{') - line.count('}') + line.count('\\}')
+
+            if depth + change >= 0:
+                pending.append(line)
+                depth += change
+                continue
+
+        pending.append(line)
+        ended = False
+
+        while pos is not None:
+            tokens, pos = _entrytoken.finditer(line, pos), None
+
+            for m in tokens:
+                token = m.group()
+
+                if closer is None:
+                    if token in '{(':
+                        closer = '}' if token == '{' else ')'
+                elif quoted:
+                    quoted = token != '"'
+                elif token == '{':
+                    depth += 1
+                elif token == '}' and depth:
+                    depth -= 1
+                elif token == '"' and not depth:
+                    quoted = True
+                elif token == closer and not depth:
+                    following = _entryhead.search(line, m.end())
+
+                    if following:
+                        closer, depth, quoted = '}' if following.group(2) == '{' else ')', 0, False
+                        pos = following.end()
+                    else:
+                        ended = True
+
+                    break
+
+        if ended:
+            yield ''.join(pending), consumed
+            pending = []
+            consumed = 0
+
+    if pending:
+        yield ''.join(pending), consumed
+
+
+# Remove grouping braces and common escapes from a raw value, and collapse whitespace
+def cleanvalue(raw: str):
+    text = re.sub(r'\\([&%$#_{}])', r'\1', _braces.sub('', raw))
+    return ' '.join(text.replace('~', ' ').split())
+
+
+# Split a raw author field into names at top-level 'and's. Braced groups (e.g. institutional authors) are never split.
+def splitauthors(raw: str):
+    names = []
+    depth = 0
+    start = 0
+
+    for m in _nameseparator.finditer(raw):
+        if m.group() == '{':
+            depth += 1
+        elif m.group() == '}':
+            depth -= 1
+        elif depth == 0:
+            names.append(raw[start:m.start()])
+            start = m.end()
+
+    names.append(raw[start:])
+    return [name for name in (n.strip() for n in names) if name and name.lower() != 'others']
+
+
+# Split a single raw name into (first, last), accepting the 'von Last, Jr, First', 'Last, First' and 'First von Last'
+# forms. Particles in lowercase belong to the last name.
+def splitname(raw: str):
+    if raw.startswith('{') and _skipgroup(raw, 1) == len(raw):
+        # Literal name, kept whole
+        return '', cleanvalue(raw)
+
+    parts = [p.strip() for p in raw.split(',')]
+
+    if len(parts) > 1:
+        return cleanvalue(parts[-1]), cleanvalue(parts[0])
+
+    words = raw.split()
+
+    if not words:
+        return '', ''
+
+    split = len(words) - 1
+
+    while split > 0 and words[split - 1][:1].islower():
+        split -= 1
+
+    return cleanvalue(' '.join(words[:split])), cleanvalue(' '.join(words[split:]))
+
+
+def _number(raw: str):
+    m = re.search(r'\d+', raw)
+    return int(m.group()) if m else 0
+
+
+# Compact, picklable form of an entry with everything an article needs, already cleaned:
+# (refkey, ((first, last), ...), title, year, venue, volume, number, (first page, last page))
+def torecord(key: str, fields: dict):
+    names = tuple(splitname(name) for name in splitauthors(fields.get('author', fields.get('editor', ''))))
+    pages = [int(p) for p in re.findall(r'\d+', fields.get('pages', ''))[:2]]
+    venue = next((fields[f] for f in ['journal', 'booktitle', 'publisher', 'school', 'institution'] if f in fields), '')
+
+    return key, names, cleanvalue(fields.get('title', '')), _number(fields.get('year', '')), cleanvalue(venue), \
+        _number(fields.get('volume', '')), _number(fields.get('number', '')), \
+        (pages[0], pages[-1]) if pages else (0, 0)
+
+
+# Records for every entry in a piece of text. This is the unit of work sent to parsing processes: macros must hold the
+# @string definitions made before the text starts.
+def parsechunk(text: str, macros: dict):
+    return [torecord(key, fields) for kind, key, fields in parseentries(text, dict(macros))]
+
+
+# Group whole entries into chunks of roughly chunksize bytes, which can be parsed independently of each other. Each
+# chunk comes with the macros defined before it, so @string definitions are resolved as a sequential parse would.
+# Yields (text, macros, bytes consumed) triples.
+def iterchunks(stream, chunksize=1 << 20, encoding='utf-8'):
+    macros = {}
+    before = {}
+    pieces = []
+    size = 0
+    consumed = 0
+
+    for text, read in iterentries(stream, encoding):
+        consumed += read
+
+        if not text:
+            continue
+
+        if not pieces:
+            before = dict(macros)
+
+        pieces.append(text)
+        size += len(text)
+
+        # A piece may hold several entries: any of them may define macros
+        if any(m.group(1).lower() == 'string' for m in _entryhead.finditer(text)):
+            for _ in parseentries(text, macros):
+                pass
+
+        if size >= chunksize:
+            yield ''.join(pieces), before, consumed
+            pieces = []
+            size = 0
+            consumed = 0
+
+    if pieces or consumed:
+        yield ''.join(pieces), before if pieces else macros, consumed
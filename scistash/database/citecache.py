@@ -0,0 +1,54 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from collections import OrderedDict
+import uuid
+
+
+# Rendered citations by article id and format, keeping those of the most recently used articles. Article ids are
+# derived from their contents, so an edited article comes back under a new id; the stash discards the prior id when the
+# edit is saved, and drops everything when authors are deleted, since their articles keep their ids.
+class CitationCache:
+
+    def __init__(self, capacity=4096):
+        self.__capacity = capacity
+        self.__citations = OrderedDict()
+
+    @staticmethod
+    def key(oid):
+        return oid if isinstance(oid, uuid.UUID) else uuid.UUID(str(oid))
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    def get(self, oid, fmt):
+        oid = self.key(oid)
+        citations = self.__citations.get(oid)
+
+        if citations is None:
+            return None
+
+        self.__citations.move_to_end(oid)
+        return citations.get(fmt)
+
+    def put(self, oid, fmt, citation):
+        oid = self.key(oid)
+        self.__citations.setdefault(oid, {})[fmt] = citation
+        self.__citations.move_to_end(oid)
+
+        if len(self.__citations) > self.__capacity:
+            self.__citations.popitem(last=False)
+
+    def discard(self, oid):
+        self.__citations.pop(self.key(oid), None)
+
+    def clear(self):
+        self.__citations.clear()
+
+    def __len__(self):
+        return len(self.__citations)
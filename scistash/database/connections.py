@@ -0,0 +1,173 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from contextlib import contextmanager
+import threading
+import sqlite3
+import pathlib
+import click
+import os
+
+# Pragma profiles. cache_size is given in KiB (negative, as SQLite expects), mmap_size and journal_size_limit in bytes.
+# The journal mode is set on the stash itself, which keeps it until another profile changes it. A write-ahead log grows
+# for as long as readers keep a checkpoint from reaching its end; the limit shrinks it back once one does, and past it
+# the writer forces one (see commit). Pragmas under 'readers' override the others on read-only connections: a reader
+# drops its whole cache whenever the stash changes, so a large one only costs memory while writes are going on.
+#
+#   default   rollback journal, every commit reaches the disk before returning
+#   safe      as default, and journal deletions are synced too, so that commits also survive power loss
+#   bulk      large imports: nothing is synced, so power loss may corrupt the stash, though a crash loses nothing
+#   lowmem    small caches and no memory-mapped I/O
+#   wal       write-ahead logging: readers on other connections neither block nor are blocked by the writer. Under
+#             steady reads, writes pay for the checkpoints they have to wait for, so this only pays off with readers
+#             that must not stall during long writes.
+profiles = {
+    'default': {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'cache_size': -65536, 'mmap_size': 268435456,
+                'temp_store': 'MEMORY', 'journal_size_limit': 67108864, 'readers': {'cache_size': -16384}},
+    'safe': {'journal_mode': 'DELETE', 'synchronous': 'EXTRA', 'cache_size': -16384, 'mmap_size': 0,
+             'temp_store': 'DEFAULT', 'journal_size_limit': 67108864, 'readers': {'cache_size': -8192}},
+    'bulk': {'journal_mode': 'DELETE', 'synchronous': 'OFF', 'cache_size': -262144, 'mmap_size': 1073741824,
+             'temp_store': 'MEMORY', 'journal_size_limit': 268435456, 'readers': {'cache_size': -32768}},
+    'lowmem': {'journal_mode': 'DELETE', 'synchronous': 'NORMAL', 'cache_size': -2048, 'mmap_size': 0,
+               'temp_store': 'FILE', 'journal_size_limit': 16777216, 'readers': {}},
+    'wal': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -65536, 'mmap_size': 268435456,
+            'temp_store': 'MEMORY', 'journal_size_limit': 67108864, 'readers': {'cache_size': -16384}}
+}
+
+
+# Connections to one stash: a single writer for everything that modifies it, and, with write-ahead logging, a pool of
+# read-only connections for queries, which see the last committed state and neither block nor are blocked by the
+# writer. With a rollback journal every query goes to the writer.
+#
+# Reads issued from the writer's thread while it has a transaction open go to the writer itself, so that they see the
+# rows written so far. Readers are opened on demand; at most `readers` idle ones are kept.
+class ConnectionManager:
+
+    def __init__(self, db, profile='default', readers=4, statementcache=256):
+        if profile not in profiles:
+            raise ValueError(f'unknown profile {profile}')
+
+        self.__path = str(db)
+        self.__profile = profile
+        self.__capacity = readers
+        self.__statementcache = statementcache
+        self.__idle = []
+        self.__lock = threading.Lock()
+        self.__writer = sqlite3.connect(self.__path, cached_statements=statementcache)
+        self.__owner = threading.get_ident()
+
+        # An in-memory stash exists in the writer only; it has nothing to share
+        self.__file = self.__path != ':memory:' and not self.__path.startswith('file::memory:')
+        self.__wal = False
+
+        if self.__file:
+            wanted = profiles[profile]['journal_mode']
+            mode, = self.__writer.execute(f'PRAGMA journal_mode = {wanted}').fetchone()
+
+            if mode.lower() != wanted.lower():
+                click.echo(click.style(f'[SQLite] {wanted} journaling unavailable, using {mode} journaling.',
+                                       fg='magenta'))
+
+            self.__wal = mode.lower() == 'wal'
+
+        self.__configure(self.__writer)
+
+    @property
+    def profile(self):
+        return self.__profile
+
+    @property
+    def writer(self):
+        return self.__writer
+
+    # Whether reads can get connections of their own (see acquire), and so can be issued from other threads
+    @property
+    def shared(self):
+        return self.__file
+
+    # Pragmas cannot be bound; every value comes from the profiles above
+    def __configure(self, conn, reader=False):
+        pragmas = {pragma: value for pragma, value in profiles[self.__profile].items()
+                   if pragma not in ('journal_mode', 'readers')}
+
+        if reader:
+            pragmas.update(profiles[self.__profile]['readers'])
+
+        for pragma, value in pragmas.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+
+    # Commit on the writer. Automatic checkpoints never wait for readers, so under steady reads the write-ahead log is
+    # never reset and keeps growing, slowing down reads and writes alike. Once it is past the journal size limit, the
+    # writer waits for a moment when no reader needs it (up to the busy timeout) to copy it back and truncate it.
+    def commit(self):
+        self.__writer.commit()
+
+        if self.__wal and self.__walsize() > profiles[self.__profile]['journal_size_limit']:
+            self.__writer.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+
+    def __walsize(self):
+        try:
+            return os.stat(self.__path + '-wal').st_size
+        except OSError:
+            return 0
+
+    def __open(self):
+        uri = pathlib.Path(self.__path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, cached_statements=self.__statementcache, check_same_thread=False)
+        self.__configure(conn, reader=True)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    # With `own`, a reader is handed out even under a rollback journal, for reads made from other threads. There it
+    # holds back commits for as long as a statement of its runs, and should only be used for short ones.
+    def acquire(self, own=False):
+        if not self.__file:
+            return self.__writer
+
+        if not own and (not self.__wal or (self.__writer.in_transaction and threading.get_ident() == self.__owner)):
+            return self.__writer
+
+        with self.__lock:
+            if self.__idle:
+                return self.__idle.pop()
+
+        return self.__open()
+
+    def release(self, conn):
+        if conn is self.__writer:
+            return
+
+        # A reader is only returned once its statements are done, so it holds no snapshot while idle
+        with self.__lock:
+            if len(self.__idle) < self.__capacity:
+                self.__idle.append(conn)
+                return
+
+        conn.close()
+
+    @contextmanager
+    def reading(self, own=False):
+        conn = self.acquire(own)
+
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self, commit=True):
+        with self.__lock:
+            for conn in self.__idle:
+                conn.close()
+
+            self.__idle.clear()
+
+        if commit:
+            self.commit()
+        else:
+            self.__writer.rollback()
+
+        self.__writer.close()
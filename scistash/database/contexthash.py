@@ -0,0 +1,198 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from collections import OrderedDict
+from collections.abc import Mapping
+from scistash.database.labelindex import LabelIndex
+from itertools import islice
+import threading
+import sqlite3
+import click
+import uuid
+
+
+# Mapping from object ids to their rendered labels, used to offer context when completing identifiers. Nothing is
+# rendered until the labels are first needed; from then on, the stash keeps the mapping current as objects are saved
+# or deleted instead of rebuilding it. With a capacity, only the most recently used labels stay resident and the rest
+# are rendered again on demand. Every object stays in the completion index regardless, which holds words, not labels.
+#
+# Rendering every label takes long on a large stash, so a session prepares the index in the background as soon as it
+# starts, when the stash can be read from another thread. Until the index is ready, completion is served by the search
+# index of the stash instead. Objects saved or deleted meanwhile are indexed right away, and the build leaves them be.
+class ContextHash(Mapping):
+    # Labels indexed at a time by a background build: a keystroke or a save waits for at most one step
+    __step = 64
+
+    def __init__(self, dbhandler, capacity=0):
+        self.__db = dbhandler
+        self.__capacity = capacity
+        self.__labels = OrderedDict()
+        self.__index = LabelIndex()
+        self.__built = False
+        self.__lock = threading.RLock()
+        self.__ready = threading.Event()
+        self.__builder = None
+        self.__changed = None
+        self.__cancelled = False
+
+    @staticmethod
+    def __key(oid):
+        return oid if isinstance(oid, uuid.UUID) else uuid.UUID(str(oid))
+
+    def __remember(self, oid, label):
+        self.__labels[oid] = label
+        self.__labels.move_to_end(oid)
+
+        if self.__capacity and len(self.__labels) > self.__capacity:
+            self.__labels.popitem(last=False)
+
+    def __build(self):
+        if not self.__built:
+            # Mark first: rendering may be interrupted, and partial labels are still useful
+            self.__built = True
+
+            with self.__lock:
+                self.__index.update(self.__render(self.__db.iterlabels(keys=True)))
+
+            self.__ready.set()
+
+    # Labels are remembered as they are indexed, except those of objects changed since the build started
+    def __render(self, entries):
+        for oid, label, keys in entries:
+            if self.__changed is None or oid not in self.__changed:
+                self.__remember(oid, label)
+                yield oid, label, keys
+
+    def __background(self):
+        entries = self.__db.iterlabels(keys=True, own=True)
+
+        try:
+            while not self.__cancelled:
+                # Rows are pulled under the lock too, so that a keystroke served meanwhile has the interpreter to itself
+                with self.__lock:
+                    step = list(islice(entries, self.__step))
+                    self.__index.update(self.__render(step), compact=False)
+
+                if not step:
+                    break
+        except sqlite3.Error as e:
+            if not self.__cancelled:
+                click.echo(click.style(f'[Context] Completion index left incomplete ({e}).', fg='red'))
+        finally:
+            entries.close()
+
+            with self.__lock:
+                self.__index.update([])
+                self.__changed = None
+
+            self.__ready.set()
+
+    # Start building in the background. Without concurrent reads, the index is built on first use instead.
+    def prepare(self):
+        if self.__built or not self.__db.concurrentreads:
+            return
+
+        self.__built = True
+        self.__changed = set()
+        self.__builder = threading.Thread(target=self.__background, name='contexthash', daemon=True)
+        self.__builder.start()
+
+    # Stop a background build, before the stash is closed
+    def stop(self):
+        if self.__builder is not None:
+            self.__cancelled = True
+            self.__builder.join()
+            self.__builder = None
+
+    @property
+    def built(self):
+        return self.__built
+
+    @property
+    def ready(self):
+        return self.__ready.is_set()
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    # The capacity bounds the labels only: the completion index holds every object in the stash
+    def usage(self):
+        cap = f'at most {self.__capacity}' if self.__capacity else 'no cap'
+        state = 'ready' if self.__ready.is_set() else 'being built' if self.__built else 'not built yet'
+
+        with self.__lock:
+            return f'[Context] Labels: {len(self.__labels)} resident ({cap}); completion index {state}, ' \
+                   f'{len(self.__index)} objects and {self.__index.vocabulary} words, outside the cap'
+
+    # Incremental maintenance. Before the first build there is nothing to maintain: the build will see the change.
+    def refresh(self, oid, label, keys=None):
+        if self.__built and label is not None:
+            oid = self.__key(oid)
+
+            with self.__lock:
+                if self.__changed is not None:
+                    self.__changed.add(oid)
+
+                self.__remember(oid, label)
+                self.__index.add(oid, label, keys)
+
+    def discard(self, oid):
+        if self.__built:
+            oid = self.__key(oid)
+
+            with self.__lock:
+                if self.__changed is not None:
+                    self.__changed.add(oid)
+
+                self.__labels.pop(oid, None)
+                self.__index.remove(oid)
+
+    # At most `limit` (id, label) pairs for objects with a word starting with every term typed
+    def complete(self, text, limit=20):
+        self.__build()
+
+        if not self.__ready.is_set():
+            with self.__lock:
+                return self.__db.suggest(text, limit)
+
+        with self.__lock:
+            found = self.__index.search(text, limit)
+
+        matches = ((oid, self.get(oid)) for oid in found)
+        return [(oid, label) for oid, label in matches if label is not None]
+
+    def __getitem__(self, oid):
+        self.__build()
+        oid = self.__key(oid)
+
+        with self.__lock:
+            if oid in self.__labels:
+                self.__labels.move_to_end(oid)
+                return self.__labels[oid]
+
+        label = self.__db.renderlabel(oid)
+
+        if label is None:
+            raise KeyError(oid)
+
+        with self.__lock:
+            self.__remember(oid, label)
+
+        return label
+
+    def __iter__(self):
+        self.__build()
+        self.__ready.wait()
+
+        with self.__lock:
+            return iter(list(self.__labels.keys()))
+
+    def __len__(self):
+        self.__build()
+        self.__ready.wait()
+        return len(self.__labels)
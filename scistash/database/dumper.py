@@ -0,0 +1,91 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.bibtex.cite import tobibtex, toapa
+from pathlib import Path
+import click
+import gzip
+import csv
+
+
+# Export of the stash to a file, in CSV (one line per article), SQL (the whole stash), BibTeX or APA. Rows are streamed
+# from the stash and written as they come, so memory stays constant whatever the size of the stash. Output is
+# gzip-compressed on request, or when the file name ends in .gz.
+class StashDumper:
+    formats = ['csv', 'sql', 'bibtex', 'apa']
+
+    # Output is buffered in blocks of this size
+    __buffering = 1 << 20
+
+    def __init__(self, dbhandler):
+        self.__db = dbhandler
+
+    def __open(self, path: Path, compress: bool):
+        if compress:
+            return gzip.open(path, 'wt', encoding='utf-8', newline='')
+
+        return path.open('w', encoding='utf-8', newline='', buffering=self.__buffering)
+
+    def __csv(self, out):
+        writer = csv.writer(out)
+        writer.writerow(['uuid', 'refkey', 'year', 'title', 'journal', 'volume', 'number', 'pagstart', 'pagend',
+                         'retracted', 'authors'])
+        count = 0
+
+        for row, names in self.__db.iterarticles():
+            writer.writerow(row + ('; '.join(f'{last}, {first}' for first, last in names),))
+            count += 1
+
+        return count
+
+    def __sql(self, out):
+        count = 0
+
+        for statement in self.__db.iterdump():
+            out.write(statement)
+            out.write('\n')
+            count += 1
+
+        return count
+
+    def __citations(self, out, formatter, separator):
+        count = 0
+
+        for row, names in self.__db.iterarticles():
+            out.write(formatter(row, names))
+            out.write(separator)
+            count += 1
+
+        return count
+
+    def __bibtex(self, out):
+        return self.__citations(out, tobibtex, '\n')
+
+    def __apa(self, out):
+        return self.__citations(out, toapa, '')
+
+    # Returns the number of records written (articles, or SQL statements), or None if nothing could be written
+    def dump(self, fmt: str, path, compress=False):
+        if fmt not in self.formats:
+            click.echo(click.style(f'[Dump] Unknown format {fmt}.', fg='red'))
+            return None
+
+        path = Path(path).expanduser()
+        compress = compress or path.suffix == '.gz'
+        writer = {
+            'csv': self.__csv,
+            'sql': self.__sql,
+            'bibtex': self.__bibtex,
+            'apa': self.__apa
+        }
+
+        try:
+            with self.__open(path, compress) as out:
+                return writer[fmt](out)
+        except OSError as e:
+            click.echo(click.style(f'[Dump] Could not write {path} ({e}).', fg='red'))
+            return None
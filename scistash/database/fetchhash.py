@@ -0,0 +1,121 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import uuid
+
+
+# Mapping from object ids to object types that resolves ids against the stash on demand instead of loading every id
+# at startup. Resolved ids are kept in a bounded LRU front cache. Assigned ids go to the same cache without asking the
+# stash, since whoever assigns them has just written their rows. Ids the stash does not know about (e.g. pending
+# objects that only live in memory) are pinned instead, until they are removed or stored, since there would be
+# nothing to resolve them against.
+class LazyFetchHash(MutableMapping):
+
+    def __init__(self, dbhandler, capacity=65536):
+        self.__db = dbhandler
+        self.__capacity = capacity
+        self.__cache = OrderedDict()
+        self.__pinned = {}
+
+    @staticmethod
+    def __key(oid):
+        if isinstance(oid, uuid.UUID):
+            return oid
+
+        try:
+            return uuid.UUID(str(oid))
+        except ValueError:
+            return oid
+
+    def __remember(self, oid, otype):
+        self.__cache[oid] = otype
+        self.__cache.move_to_end(oid)
+
+        if len(self.__cache) > self.__capacity:
+            self.__cache.popitem(last=False)
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    def __getitem__(self, oid):
+        oid = self.__key(oid)
+
+        if oid in self.__pinned:
+            return self.__pinned[oid]
+        elif oid in self.__cache:
+            self.__cache.move_to_end(oid)
+            return self.__cache[oid]
+        else:
+            otype = self.__db.resolvetype(oid)
+
+            if otype is None:
+                raise KeyError(oid)
+
+            self.__remember(oid, otype)
+            return otype
+
+    def __setitem__(self, oid, otype):
+        oid = self.__key(oid)
+        self.__pinned.pop(oid, None)
+        self.__remember(oid, otype)
+
+    def pin(self, oid, otype):
+        oid = self.__key(oid)
+        self.__pinned[oid] = otype
+        self.__cache.pop(oid, None)
+
+    def __delitem__(self, oid):
+        oid = self.__key(oid)
+        found = oid in self.__pinned or oid in self.__cache
+        self.__pinned.pop(oid, None)
+        self.__cache.pop(oid, None)
+
+        if not found:
+            raise KeyError(oid)
+
+    # Removal never needs to consult the stash: ids are only forgotten after their rows are gone
+    def pop(self, oid, *default):
+        oid = self.__key(oid)
+
+        if oid in self.__pinned:
+            self.__cache.pop(oid, None)
+            return self.__pinned.pop(oid)
+        elif oid in self.__cache:
+            return self.__cache.pop(oid)
+        elif default:
+            return default[0]
+        else:
+            raise KeyError(oid)
+
+    def __iter__(self):
+        yield from list(self.__pinned.keys())
+
+        for oid, _ in self.__db.iterids():
+            yield oid
+
+    def __len__(self):
+        return len(self.__pinned) + self.__db.countids()
+
+
+# Fetch hash changes held back while a batch of writes may still be rolled back, applied to the real fetch hash once
+# it is released. A removal is recorded as None.
+class StagedFetchHash(dict):
+
+    def pop(self, oid, *default):
+        otype = self.get(oid, *default)
+        self[oid] = None
+        return otype
+
+    def applyto(self, fhash):
+        for oid, otype in self.items():
+            if otype is None:
+                fhash.pop(oid, None)
+            else:
+                fhash[oid] = otype
@@ -0,0 +1,261 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from bisect import bisect_left
+from heapq import merge
+import re
+
+# Identifiers are kept whole; everything else is split into words
+UUID = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+WORD = re.compile(r'\w+')
+TERM = re.compile(r'[\w-]+')
+UUIDPREFIX = re.compile(r'[0-9a-f]+(-[0-9a-f]*)+')
+
+
+# Word prefix index over object labels, used to complete identifiers. A label is reduced to its words in lower case,
+# plus its own identifier and any further keys (such as refkeys); identifiers of other objects mentioned in it are
+# left out. A sorted vocabulary finds the words that start with a typed term by bisection, and the postings of each
+# word give the objects it occurs in. A query matches objects having a word that starts with every term, in any
+# order, and stops after `limit` objects or `budget` postings, so that its cost does not grow with the stash.
+#
+# Words first seen after the vocabulary was sorted go to a small sorted list of their own, searched alongside it and
+# merged into it once it grows past `recent`. Words left without postings stay in the lists until then and are skipped.
+# Likewise, an object losing a word is only taken out of postings longer than `short` once `sweep` such removals have
+# piled up, rather than scanning the postings of a common word every time.
+class LabelIndex:
+
+    def __init__(self, recent=65536, short=64, sweep=65536):
+        self.__slots = {}
+        self.__ids = []
+        self.__docs = []
+        self.__free = []
+        self.__postings = {}
+        self.__vocabulary = []
+        self.__recent = []
+        self.__stale = set()
+        self.__capacity = recent
+        self.__short = short
+        self.__untidy = set()
+        self.__lingering = 0
+        self.__sweep = sweep
+
+    @staticmethod
+    def words(oid, label, keys=None):
+        text = UUID.sub(' ', label.lower())
+
+        if keys:
+            text += ' ' + keys.lower()
+
+        return list(dict.fromkeys([str(oid)] + WORD.findall(text)))
+
+    # Typed text follows the same rules, except that a partial identifier has to be told apart from hyphenated words
+    @staticmethod
+    def terms(text):
+        terms = []
+
+        for term in TERM.findall(text.lower()):
+            if UUIDPREFIX.fullmatch(term):
+                terms.append(term)
+            else:
+                terms.extend(WORD.findall(term))
+
+        return list(dict.fromkeys(terms))
+
+    def __len__(self):
+        return len(self.__slots)
+
+    def __contains__(self, oid):
+        return oid in self.__slots
+
+    # Number of distinct words with postings
+    @property
+    def vocabulary(self):
+        return len(self.__postings)
+
+    def __unpost(self, word, slot):
+        posting = self.__postings[word]
+
+        if type(posting) is int:
+            del self.__postings[word]
+            self.__stale.add(word)
+        elif len(posting) > self.__short:
+            # Left for the next sweep: searches check every object against its own words anyway
+            self.__untidy.add(word)
+            self.__lingering += 1
+        else:
+            posting.remove(slot)
+
+            if len(posting) == 1:
+                self.__postings[word] = posting[0]
+
+    # Returns the words the index has not seen yet. An object already indexed keeps its slot, and only the words it
+    # gained or lost are posted, so that re-saving it does not touch the long postings of common words.
+    def __insert(self, oid, words):
+        postings = self.__postings
+        slot = self.__slots.get(oid)
+        previous = set()
+        fresh = []
+
+        if slot is None:
+            if self.__free:
+                slot = self.__free.pop()
+                self.__ids[slot] = oid
+            else:
+                slot = len(self.__ids)
+                self.__ids.append(oid)
+                self.__docs.append(None)
+
+            self.__slots[oid] = slot
+        else:
+            previous.update(self.__docs[slot].split())
+
+            for word in previous.difference(words):
+                self.__unpost(word, slot)
+
+        self.__docs[slot] = ' ' + ' '.join(words) + ' '
+
+        for word in words:
+            if word in previous:
+                continue
+
+            posting = postings.get(word)
+
+            # Most words belong to one object only: a bare slot spares a list per identifier
+            if posting is None:
+                postings[word] = slot
+                fresh.append(word)
+            elif type(posting) is int:
+                postings[word] = [posting, slot]
+            else:
+                posting.append(slot)
+
+        return fresh
+
+    def __enter(self, word, bulk=False):
+        # A stale word is still in one of the lists
+        if word in self.__stale:
+            self.__stale.discard(word)
+        elif bulk:
+            self.__recent.append(word)
+        else:
+            self.__recent.insert(bisect_left(self.__recent, word), word)
+
+    def add(self, oid, label, keys=None):
+        for word in self.__insert(oid, self.words(oid, label, keys)):
+            self.__enter(word)
+
+        if len(self.__recent) > self.__capacity:
+            self.__compact()
+
+    # Bulk load: new words are sorted once at the end, even if loading is interrupted. When loading in parts, all but
+    # the last can leave them unsorted; searches are only right once they are sorted.
+    def update(self, entries, compact=True):
+        try:
+            for oid, label, keys in entries:
+                for word in self.__insert(oid, self.words(oid, label, keys)):
+                    self.__enter(word, bulk=True)
+        finally:
+            if compact:
+                self.__compact()
+
+    def remove(self, oid):
+        slot = self.__slots.pop(oid, None)
+
+        if slot is None:
+            return
+
+        for word in self.__docs[slot].split():
+            self.__unpost(word, slot)
+
+        self.__ids[slot] = None
+        self.__docs[slot] = None
+        self.__free.append(slot)
+
+        if self.__lingering > self.__sweep:
+            self.__tidy()
+
+    # Drop the postings of objects that no longer have the word, including those of slots since reused
+    def __tidy(self):
+        docs = self.__docs
+
+        for word in self.__untidy:
+            posting = self.__postings.get(word)
+
+            if type(posting) is not list:
+                continue
+
+            needle = ' ' + word + ' '
+            posting[:] = [slot for slot in dict.fromkeys(posting) if docs[slot] is not None and needle in docs[slot]]
+
+            if not posting:
+                del self.__postings[word]
+                self.__stale.add(word)
+            elif len(posting) == 1:
+                self.__postings[word] = posting[0]
+
+        self.__untidy.clear()
+        self.__lingering = 0
+
+    def __compact(self):
+        words = self.__vocabulary + self.__recent
+
+        if self.__stale:
+            words = [word for word in words if word in self.__postings]
+            self.__stale.clear()
+
+        words.sort()
+        self.__vocabulary = words
+        self.__recent = []
+
+    # Words starting with a term, in order, and an estimate of how many there are
+    def __range(self, term):
+        bound = term + '\uffff'
+        ranges = []
+
+        for words in (self.__vocabulary, self.__recent):
+            lo = bisect_left(words, term)
+            ranges.append((words, lo, bisect_left(words, bound, lo)))
+
+        return sum(hi - lo for _, lo, hi in ranges), ranges
+
+    def search(self, text, limit=20, budget=100000):
+        terms = self.terms(text)
+
+        if not terms:
+            return []
+
+        # The term with the fewest words drives; every term is then checked on the words of each object it yields
+        (_, ranges), _ = min(((self.__range(term), term) for term in terms), key=lambda r: r[0][0])
+        terms = [' ' + term for term in terms]
+        found = []
+        seen = set()
+
+        for word in merge(*(map(words.__getitem__, range(lo, hi)) for words, lo, hi in ranges)):
+            posting = self.__postings.get(word)
+
+            if posting is None:
+                continue
+
+            for slot in (posting,) if type(posting) is int else posting:
+                budget -= 1
+
+                if slot in seen:
+                    continue
+
+                seen.add(slot)
+                doc = self.__docs[slot]
+
+                if doc is not None and all(term in doc for term in terms):
+                    found.append(self.__ids[slot])
+
+                    if len(found) == limit:
+                        return found
+
+            if budget <= 0:
+                break
+
+        return found
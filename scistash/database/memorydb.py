@@ -11,7 +11,11 @@ from scistash.entities.annotation import Annotation
 from scistash.entities.tag import Tag
 from scistash.entities.rfile import RefFile
 from scistash.entities.reference import Reference
+from scistash.entities.content import MemoryContent
 from scistash.database.sqlitedb import SQLiteHandler
+from scistash.database.spillstore import SpillStore
+from collections import OrderedDict
+import pickle
 import click
 import uuid
 
@@ -20,21 +24,29 @@ class MemoryDBHandler:
 
     def __init__(self, memquota=0):
         click.echo('[IMemDB] Initializing in-memory stash...')
+        # Quota in megabytes; zero disables it
         self.__memquota = memquota
+        # Resident bytes per staged object, in order of last use, and objects that cannot leave memory
+        self.__resident = OrderedDict()
+        self.__pinned = set()
+        self.__usage = 0
+        self.__spill = SpillStore()
+        self.__spills = 0
+        # One id-keyed index per type. Dictionaries preserve insertion order, which keeps show and save stable.
+        # Objects spilled to disk keep their place in the index with a None value.
         self.__data = {
-            Author: [],
-            Article: [],
-            Annotation: [],
-            Tag: [],
-            RefFile: [],
-            Reference: []
+            Author: {},
+            Article: {},
+            Annotation: {},
+            Tag: {},
+            RefFile: {},
+            Reference: {}
         }
         click.echo('[IMemDB] In-memory stash initialized.')
 
     # Most internal implementation
     def exists_fetch(self, oid, otype):
-        rows = list(filter(lambda x: x.id == oid, self.__data[otype]))
-        return True if rows else False
+        return otype in self.__data and oid in self.__data[otype]
 
     # Implementation with entire object, not just ids and types
     def exists(self, obj):
@@ -47,24 +59,119 @@ class MemoryDBHandler:
     def put(self, obj, fhash: dict):
         if obj is None:
             return
-        elif self.exists(obj):
-            click.echo(click.style('[IMemDB] Object already exists in memory.', fg='magenta'))
         elif type(obj) not in self.__data.keys():
             click.echo(click.style('[IMemDB] Unknown object type.', fg='red'))
+        elif self.exists(obj):
+            click.echo(click.style('[IMemDB] Object already exists in memory.', fg='magenta'))
+        else:
+            # A lazy fetch hash would otherwise lose the id once evicted, as the stash does not hold it yet
+            if hasattr(fhash, 'pin'):
+                fhash.pin(obj.id, type(obj))
+            else:
+                fhash[obj.id] = type(obj)
+
+            self.__data[type(obj)][obj.id] = obj
+            self.__admit((type(obj), obj.id), obj)
+
+    # Memory accounting
+    #
+    # Every staged object is charged an estimate rather than a measurement, so that staging stays cheap: a fixed cost
+    # per entity, plus the attachment content it holds in memory (content backed by a file or by the stash is not
+    # read, so it costs nothing more). When the quota is exceeded, the least recently touched objects are spilled to
+    # disk until usage fits again. Objects that cannot be pickled (e.g. files streaming from the stash connection) are
+    # pinned in memory the first time spilling them fails.
+    __entitybytes = 1024
+
+    @property
+    def quota(self):
+        return self.__memquota * 1024 * 1024
+
+    def __estimate(self, obj):
+        if type(obj) is RefFile and isinstance(obj.content, MemoryContent):
+            return self.__entitybytes + obj.content.size
+
+        return self.__entitybytes
+
+    def __admit(self, key, obj):
+        size = self.__estimate(obj)
+        self.__resident[key] = size
+        self.__usage += size
+        self.__enforce(key)
+
+    def __enforce(self, keep=None):
+        if not self.quota:
+            return
+
+        for key in list(self.__resident.keys()):
+            if self.__usage <= self.quota:
+                return
+            elif (key != keep) and (key not in self.__pinned):
+                otype, oid = key
+
+                try:
+                    self.__spill.put(key, self.__data[otype][oid])
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    self.__pinned.add(key)
+                    continue
+
+                self.__data[otype][oid] = None
+                self.__usage -= self.__resident.pop(key)
+                self.__spills += 1
+
+    def __touch(self, key):
+        if key in self.__resident:
+            self.__resident.move_to_end(key)
+
+    # Remove an object from the accounting, wherever it currently lives
+    def __forget(self, key):
+        self.__usage -= self.__resident.pop(key, 0)
+        self.__pinned.discard(key)
+        self.__spill.discard(key)
+
+    def __forgetall(self, otype):
+        for oid in self.__data[otype]:
+            self.__forget((otype, oid))
+
+    # Spilled articles come back with copies of their authors; share the staged authors again where they are resident.
+    # Authors that are themselves spilled stay copies.
+    def __relink(self, obj):
+        if type(obj) is Article:
+            staged = self.__data[Author]
+            obj.authors[:] = [auth if staged.get(auth.id) is None else staged[auth.id] for auth in obj.authors]
+
+        return obj
+
+    # Bring a spilled object back into memory for good
+    def __load(self, otype, oid):
+        obj = self.__data[otype].get(oid)
+
+        if obj is None and (otype, oid) in self.__spill:
+            obj = self.__relink(self.__spill.take((otype, oid)))
+            self.__data[otype][oid] = obj
+            self.__admit((otype, oid), obj)
         else:
-            fhash[obj.id] = type(obj)
-            self.__data[type(obj)].append(obj)
+            self.__touch((otype, oid))
+
+        return obj
+
+    # Iterate over the objects of a type without changing what is resident: spilled objects are read as copies
+    def __view(self, otype):
+        for oid, obj in list(self.__data[otype].items()):
+            yield obj if obj is not None else self.__relink(self.__spill.peek((otype, oid)))
+
+    def usage(self):
+        resident = sum(1 for tp in self.__data.keys() for obj in self.__data[tp].values() if obj is not None)
+        quota = f'{self.quota} bytes' if self.quota else 'no quota'
+        return f'[IMemDB] Memory: {self.__usage} bytes resident in {resident} objects ({quota}); ' \
+               f'{self.__spill.count} objects spilled to disk ({self.__spill.bytes} bytes), ' \
+               f'{self.__spills} spills so far'
 
     def __fetch(self, oid: uuid.UUID, otype):
         if otype not in self.__data.keys():
             click.echo(click.style('[IMemDB] Unknown object type.', fg='red'))
             return None
         else:
-            for obj in self.__data[otype]:
-                if obj.id == oid:
-                    return obj
-
-            return None
+            return self.__load(otype, oid)
 
     def checkout_fetch(self, oid: uuid.UUID, otype, fhash: dict):
         if not self.exists_fetch(oid, otype):
@@ -96,7 +203,8 @@ class MemoryDBHandler:
         elif not self.exists_fetch(oid, otype):
             click.echo(click.style('[IMemDB] Object does not exist in memory.', fg='magenta'))
         else:
-            self.__data[otype] = list(filter(lambda x: x.id != oid, self.__data[otype]))
+            self.__forget((otype, oid))
+            del self.__data[otype][oid]
             fhash.pop(oid, None)
             click.echo(click.style('[IMemDB] Object has been scratched.', fg='green'))
 
@@ -104,17 +212,19 @@ class MemoryDBHandler:
         if click.confirm(click.style('[IMemDB] Irrecoverably scratch all unsaved stash objects?', bold=True, fg='magenta')):
             # This removes the keys. At all times, if the object is in the database, it is not in memory and viceversa
             for tp in self.__data.keys():
-                for obj in self.__data[tp]:
-                    fhash.pop(obj.id, None)
+                for oid in self.__data[tp]:
+                    fhash.pop(oid, None)
+
+                self.__forgetall(tp)
 
             # And reset the data entities
             self.__data = {
-                Author: [],
-                Article: [],
-                Annotation: [],
-                Tag: [],
-                RefFile: [],
-                Reference: []
+                Author: {},
+                Article: {},
+                Annotation: {},
+                Tag: {},
+                RefFile: {},
+                Reference: {}
             }
             click.echo('[IMemDB] All in-memory stash objects have been scratched.')
 
@@ -129,17 +239,23 @@ class MemoryDBHandler:
         else:
             if arg=='all':
                 click.echo(click.style('[IMemDB] Scratching authors', fg='blue'))
-                self.__data[Author] = []
+                self.__forgetall(Author)
+                self.__data[Author] = {}
                 click.echo(click.style('[IMemDB] Scratching articles', fg='blue'))
-                self.__data[Article] = []
+                self.__forgetall(Article)
+                self.__data[Article] = {}
                 click.echo(click.style('[IMemDB] Scratching annotations', fg='blue'))
-                self.__data[Annotation] = []
+                self.__forgetall(Annotation)
+                self.__data[Annotation] = {}
                 click.echo(click.style('[IMemDB] Scratching tags', fg='blue'))
-                self.__data[Tag] = []
+                self.__forgetall(Tag)
+                self.__data[Tag] = {}
                 click.echo(click.style('[IMemDB] Scratching files', fg='blue'))
-                self.__data[RefFile] = []
+                self.__forgetall(RefFile)
+                self.__data[RefFile] = {}
                 click.echo(click.style('[IMemDB] Scratching references', fg='blue'))
-                self.__data[Reference] = []
+                self.__forgetall(Reference)
+                self.__data[Reference] = {}
                 click.echo('\n')
             elif arg in ['authors', 'articles', 'annotations', 'tags', 'files', 'refs']:
                 __tabletotypemapper = {
@@ -153,11 +269,14 @@ class MemoryDBHandler:
 
                 click.echo(click.style(f'[IMemDB] Scratching { arg }', fg='blue'))
 
-                self.__data[__tabletotypemapper[arg]] = []
+                self.__forgetall(__tabletotypemapper[arg])
+                self.__data[__tabletotypemapper[arg]] = {}
             else:
                 click.echo(click.style(f'[IMemDB] Unrecognized entity \'{ arg }\'.', fg='magenta'))
 
     def show(self, arg):
+        click.echo(click.style(self.usage(), fg='blue'))
+
         if self.testMemEmpty():
             click.echo(click.style('[IMemDB] No pending entities in memory database', fg='blue'))
             click.echo('\n')
@@ -165,42 +284,42 @@ class MemoryDBHandler:
             if arg=='all':
                 click.echo(click.style('[IMemDB] Pending authors', fg='blue'))
 
-                for author in self.__data[Author]:
+                for author in self.__view(Author):
                     click.echo(click.style(str(author), fg='blue'))
 
                 click.echo('\n')
 
                 click.echo(click.style('[IMemDB] Pending articles', fg='blue'))
 
-                for article in self.__data[Article]:
+                for article in self.__view(Article):
                     click.echo(click.style(str(article), fg='blue'))
 
                 click.echo('\n')
 
                 click.echo(click.style('[IMemDB] Pending annotations', fg='blue'))
 
-                for annotation in self.__data[Annotation]:
+                for annotation in self.__view(Annotation):
                     click.echo(click.style(str(annotation), fg='blue'))
 
                 click.echo('\n')
 
                 click.echo(click.style('[IMemDB] Pending tags', fg='blue'))
 
-                for tag in self.__data[Tag]:
+                for tag in self.__view(Tag):
                     click.echo(click.style(str(tag), fg='blue'))
 
                 click.echo('\n')
 
                 click.echo(click.style('[IMemDB] Pending files', fg='blue'))
 
-                for reffile in self.__data[RefFile]:
+                for reffile in self.__view(RefFile):
                     click.echo(click.style(str(reffile), fg='blue'))
 
                 click.echo('\n')
 
                 click.echo(click.style('[IMemDB] Pending references', fg='blue'))
 
-                for reference in self.__data[Reference]:
+                for reference in self.__view(Reference):
                     click.echo(click.style(str(reference), fg='blue'))
 
                 click.echo('\n')
@@ -216,7 +335,7 @@ class MemoryDBHandler:
 
                 click.echo(click.style(f'[IMemDB] Pending { arg }', fg='blue'))
 
-                for entity in self.__data[__tabletotypemapper[arg]]:
+                for entity in self.__view(__tabletotypemapper[arg]):
                     click.echo(click.style(str(entity), fg='blue'))
             else:
                 click.echo(click.style(f'[IMemDB] Unrecognized entity \'{ arg }\'.', fg='magenta'))
@@ -226,44 +345,36 @@ class MemoryDBHandler:
             click.echo(click.style('[IMemDB] No pending entities in memory database to be saved', fg='blue'))
             click.echo('\n')
         else:
-            if target=='all':
-                click.echo(click.style('[IMemDB] Saving pending authors', fg='blue'))
-                for author in self.__data[Author]:
-                    dbhandler.save(author, fhash)
-
-                click.echo(click.style('[IMemDB] Saving pending articles', fg='blue'))
-                for article in self.__data[Article]:
-                    dbhandler.save(article, fhash)
-
-                click.echo(click.style('[IMemDB] Saving pending annotations', fg='blue'))
-                for annotation in self.__data[Annotation]:
-                    dbhandler.save(annotation, fhash)
-
-                click.echo(click.style('[IMemDB] Saving pending tags', fg='blue'))
-                for tag in self.__data[Tag]:
-                    dbhandler.save(tag, fhash)
-
-                click.echo(click.style('[IMemDB] Saving pending files', fg='blue'))
-                for reffile in self.__data[RefFile]:
-                    dbhandler.save(reffile, fhash)
-
-                click.echo(click.style('[IMemDB] Saving pending references', fg='blue'))
-                for reference in self.__data[Reference]:
-                    dbhandler.save(reference, fhash)
-            elif target in ['authors', 'articles', 'annotations', 'tags', 'files', 'refs']:
-                __tabletotypemapper = {
-                    'authors': Author,
-                    'articles': Article,
-                    'annotations': Annotation,
-                    'tags': Tag,
-                    'files': RefFile,
-                    'refs': Reference
-                }
-
-                click.echo(click.style(f'[IMemDB] Saving pending { target }', fg='blue'))
+            __tabletotypemapper = {
+                'authors': Author,
+                'articles': Article,
+                'annotations': Annotation,
+                'tags': Tag,
+                'files': RefFile,
+                'refs': Reference
+            }
 
-                for entity in self.__data[__tabletotypemapper[target]]:
-                    dbhandler.save(entity, fhash)
+            if target == 'all':
+                tables = list(__tabletotypemapper.keys())
+            elif target in __tabletotypemapper.keys():
+                tables = [target]
             else:
                 click.echo(click.style(f'[IMemDB] Unrecognized entity \'{ target }\'.', fg='magenta'))
+                return
+
+            def pending():
+                for tb in tables:
+                    click.echo(click.style(f'[IMemDB] Saving pending { tb }', fg='blue'))
+                    yield from self.__view(__tabletotypemapper[tb])
+
+            # The whole lot is written in a single transaction; on failure everything stays pending. Objects are
+            # handed over one at a time, so spilled ones are only reloaded while they are being written.
+            summary = dbhandler.savemany(pending(), fhash)
+
+            if summary is not None:
+                for table in tables:
+                    self.__forgetall(__tabletotypemapper[table])
+                    self.__data[__tabletotypemapper[table]] = {}
 
+                for table, count in filter(lambda x: x[1] > 0, summary.items()):
+                    click.echo(click.style(f'[IMemDB] { count } rows written to { table }', fg='blue'))
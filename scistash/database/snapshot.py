@@ -0,0 +1,180 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from pathlib import Path
+import numpy as np
+import click
+import json
+import uuid
+
+
+# Read-only columnar snapshot of articles, authors and their association, for analytics. Every column is a NumPy array:
+#
+#   article_uuid       (n, 2) uint64   uuids as (high, low) 64-bit halves, in uuid order
+#   article_year       (n,)   int32
+#   article_volume     (n,)   int32
+#   article_number     (n,)   int32
+#   article_pagstart   (n,)   int32
+#   article_pagend     (n,)   int32
+#   article_retracted  (n,)   bool
+#   author_uuid        (m, 2) uint64   as article_uuid, in uuid order
+#   article_authorptr  (n+1,) int64    CSR adjacency: the authors of article i are
+#   article_authors    (k,)   int32    article_authors[article_authorptr[i]:article_authorptr[i + 1]], in order
+#
+# A snapshot is saved as one .npy file per column and reopened memory-mapped, so reopening costs nothing up front and
+# only the pages actually scanned are read.
+class StashSnapshot:
+    version = 1
+
+    __articlecolumns = ['year', 'volume', 'number', 'pagstart', 'pagend']
+
+    def __init__(self, columns: dict):
+        self.__columns = columns
+
+    @staticmethod
+    def encode(oids):
+        # Canonical uuid text to (high, low) halves, a whole chunk at once
+        raw = bytes.fromhex(''.join(str(oid).replace('-', '') for oid in oids))
+        return np.frombuffer(raw, dtype='>u8').reshape(-1, 2).astype(np.uint64)
+
+    @staticmethod
+    def decode(halves):
+        return uuid.UUID(int=(int(halves[0]) << 64) | int(halves[1]))
+
+    # Positions of encoded uuids within a sorted uuid column, or -1 where absent
+    @staticmethod
+    def __positions(column, encoded):
+        if not len(column):
+            return np.full(len(encoded), -1, dtype=np.int64)
+
+        # Order by the high half first; equal high halves, practically never seen, are resolved on the low half
+        lo = np.searchsorted(column[:, 0], encoded[:, 0], side='left')
+        hi = np.searchsorted(column[:, 0], encoded[:, 0], side='right')
+        found = np.full(len(encoded), -1, dtype=np.int64)
+
+        single = np.nonzero(hi - lo == 1)[0]
+        match = column[lo[single], 1] == encoded[single, 1]
+        found[single[match]] = lo[single[match]]
+
+        for i in np.nonzero(hi - lo > 1)[0]:
+            run = column[lo[i]:hi[i], 1]
+            at = np.searchsorted(run, encoded[i, 1])
+
+            if at < len(run) and run[at] == encoded[i, 1]:
+                found[i] = lo[i] + at
+
+        return found
+
+    @classmethod
+    def build(cls, dbhandler):
+        narticles = dbhandler.count('articles')
+        nauthors = dbhandler.count('authors')
+        nlinks = dbhandler.count('authorsperarticle')
+
+        columns = {
+            'article_uuid': np.zeros((narticles, 2), dtype=np.uint64),
+            **{f'article_{c}': np.zeros(narticles, dtype=np.int32) for c in cls.__articlecolumns},
+            'article_retracted': np.zeros(narticles, dtype=bool),
+            'author_uuid': np.zeros((nauthors, 2), dtype=np.uint64)
+        }
+
+        at = 0
+        for rows in dbhandler.iterchunks('snapshot_articles'):
+            end = at + len(rows)
+            columns['article_uuid'][at:end] = cls.encode(r[0] for r in rows)
+            values = np.array([r[1:6] for r in rows], dtype=np.int64).reshape(-1, 5)
+
+            for i, c in enumerate(cls.__articlecolumns):
+                columns[f'article_{c}'][at:end] = values[:, i]
+
+            columns['article_retracted'][at:end] = np.array([bool(r[6]) for r in rows], dtype=bool)
+            at = end
+
+        at = 0
+        for rows in dbhandler.iterchunks('snapshot_authors'):
+            columns['author_uuid'][at:at + len(rows)] = cls.encode(r[0] for r in rows)
+            at += len(rows)
+
+        # Associations to articles or authors that no longer exist are dropped
+        owners = np.zeros(nlinks, dtype=np.int64)
+        authors = np.zeros(nlinks, dtype=np.int64)
+        at = 0
+
+        for rows in dbhandler.iterchunks('snapshot_authorsperarticle'):
+            owners[at:at + len(rows)] = cls.__positions(columns['article_uuid'], cls.encode(r[0] for r in rows))
+            authors[at:at + len(rows)] = cls.__positions(columns['author_uuid'], cls.encode(r[1] for r in rows))
+            at += len(rows)
+
+        keep = (owners >= 0) & (authors >= 0)
+        owners = owners[keep]
+        columns['article_authors'] = authors[keep].astype(np.int32)
+        columns['article_authorptr'] = np.concatenate(
+            [[0], np.cumsum(np.bincount(owners, minlength=len(columns['article_uuid'])))]).astype(np.int64)
+
+        return cls(columns)
+
+    def save(self, directory):
+        directory = Path(directory).expanduser()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        for name, column in self.__columns.items():
+            np.save(directory / f'{name}.npy', column)
+
+        (directory / 'snapshot.json').write_text(json.dumps({
+            'version': self.version,
+            'columns': sorted(self.__columns.keys()),
+            'articles': self.articles,
+            'authors': self.authors
+        }))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        directory = Path(directory).expanduser()
+
+        try:
+            meta = json.loads((directory / 'snapshot.json').read_text())
+        except (OSError, ValueError) as e:
+            click.echo(click.style(f'[Snapshot] No snapshot in {directory} ({e}).', fg='red'))
+            return None
+
+        if meta.get('version') != cls.version:
+            click.echo(click.style(f'[Snapshot] Snapshot in {directory} has an unsupported version.', fg='red'))
+            return None
+
+        return cls({name: np.load(directory / f'{name}.npy', mmap_mode='r' if mmap else None)
+                    for name in meta['columns']})
+
+    def __getitem__(self, name):
+        return self.__columns[name]
+
+    def __contains__(self, name):
+        return name in self.__columns
+
+    @property
+    def articles(self):
+        return len(self.__columns['article_uuid'])
+
+    @property
+    def authors(self):
+        return len(self.__columns['author_uuid'])
+
+    # Position of an article by id, or -1
+    def articleindex(self, oid):
+        return int(self.__positions(self.__columns['article_uuid'], self.encode([oid]))[0])
+
+    # Author positions for the article at a position
+    def authorsof(self, i: int):
+        ptr = self.__columns['article_authorptr']
+        return self.__columns['article_authors'][ptr[i]:ptr[i + 1]]
+
+    # Number of authors per article
+    def authorcounts(self):
+        return np.diff(self.__columns['article_authorptr'])
+
+    # Number of articles per author
+    def articlecounts(self):
+        return np.bincount(self.__columns['article_authors'], minlength=self.authors)
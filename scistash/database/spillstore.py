@@ -0,0 +1,61 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from pathlib import Path
+import pickle
+
+
+# Temporary on-disk store for pending objects pushed out of memory by the memory quota. Objects are pickled one per
+# file under a private temporary directory, which disappears with the store.
+class SpillStore:
+
+    def __init__(self):
+        self.__dir = None
+        self.__sizes = {}
+
+    @staticmethod
+    def __name(key):
+        otype, oid = key
+        return f'{otype.__name__}-{oid}.pkl'
+
+    def __path(self, key):
+        if self.__dir is None:
+            # The directory, and the module creating it, are only needed once something spills
+            import tempfile
+            self.__dir = tempfile.TemporaryDirectory(prefix='scistash-spill-')
+
+        return Path(self.__dir.name) / self.__name(key)
+
+    @property
+    def count(self):
+        return len(self.__sizes)
+
+    @property
+    def bytes(self):
+        return sum(self.__sizes.values())
+
+    def __contains__(self, key):
+        return key in self.__sizes
+
+    def put(self, key, obj):
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__path(key).write_bytes(data)
+        self.__sizes[key] = len(data)
+
+    # Load a copy of a spilled object, leaving it spilled
+    def peek(self, key):
+        return pickle.loads(self.__path(key).read_bytes())
+
+    # Load a spilled object and remove it from the store
+    def take(self, key):
+        obj = self.peek(key)
+        self.discard(key)
+        return obj
+
+    def discard(self, key):
+        if self.__sizes.pop(key, None) is not None:
+            self.__path(key).unlink()
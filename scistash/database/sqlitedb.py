@@ -11,12 +11,23 @@ from scistash.entities.annotation import Annotation
 from scistash.entities.tag import Tag
 from scistash.entities.rfile import RefFile
 from scistash.entities.reference import Reference
+from scistash.entities.content import BlobContent
+from scistash.database.fetchhash import LazyFetchHash, StagedFetchHash
+from scistash.database.contexthash import ContextHash
+from scistash.database.citecache import CitationCache
+from scistash.database.connections import ConnectionManager
+from scistash.bibtex.cite import formatters
 from sqlite3 import Error
 import sqlite3
 import pathlib
+import json
+import re
 import click
 import uuid
 
+# Identifiers are bound as their canonical textual form
+sqlite3.register_adapter(uuid.UUID, str)
+
 
 class SQLiteHandler:
     # SQL statements for all tables
@@ -93,15 +104,301 @@ class SQLiteHandler:
      )
      """
 
-    def __init__(self, db, dryrun, create):
+    __searchtable = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5 (
+        uuid UNINDEXED,
+        kind UNINDEXED,
+        title,
+        journal,
+        summary,
+        info,
+        content,
+        firstname,
+        lastname,
+        prefix='2 3'
+    )
+    """
+
+    __searchkeystable = """
+    CREATE TABLE IF NOT EXISTS searchkeys (
+        id integer PRIMARY KEY,
+        uuid text UNIQUE NOT NULL
+    )
+    """
+
+    # Search documents of every stored object, built from the searchable columns of each table, which the search
+    # table names alike. These index a stash stored before the search index existed, and rebuild the index of a dump.
+    __searchrebuild = [stmt for table, columns in [('authors', 'firstname, lastname'), ('articles', 'title, journal'),
+                                                   ('annotations', 'summary, info'), ('tags', 'content')]
+                       for stmt in [f'INSERT OR IGNORE INTO searchkeys (uuid) SELECT uuid FROM {table}',
+                                    f'INSERT INTO search (rowid, uuid, kind, {columns}) '
+                                    f"SELECT searchkeys.id, uuid, '{table}', {columns} FROM {table} "
+                                    f'INNER JOIN searchkeys USING (uuid)']]
+
+    # Schema migrations, applied in order on every connection. The stash records the last version applied in
+    # PRAGMA user_version, so new and existing stashes converge to the same structure.
+    __migrations = [
+        (1, 'Lookup indexes', [
+            # Decorators and annotations are constantly filtered by the object owning them. Including uuid makes each
+            # index covering for the queries that only need identifiers.
+            'CREATE INDEX IF NOT EXISTS annotations_objuuid ON annotations (objuuid, uuid)',
+            'CREATE INDEX IF NOT EXISTS tags_objuuid ON tags (objuuid, uuid)',
+            'CREATE INDEX IF NOT EXISTS files_objuuid ON files (objuuid, uuid)',
+            'CREATE INDEX IF NOT EXISTS refs_objuuid ON refs (objuuid, uuid)',
+            'CREATE INDEX IF NOT EXISTS refs_refuuid ON refs (refuuid, uuid)',
+            # Author-article associations are traversed in both directions
+            'CREATE INDEX IF NOT EXISTS authorsperarticle_artcuuid ON authorsperarticle (artcuuid, authuuid)',
+            'CREATE INDEX IF NOT EXISTS authorsperarticle_authuuid ON authorsperarticle (authuuid, artcuuid)'
+        ]),
+        (2, 'Content-addressed file store', [
+            # Each distinct content is stored once, keyed by its SHA-256 digest, and counts the files referencing it.
+            # Rows in files keep an empty content column and point to the store through their digest.
+            '''
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest text PRIMARY KEY,
+                size int NOT NULL,
+                refcount int NOT NULL,
+                content blob NOT NULL
+            )
+            ''',
+            'ALTER TABLE files ADD COLUMN digest text',
+            'CREATE INDEX IF NOT EXISTS files_digest ON files (digest)'
+        ]),
+        (3, 'Full-text search index', [
+            # One document per searchable object. Prefix indexes keep prefix queries interactive.
+            __searchtable
+        ]),
+        (4, 'Search keys', [
+            # Documents are keyed on the full object id: its key here is the rowid of the document, so documents can be
+            # replaced and removed without scanning the index. Documents keyed otherwise are indexed again.
+            __searchkeystable,
+            'DELETE FROM search'
+        ])
+    ]
+
+    # Named statements. Every value is bound through '?' placeholders, so the text of each statement never changes
+    # and SQLite can reuse its prepared form from the connection's statement cache. Table names cannot be bound, hence
+    # one entry per table where needed.
+    __statements = {
+        # Inserts
+        'insert_authors': 'INSERT INTO authors VALUES (?, ?, ?)',
+        'insert_articles': 'INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        'insert_annotations': 'INSERT INTO annotations VALUES (?, ?, ?, ?, ?)',
+        'insert_authorsperarticle': 'INSERT INTO authorsperarticle VALUES (?, ?)',
+        'insert_tags': 'INSERT INTO tags VALUES (?, ?, ?, ?)',
+        'insert_files': 'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, zeroblob(0), ?)',
+        'insert_refs': 'INSERT INTO refs VALUES (?, ?, ?, ?)',
+        # Batches nest inside a transaction, opened explicitly when none is: a savepoint outside of one would itself be
+        # the transaction, and releasing it would commit
+        'begin_transaction': 'BEGIN',
+        'begin_batch': 'SAVEPOINT batch',
+        'release_batch': 'RELEASE batch',
+        'rollback_batch': 'ROLLBACK TO batch',
+        # Lookups by primary key
+        **{f'exists_{t}': f'SELECT uuid FROM {t} WHERE uuid=?'
+           for t in ['authors', 'articles', 'annotations', 'tags', 'files', 'refs']},
+        **{f'fetch_{t}': f'SELECT * FROM {t} WHERE uuid=?'
+           for t in ['authors', 'articles', 'annotations', 'tags', 'refs']},
+        'fetch_files': '''
+            SELECT blobs.rowid, blobs.digest, files.uuid, files.objuuid, files.objclass, files.fname, files.ftype,
+                   files.descr, files.fsize
+            FROM files LEFT JOIN blobs ON blobs.digest = files.digest WHERE files.uuid=?
+            ''',
+        # Full-text search
+        'insertkey_search': 'INSERT OR IGNORE INTO searchkeys (uuid) VALUES (?)',
+        'insert_search': '''
+            INSERT INTO search (rowid, uuid, kind, title, journal, summary, info, content, firstname, lastname)
+            VALUES ((SELECT id FROM searchkeys WHERE uuid=?), ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+        'delete_search': 'DELETE FROM search WHERE rowid = (SELECT id FROM searchkeys WHERE uuid=?)',
+        'deletekey_search': 'DELETE FROM searchkeys WHERE uuid=?',
+        'find_search': '''
+            SELECT uuid, kind FROM search WHERE search MATCH ? AND kind = ? ORDER BY bm25(search) LIMIT ?
+            ''',
+        'findall_search': 'SELECT uuid, kind FROM search WHERE search MATCH ? ORDER BY bm25(search) LIMIT ?',
+        # Completion takes the first matches as they come: ranking them all would cost as much as there are matches
+        'complete_search': 'SELECT uuid, kind FROM search WHERE search MATCH ? LIMIT ?',
+        'prefix_search': '''
+            SELECT searchkeys.uuid, search.kind FROM searchkeys INNER JOIN search ON search.rowid = searchkeys.id
+            WHERE searchkeys.uuid >= ? AND searchkeys.uuid < ? ORDER BY searchkeys.uuid LIMIT ?
+            ''',
+        # Content-addressed store. New content is streamed into the blob reserved with zeroblob.
+        'insert_blobs': 'INSERT INTO blobs VALUES (?, ?, 1, zeroblob(?))',
+        'acquire_blobs': 'UPDATE blobs SET refcount = refcount + 1 WHERE digest=?',
+        'release_blobs': 'UPDATE blobs SET refcount = refcount - 1 WHERE digest=?',
+        'collect_blobs': 'DELETE FROM blobs WHERE digest=? AND refcount <= 0',
+        'digest_files': 'SELECT digest FROM files WHERE uuid=?',
+        'owneddigests_files': 'SELECT digest FROM files WHERE objuuid=?',
+        'unstored_files': 'SELECT rowid, fsize FROM files WHERE digest IS NULL',
+        'setdigest_files': 'UPDATE files SET digest=?, content=zeroblob(0) WHERE rowid=?',
+        **{f'delete_{t}': f'DELETE FROM {t} WHERE uuid=?'
+           for t in ['authors', 'articles', 'annotations', 'tags', 'files', 'refs']},
+        # Objects owned by another object
+        **{f'owned_{t}': f'SELECT uuid FROM {t} WHERE objuuid=?'
+           for t in ['annotations', 'tags', 'files', 'refs']},
+        **{f'deleteowned_{t}': f'DELETE FROM {t} WHERE objuuid=?'
+           for t in ['tags', 'files', 'refs']},
+        **{f'reown_{t}': f'UPDATE {t} SET objuuid=? WHERE objuuid=?'
+           for t in ['annotations', 'tags', 'files', 'refs']},
+        'deletereferring_refs': 'DELETE FROM refs WHERE refuuid=?',
+        # Author-article associations
+        'deletebyauthor_authorsperarticle': 'DELETE FROM authorsperarticle WHERE authuuid=?',
+        'deletebyarticle_authorsperarticle': 'DELETE FROM authorsperarticle WHERE artcuuid=?',
+        'authorsof_articles': '''
+            SELECT authors.uuid, authors.firstname, authors.lastname FROM authors
+            INNER JOIN authorsperarticle ON authors.uuid = authorsperarticle.authuuid
+            WHERE authorsperarticle.artcuuid=?
+            ORDER BY authorsperarticle.rowid
+            ''',
+        # Whole tables, with everything needed to render each row resolved by the same statement. Owners are joined
+        # according to their class, and the authors of an article are gathered by a correlated subquery over the
+        # association index, so the scan order of each table is preserved. Files never pull their blobs.
+        'list_authors': 'SELECT uuid, firstname, lastname FROM authors',
+        # Articles with their authors, one row per author in the order they were given, grouped by article. The
+        # articles are walked in key order and only the authors of one article at a time need sorting.
+        'dump_articles': '''
+            SELECT articles.*, authors.firstname, authors.lastname FROM articles
+            LEFT JOIN authorsperarticle ON authorsperarticle.artcuuid = articles.uuid
+            LEFT JOIN authors ON authors.uuid = authorsperarticle.authuuid
+            ORDER BY articles.uuid, authorsperarticle.rowid
+            ''',
+        # Everything a dump recreates, tables first, in the order they were created. The search index and internal
+        # tables are left out: a dump rebuilds the index instead.
+        'dump_schema': '''
+            SELECT type, name, sql FROM sqlite_master
+            WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite!_%' ESCAPE '!'
+              AND tbl_name NOT IN ('search', 'searchkeys') AND tbl_name NOT LIKE 'search!_%' ESCAPE '!'
+            ORDER BY type != 'table', rowid
+            ''',
+        'cite_articles': '''
+            SELECT articles.*, authors.firstname, authors.lastname FROM articles
+            LEFT JOIN authorsperarticle ON authorsperarticle.artcuuid = articles.uuid
+            LEFT JOIN authors ON authors.uuid = authorsperarticle.authuuid
+            WHERE articles.uuid IN (SELECT value FROM json_each(?))
+            ORDER BY articles.uuid, authorsperarticle.rowid
+            ''',
+        # Reference keys out of a JSON list that articles already hold
+        'held_refkeys': 'SELECT refkey FROM articles WHERE refkey IN (SELECT value FROM json_each(?))',
+        # Authors are concatenated in the order they were given, which the ordered subquery feeds to group_concat
+        'list_articles': '''
+            SELECT articles.*, (
+                SELECT group_concat(lastname, ' ,') FROM (
+                    SELECT authors.lastname FROM authorsperarticle
+                    INNER JOIN authors ON authors.uuid = authorsperarticle.authuuid
+                    WHERE authorsperarticle.artcuuid = articles.uuid
+                    ORDER BY authorsperarticle.rowid
+                )
+            ) FROM articles
+            ''',
+        'list_annotations': '''
+            SELECT annotations.uuid, annotations.objuuid, annotations.objclass, annotations.summary,
+                   authors.firstname, authors.lastname,
+                   articles.year, articles.title, articles.journal
+            FROM annotations
+            LEFT JOIN authors ON annotations.objclass = 'author' AND authors.uuid = annotations.objuuid
+            LEFT JOIN articles ON annotations.objclass = 'article' AND articles.uuid = annotations.objuuid
+            ''',
+        **{f'list_{t}': f'''
+            SELECT {t}.uuid, {t}.objuuid, {t}.objclass, {columns},
+                   authors.firstname, authors.lastname,
+                   articles.year, articles.title, articles.journal,
+                   owner.objuuid, owner.objclass, owner.summary
+            FROM {t}
+            LEFT JOIN authors ON {t}.objclass = 'author' AND authors.uuid = {t}.objuuid
+            LEFT JOIN articles ON {t}.objclass = 'article' AND articles.uuid = {t}.objuuid
+            LEFT JOIN annotations AS owner ON {t}.objclass = 'annotations' AND owner.uuid = {t}.objuuid
+            ''' for t, columns in [('tags', 'tags.content'),
+                                   ('files', 'files.fname, files.ftype, files.descr, files.fsize')]},
+        'list_refs': '''
+            SELECT refs.uuid, refs.objuuid, refs.objclass, refs.refuuid,
+                   target.uuid, target.year, target.title, target.journal,
+                   authors.firstname, authors.lastname,
+                   articles.year, articles.title, articles.journal,
+                   owner.objuuid, owner.objclass, owner.summary
+            FROM refs
+            LEFT JOIN articles AS target ON target.uuid = refs.refuuid
+            LEFT JOIN authors ON refs.objclass = 'author' AND authors.uuid = refs.objuuid
+            LEFT JOIN articles ON refs.objclass = 'article' AND articles.uuid = refs.objuuid
+            LEFT JOIN annotations AS owner ON refs.objclass = 'annotations' AND owner.uuid = refs.objuuid
+            ''',
+        **{f'ids_{t}': f'SELECT DISTINCT uuid FROM {t}'
+           for t in ['authors', 'articles', 'annotations', 'tags', 'files', 'refs']},
+        # Id-to-table resolution, one primary key lookup per table
+        'resolve_table': ' UNION ALL '.join(f"SELECT '{t}' FROM {t} WHERE uuid=?1"
+                                            for t in ['authors', 'articles', 'annotations', 'tags', 'files', 'refs'])
+                         + ' LIMIT 1',
+        'count_ids': 'SELECT ' + ' + '.join(f'(SELECT count(*) FROM {t})'
+                                            for t in ['authors', 'articles', 'annotations', 'tags', 'files', 'refs']),
+        # Numeric columns for snapshots, in key order
+        'snapshot_articles': '''
+            SELECT uuid, year, volume, numb, pagstart, pagend, retracted FROM articles ORDER BY uuid
+            ''',
+        'snapshot_authors': 'SELECT uuid FROM authors ORDER BY uuid',
+        'snapshot_authorsperarticle': 'SELECT artcuuid, authuuid FROM authorsperarticle ORDER BY artcuuid, rowid',
+        **{f'count_{t}': f'SELECT count(*) FROM {t}'
+           for t in ['authors', 'articles', 'authorsperarticle', 'annotations', 'tags', 'files', 'refs']},
+        # Aggregates for statistics; every one of them is a single pass answered inside SQLite
+        'stats_counts': 'SELECT ' + ', '.join(f"(SELECT count(*) FROM {t})"
+                                              for t in ['authors', 'articles', 'authorsperarticle', 'annotations',
+                                                        'tags', 'files', 'refs', 'blobs']),
+        'stats_years': 'SELECT year, count(*) FROM articles GROUP BY year ORDER BY year',
+        'stats_retracted': 'SELECT count(*), coalesce(sum(retracted != 0), 0) FROM articles',
+        'stats_topauthors': '''
+            SELECT authors.firstname, authors.lastname, top.articles FROM (
+                SELECT authuuid, count(*) AS articles FROM authorsperarticle
+                GROUP BY authuuid ORDER BY articles DESC LIMIT ?
+            ) AS top
+            INNER JOIN authors ON authors.uuid = top.authuuid
+            ORDER BY top.articles DESC
+            ''',
+        'stats_coauthors': '''
+            SELECT count(DISTINCT other.authuuid) FROM authorsperarticle AS self
+            INNER JOIN authorsperarticle AS other
+                ON other.artcuuid = self.artcuuid AND other.authuuid != self.authuuid
+            GROUP BY self.authuuid
+            ''',
+        'stats_filesizes': 'SELECT fsize FROM files',
+        'stats_blobbytes': 'SELECT coalesce(sum(size), 0) FROM blobs',
+        # Decorators whose owner is gone from every table that may own them, and associations missing an end
+        'stats_orphans': 'SELECT ' + ', '.join(f'''(
+                SELECT count(*) FROM {t} WHERE NOT EXISTS (SELECT 1 FROM authors WHERE uuid = {t}.objuuid)
+                    AND NOT EXISTS (SELECT 1 FROM articles WHERE uuid = {t}.objuuid)
+                    {'' if t == 'annotations' else
+                     f'AND NOT EXISTS (SELECT 1 FROM annotations WHERE uuid = {t}.objuuid)'}
+            )''' for t in ['annotations', 'tags', 'files', 'refs']) + ''',
+            (SELECT count(*) FROM refs WHERE NOT EXISTS (SELECT 1 FROM articles WHERE uuid = refs.refuuid)),
+            (SELECT count(*) FROM authorsperarticle
+                WHERE NOT EXISTS (SELECT 1 FROM articles WHERE uuid = authorsperarticle.artcuuid)
+                   OR NOT EXISTS (SELECT 1 FROM authors WHERE uuid = authorsperarticle.authuuid))
+            '''
+    }
+
+    # Number of rows pulled per round trip when streaming a whole table
+    __fetchchunk = 512
+
+    # Number of rows per chunk handed out whole, for vectorized consumers
+    __chunkrows = 65536
+
+    # Size of the per-connection prepared statement cache; comfortably above the number of named statements
+    __statementcache = 256
+
+    # Connections are split between a single writer and pooled read-only readers; see ConnectionManager. Long scans
+    # (listings, labels, dumps, snapshots) run on readers, so they neither wait for nor hold back writes.
+    def __init__(self, db, dryrun, create, profile='default'):
+        self.__connections = None
         self.__conn = None
         self.__cursor = None
         self.__dryrun = dryrun
+        self.__cntxhash = None
+        self.__heldlabels = None
+        self.__citations = CitationCache()
+        self.__deferred = False
 
         if create:
             try:
                 click.echo('[SQLite] Attempting to create new stash...')
-                self.__conn = sqlite3.connect(db)
+                self.__connections = ConnectionManager(db, profile, statementcache=self.__statementcache)
+                self.__conn = self.__connections.writer
                 self.__cursor = self.__conn.cursor()
                 click.echo('[SQLite] Stash created successfully...')
                 click.echo('[SQLite] Attempting to initialize stash structure...')
@@ -116,6 +413,8 @@ class SQLiteHandler:
                     self.__cursor.execute(strc)
                     click.echo('    {0}...'.format(name))
 
+                self.__migrate()
+
             except Error as e:
                 click.echo(click.style('[SQLite] Stash could not be created ({0}).'.format(e), fg='red'))
         else:
@@ -124,9 +423,11 @@ class SQLiteHandler:
             click.echo('[SQLite] Attempting to connect to existing stash file: \x1b[1m{0}\x1b[0m ...'.format(db))
             if pathlib.Path(db).exists():
                 try:
-                    self.__conn = sqlite3.connect(db)
+                    self.__connections = ConnectionManager(db, profile, statementcache=self.__statementcache)
+                    self.__conn = self.__connections.writer
                     self.__cursor = self.__conn.cursor()
                     click.echo('[SQLite] Connected to existing stash.')
+                    self.__migrate()
 
                 except Error as e:
                     click.echo(click.style('[SQLite] Error connecting to the stash ({0}).'.format(e), fg='red'))
@@ -134,13 +435,75 @@ class SQLiteHandler:
                 click.echo(click.style('[SQLite] Stash does not exist.', fg='red'))
                 quit()
 
-    def close(self):
+    def __migrate(self):
+        self.__cursor.execute('PRAGMA user_version')
+        version, = self.__cursor.fetchone()
+
+        for target, name, statements in self.__migrations:
+            if target > version:
+                click.echo('[SQLite] Migrating stash structure to version {0} ({1})...'.format(target, name))
+
+                for stmt in statements:
+                    self.__cursor.execute(stmt)
+
+                if target in self.__migrationhooks:
+                    self.__migrationhooks[target](self)
+
+                # Pragmas cannot be bound; the version is one of our own integers
+                self.__cursor.execute(f'PRAGMA user_version = {target}')
+                self.__conn.commit()
+
+    # Without commit, whatever is still pending is rolled back instead
+    def close(self, commit=True):
         if self.__conn is None:
             click.echo(click.style('[SQLite] No need to close stash.', fg='magenta'))
         else:
             click.echo("[SQLite] Closing database...")
-            self.__conn.commit()
-            self.__conn.close()
+
+            # A background build still reading the stash stops first
+            if self.__cntxhash is not None:
+                self.__cntxhash.stop()
+
+            self.__connections.close(commit)
+
+    # Whether a transaction had to be opened
+    def __begin(self):
+        if self.__conn.in_transaction:
+            return False
+
+        self.__execute('begin_transaction')
+        return True
+
+    # While commits are deferred, a transaction is kept open, batches are released into it and only commit() ends it,
+    # so that a whole script runs as one transaction
+    def defercommits(self, defer=True):
+        self.__deferred = defer
+
+        if defer and self.__conn is not None:
+            self.__begin()
+
+    def commit(self):
+        if self.__conn is not None:
+            self.__connections.commit()
+
+            if self.__deferred:
+                self.__begin()
+
+    def rollback(self):
+        if self.__conn is not None:
+            self.__conn.rollback()
+
+            if self.__deferred:
+                self.__begin()
+
+    # Statements on the hot paths of deletion, re-owning and listing, reported by explain
+    __hotstatements = ['exists_authors', 'owned_annotations', 'owned_tags', 'owned_files', 'owned_refs',
+                       'deleteowned_tags', 'deleteowned_files', 'deleteowned_refs', 'deletereferring_refs',
+                       'reown_tags', 'authorsof_articles', 'deletebyauthor_authorsperarticle',
+                       'deletebyarticle_authorsperarticle']
+
+    def __execute(self, name: str, params=()):
+        return self.__cursor.execute(self.__statements[name], params)
 
     # Functions to convert from tuples to simple objects (no nesting)
     # We define these first to have the function maps ready
@@ -150,10 +513,14 @@ class SQLiteHandler:
         author = Author(fn, ln, True)
         return author
 
-    @staticmethod
-    def __tupletoarticle(tp):
+    # Articles come with their authors, in order, since their ids depend on them
+    def __tupletoarticle(self, tp):
         lid, rk, yy, tt, jj, vl, nm, ps, pe, rt = tp
-        return Article(rk, None, tt, yy, jj, vl, nm, (ps, pe), rt)
+        cursor = self.__conn.cursor()
+        authors = [self.__tupletoauthor(row) for row in
+                   cursor.execute(self.__statements['authorsof_articles'], (lid,)).fetchall()]
+        cursor.close()
+        return Article(rk, authors, tt, yy, jj, vl, nm, (ps, pe), bool(rt), True)
 
     @staticmethod
     def __tupletoannotation(tp):
@@ -165,12 +532,11 @@ class SQLiteHandler:
         lid, oid, ocls, cnt = tp
         return Tag(oid, ocls, cnt, True)
 
-    # This includes the blob
-    # TODO: in future versions, depending on the size of objects, a total memory quota is needed as a macro parameter
-    @staticmethod
-    def __tupletofile(tp):
-        lid, oid, ocls, fn, ft, ds, fs, cn = tp
-        return RefFile(oid, ocls, fn, ft, ds, fs, cn, True)
+    # The blob is not pulled: the file gets a handle that reads it from the store through incremental blob I/O
+    def __tupletofile(self, tp):
+        rowid, dg, lid, oid, ocls, fn, ft, ds, fs = tp
+        return RefFile(oid, ocls, pathlib.Path(fn), ft, ds, fs,
+                       BlobContent(self.__conn, 'blobs', 'content', rowid, fs, dg), True)
 
     @staticmethod
     def __tupletoref(tp):
@@ -180,12 +546,19 @@ class SQLiteHandler:
     # Helper function to remove tags, files and references
     def __deletedecorators(self, did: uuid.UUID, fhash: dict):
         # Remove decorators from the dictionary
+        self.__execute('owneddigests_files', (did,))
+
+        for dg, in self.__cursor.fetchall():
+            self.__releaseblob(dg)
+
         for table in ['tags', 'files', 'refs']:
-            self.__cursor.execute(f'SELECT uuid FROM {table} WHERE objuuid=\"{did}\"')
+            self.__execute(f'owned_{table}', (did,))
             for t in self.__cursor.fetchall():
-                fhash.pop(uuid.UUID(t), None)
+                fhash.pop(uuid.UUID(t[0]), None)
+                self.__unlabel(uuid.UUID(t[0]))
+                self.__unindex(uuid.UUID(t[0]))
 
-            self.__cursor.execute(f'DELETE FROM {table} WHERE objuuid=\"{did}\"')
+            self.__execute(f'deleteowned_{table}', (did,))
 
     def __deleteauthor(self, did: uuid.UUID, fhash: dict):
         if did is None:
@@ -196,21 +569,24 @@ class SQLiteHandler:
             else:
                 if click.confirm('Do you wish to delete referenced objects for this author? ', default=False):
                     # Find all annotations and delete their decorators
-                    self.__cursor.execute(f'SELECT uuid FROM annotations WHERE objuuid=\"{did}\"')
+                    self.__execute('owned_annotations', (did,))
                     annots = self.__cursor.fetchall()
                     # This takes care of all decorators with first degree of indirection
-                    for aid in annots:
+                    for aid, in annots:
                         self.__deletedecorators(aid, fhash)
                     # Delete all the author's decorators
                     self.__deletedecorators(did, fhash)
                     # Delete the author-article association
 
                 if click.confirm('Do you wish to remove the association to existing articles?', default=False):
-                    self.__cursor.execute(f'DELETE FROM authorsperarticle WHERE authuuid=\"{did}\"')
+                    self.__execute('deletebyauthor_authorsperarticle', (did,))
 
                 # Finally, delete the author
-                self.__cursor.execute(f'DELETE FROM authors where uuid=\"{did}\"')
+                self.__execute('delete_authors', (did,))
                 fhash.pop(did, None)
+                self.__unlabel(did)
+                self.__unindex(did)
+                self.__citations.clear()
 
     def __deletearticle(self, did: uuid.UUID, fhash: dict):
         if did is None:
@@ -221,23 +597,26 @@ class SQLiteHandler:
             else:
                 if click.confirm('Do you wish to delete referenced objects for this article? ', default=False):
                     # Find all annotations and delete their decorators
-                    self.__cursor.execute(f'SELECT uuid FROM annotations WHERE objuuid=\"{did}\"')
+                    self.__execute('owned_annotations', (did,))
                     annots = self.__cursor.fetchall()
                     # This takes care of all decorators with first degree of indirection
-                    for aid in annots:
+                    for aid, in annots:
                         self.__deletedecorators(aid, fhash)
                     # We also need to take care of refuuids in references
-                    self.__cursor.execute(f'DELETE FROM refs WHERE refuuid=\"{did}\"')
+                    self.__execute('deletereferring_refs', (did,))
                     # Delete all the author's decorators
                     self.__deletedecorators(did, fhash)
                     # Delete the author-article association
 
                 if click.confirm('Do you wish to remove the association to existing authors?', default=False):
-                    self.__cursor.execute(f'DELETE FROM authorsperarticle WHERE artuuid=\"{did}\"')
+                    self.__execute('deletebyarticle_authorsperarticle', (did,))
 
                 # Finally, delete the article
-                self.__cursor.execute(f'DELETE FROM articles where uuid=\"{did}\"')
+                self.__execute('delete_articles', (did,))
                 fhash.pop(did, None)
+                self.__unlabel(did)
+                self.__unindex(did)
+                self.__citations.discard(did)
 
     def __deleteannotation(self, did: uuid.UUID, fhash: dict):
         if did is None:
@@ -251,29 +630,177 @@ class SQLiteHandler:
                     # Delete the author-article association
 
                 # Finally, delete the annotation
-                self.__cursor.execute(f'DELETE FROM annotations where uuid=\"{did}"')
+                self.__execute('delete_annotations', (did,))
                 fhash.pop(did, None)
+                self.__unlabel(did)
+                self.__unindex(did)
 
     def __deletetag(self, did: uuid.UUID, fhash: dict):
         if did is None:
             click.echo(click.style('[SQLite] Cannot delete null tag id.', fg='red'))
         else:
-            self.__cursor.execute(f'DELETE FROM tags WHERE uuid=\"{did}\"')
+            self.__execute('delete_tags', (did,))
             fhash.pop(did, None)
+            self.__unlabel(did)
+            self.__unindex(did)
 
     def __deletefile(self, did: uuid.UUID, fhash: dict):
-        if id is None:
+        if did is None:
             click.echo(click.style('[SQLite] Cannot delete null file id.', fg='red'))
         else:
-            self.__cursor.execute(f'DELETE FROM files WHERE uuid=\"{did}\"')
+            self.__execute('digest_files', (did,))
+            data = self.__cursor.fetchone()
+
+            if data:
+                self.__releaseblob(data[0])
+
+            self.__execute('delete_files', (did,))
             fhash.pop(did, None)
+            self.__unlabel(did)
+            self.__unindex(did)
 
     def __deleteref(self, did: uuid.UUID, fhash: dict):
-        if id is None:
+        if did is None:
             click.echo(click.style('[SQLite] Cannot delete null reference id.', fg='red'))
         else:
-            self.__cursor.execute(f'DELETE FROM refs WHERE uuid=\"{did}\"')
+            self.__execute('delete_refs', (did,))
             fhash.pop(did, None)
+            self.__unlabel(did)
+            self.__unindex(did)
+
+    # Move every object owned by a prior id to its new id
+    def __reown(self, tables: list, newid: uuid.UUID, priorid: uuid.UUID):
+        for table in tables:
+            self.__execute(f'reown_{table}', (newid, priorid))
+
+    # Functions to convert from simple objects to the tuples bound to insert statements
+    @staticmethod
+    def __authortotuple(obj: Author):
+        return obj.id, obj.firstname, obj.lastname
+
+    @staticmethod
+    def __articletotuple(obj: Article):
+        return obj.id, obj.refkey, obj.year, obj.title, obj.journal, obj.volume, obj.number, obj.pages[0], \
+               obj.pages[1], obj.retracted
+
+    @staticmethod
+    def __annotationtotuple(obj: Annotation):
+        return obj.id, obj.objuuid, obj.objcls, obj.summary, obj.info
+
+    @staticmethod
+    def __tagtotuple(obj: Tag):
+        return obj.id, obj.objid, obj.objcls, obj.content
+
+    @staticmethod
+    def __filetotuple(obj: RefFile):
+        return obj.id, obj.objid, obj.objcls, obj.fname, obj.ftype, obj.desc, obj.content.size, obj.content.digest()
+
+    @staticmethod
+    def __reftotuple(obj: Reference):
+        return obj.id, obj.objid, obj.objcls, obj.content
+
+    # Stream content into a blob reserved with zeroblob, one chunk at a time
+    def __writeblob(self, table: str, column: str, rowid: int, content):
+        if content.size:
+            with self.__conn.blobopen(table, column, rowid) as blob:
+                for chunk in content.chunks():
+                    blob.write(chunk)
+
+    # Reference content in the store. Known content only gains a reference; new content is streamed in once.
+    def __storeblob(self, content):
+        self.__execute('acquire_blobs', (content.digest(),))
+
+        if self.__cursor.rowcount == 0:
+            self.__execute('insert_blobs', (content.digest(), content.size, content.size))
+            self.__writeblob('blobs', 'content', self.__cursor.lastrowid, content)
+
+    # Drop a reference to stored content, and the content itself once nothing references it
+    def __releaseblob(self, digest: str):
+        if digest is not None:
+            self.__execute('release_blobs', (digest,))
+            self.__execute('collect_blobs', (digest,))
+
+    # Migration hook: move the content of files saved before the store existed into the store
+    def __backfillblobs(self):
+        self.__execute('unstored_files')
+
+        for rowid, fsize in self.__cursor.fetchall():
+            content = BlobContent(self.__conn, 'files', 'content', rowid, fsize)
+            self.__storeblob(content)
+            self.__execute('setdigest_files', (content.digest(), rowid))
+
+    # Search documents. Only authors, articles, annotations and tags are searchable. A document starts with the key
+    # of its object twice: once to find its rowid in searchkeys, once as its uuid column.
+    @staticmethod
+    def __searchkey(oid):
+        return str(oid if isinstance(oid, uuid.UUID) else uuid.UUID(str(oid)))
+
+    @staticmethod
+    def __searchtuple(table: str, tp):
+        if table == 'authors':
+            oid, fn, ln = tp
+            key = SQLiteHandler.__searchkey(oid)
+            return key, key, table, None, None, None, None, None, fn, ln
+        elif table == 'articles':
+            oid, tt, jj = tp
+            key = SQLiteHandler.__searchkey(oid)
+            return key, key, table, tt, jj, None, None, None, None, None
+        elif table == 'annotations':
+            oid, sm, ifo = tp
+            key = SQLiteHandler.__searchkey(oid)
+            return key, key, table, None, None, sm, ifo, None, None, None
+        elif table == 'tags':
+            oid, cnt = tp
+            key = SQLiteHandler.__searchkey(oid)
+            return key, key, table, None, None, None, None, cnt, None, None
+        else:
+            return None
+
+    @staticmethod
+    def __objecttosearchtuple(obj):
+        if type(obj) is Author:
+            return SQLiteHandler.__searchtuple('authors', (obj.id, obj.firstname, obj.lastname))
+        elif type(obj) is Article:
+            return SQLiteHandler.__searchtuple('articles', (obj.id, obj.title, obj.journal))
+        elif type(obj) is Annotation:
+            return SQLiteHandler.__searchtuple('annotations', (obj.id, obj.summary, obj.info))
+        elif type(obj) is Tag:
+            return SQLiteHandler.__searchtuple('tags', (obj.id, obj.content))
+        else:
+            return None
+
+    # New documents only: an object already indexed under the same key is a conflict, never silently replaced
+    def __insertsearch(self, docs):
+        docs = list(docs)
+        self.__cursor.executemany(self.__statements['insertkey_search'], [doc[:1] for doc in docs])
+        self.__cursor.executemany(self.__statements['insert_search'], docs)
+
+    def __index(self, obj):
+        doc = self.__objecttosearchtuple(obj)
+
+        if doc is not None:
+            self.__execute('delete_search', doc[:1])
+            self.__insertsearch([doc])
+
+    def __unindex(self, oid):
+        try:
+            key = self.__searchkey(oid)
+        except ValueError:
+            return
+
+        self.__execute('delete_search', (key,))
+        self.__execute('deletekey_search', (key,))
+
+    # Migration hook: index everything stored before the search index existed
+    def __backfillsearch(self):
+        for stmt in self.__searchrebuild:
+            self.__cursor.execute(stmt)
+
+    # Callables run after the statements of a migration, keyed by version
+    __migrationhooks = {
+        2: __backfillblobs,
+        4: __backfillsearch
+    }
 
     # We use these functions to both create or edit database records
     def __authortorow(self, obj: Author, fhash: dict):
@@ -282,64 +809,64 @@ class SQLiteHandler:
             self.__deleteinternal(obj.priorid, Author, fhash)
             # Update existing annotations and decorators
             # Todo: this breaks the consistency element of ids. Need to check later.
-            self.__cursor.execute(f'UPDATE annotations SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE tags SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE files SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE refs SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
+            self.__reown(['annotations', 'tags', 'files', 'refs'], obj.id, obj.priorid)
 
-        self.__cursor.execute(f'INSERT INTO authors VALUES (\"{obj.id}\", \"{obj.firstname}\", \"{obj.lastname}\")')
+        self.__execute('insert_authors', self.__authortotuple(obj))
         fhash[obj.id] = Author
+        self.__relabel(obj.id, 'authors')
+        self.__index(obj)
 
     def __articletorow(self, obj: Article, fhash: dict):
         if obj.priorid is not None:
             # Delete the prior id before modification, including author-article ties, insert the new one
             self.__deleteinternal(obj.priorid, Article, fhash)
-            self.__cursor.execute(f'DELETE FROM authorsperarticle WHERE artuuid=\"{obj.priorid}\"')
+            self.__execute('deletebyarticle_authorsperarticle', (obj.priorid,))
             # Update existing annotations and decorators
-            self.__cursor.execute(f'UPDATE annotations SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE tags SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE files SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE refs SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
+            self.__reown(['annotations', 'tags', 'files', 'refs'], obj.id, obj.priorid)
 
         # Insert one row per article
-        self.__cursor.execute(
-            f'INSERT INTO articles VALUES (\"{obj.id}\", \"{obj.refkey}\", \"{obj.title}\", \"{obj.journal}\", {obj.volume}, {obj.number}, {obj.pages[0]}, {obj.pages[1]}, {obj.retracted})')
+        self.__execute('insert_articles', self.__articletotuple(obj))
         fhash[obj.id] = Article
 
         # Insert authors and update article-authors references if new
         for auth in obj.authors:
             if not self.exists(auth):
                 self.__authortorow(auth, fhash)
-            self.__cursor.execute(f'INSERT INTO authorsperarticle VALUES (\"{obj.id}\", \"{auth.id})\"')
+            self.__execute('insert_authorsperarticle', (obj.id, auth.id))
+
+        # The label lists the authors, so it can only be rendered once they are tied to the article
+        self.__relabel(obj.id, 'articles')
+        self.__index(obj)
 
     def __annotationtorow(self, obj: Annotation, fhash: dict):
         if obj.priorid is not None:
             # Delete the prior id before modification, including annotation-object ties, insert the new one
             self.__deleteinternal(obj.priorid, Annotation, fhash)
-            self.__cursor.execute(f'DELETE FROM annotations WHERE artuuid=\"{obj.priorid}\"')
             # Update existing decorators
-            self.__cursor.execute(f'UPDATE tags SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE files SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
-            self.__cursor.execute(f'UPDATE refs SET objid=\"{obj.id}\" WHERE objid=\"{obj.priorid}\"')
+            self.__reown(['tags', 'files', 'refs'], obj.id, obj.priorid)
 
         # Insert one row per annotation
-        self.__cursor.execute(
-            f'INSERT INTO annotations VALUES (\"{obj.id}\", \"{obj.objuuid}\", {obj.objcls}, \"{obj.summary}\", \"{obj.info}\")')
+        self.__execute('insert_annotations', self.__annotationtotuple(obj))
         fhash[obj.id] = Annotation
+        self.__relabel(obj.id, 'annotations')
+        self.__index(obj)
 
     def __tagtorow(self, obj: Tag, fhash: dict):
-        self.__cursor.execute(
-            f'INSERT INTO tags VALUES (\"{obj.id}\", \"{obj.objid}\", {obj.objcls}, \"{obj.content}\")')
+        self.__execute('insert_tags', self.__tagtotuple(obj))
         fhash[obj.id] = Tag
+        self.__relabel(obj.id, 'tags')
+        self.__index(obj)
 
     def __filetorow(self, obj: RefFile, fhash: dict):
-        self.__cursor.execute(
-            f'INSERT INTO tags VALUES (\"{obj.id}\", \"{obj.objid}\", \"{obj.objcls}\", \"{obj.fname}\", \"{obj.ftype}\", \"{obj.desc}\", \"{obj.desc}\", {obj.fsize}, {sqlite3.Binary(obj.content)})')
+        self.__storeblob(obj.content)
+        self.__execute('insert_files', self.__filetotuple(obj))
         fhash[obj.id] = RefFile
+        self.__relabel(obj.id, 'files')
 
     def __reftorow(self, obj: Reference, fhash: dict):
-        self.__cursor.execute(f'INSERT INTO refs VALUES ({obj.id}, {obj.objid}, {obj.objcls}, {obj.content})')
+        self.__execute('insert_refs', self.__reftotuple(obj))
         fhash[obj.id] = Reference
+        self.__relabel(obj.id, 'refs')
 
     # Type-to-table mapping
     __typetotablemap = {
@@ -366,7 +893,8 @@ class SQLiteHandler:
     # All commands here are constructive blocks later to be used by the dispatch function. Almost all operations
     # should be mirrored in the
 
-    # TODO: this needs to be refactored properly
+    # Render a row produced by the list statement of a table. Owners and targets have already been resolved by the
+    # statement itself; a missing one shows up as NULL columns.
     def __listrendertuple(self, tpl, objtype):
         # Authors can be rendered easily
         if objtype == 'authors':
@@ -374,177 +902,115 @@ class SQLiteHandler:
             return '\t{0}\t\t{2}, {1}'.format(iid, fn, ln)
         # For an article tuple, find all authors. If no authors exist, raise error. Otherwise, list last names.
         elif objtype == 'articles':
-            iid, rk, yy, tt, jn, vm, nm, ps, pe, rt = tpl
-            query = f'''
-            SELECT * FROM authors 
-            INNER JOIN authorsperarticle ON authors.id = authorsperarticle.authuuid 
-            WHERE authorsperarticle.artuuid={iid}\
-            '''
-            self.__cursor.execute(query)
-
-            auths = self.__cursor.fetchall()
+            iid, rk, yy, tt, jn, vm, nm, ps, pe, rt, lnames = tpl
 
-            if not auths:
+            if lnames is None:
                 click.echo(click.style('[SQLite] Article {0} contains no authors.'.format(iid), fg='red'))
                 return None
-            else:
-                lnames = []
-                for t in auths:
-                    _, _, auln = t
-                    lnames.append(auln)
 
-            return '\t{0}\t{8}\t{1}. {2}. {3}. {4}({5}: {6}--{7})'.format(iid, yy, ' ,'.join(lnames),
+            return '\t{0}\t{8}\t{1}. {2}. {3}. {4}({5}: {6}--{7})'.format(iid, yy, lnames,
                                                                           tt, vm, nm, ps, pe, '!' if rt else ' ')
         # For annotations, retrieve a simplified version of the object
         elif objtype == 'annotations':
-            iid, oid, cls, inf = tpl
+            iid, oid, cls, inf, fn, ln, yy, tt, jj = tpl
 
             if cls == 'author':
-                self.__cursor.execute(f'SELECT firstname, lastname FROM authors WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if fn is None:
                     click.echo(click.style('[SQLite] Annotation {0} refers to no author.'.format(iid),
                                            fg='red'))
                     return None
                 else:
-                    fn, ln = data
                     return '\t{0}\t\t{3}\t<{2},{1}>\t{5}, {4}'.format(iid, oid, cls, inf, fn, ln)
             elif cls == 'article':
-                self.__cursor.execute(f'SELECT year, title, journal FROM articles WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if yy is None:
                     click.echo(click.style('[SQLite] Annotation {0} refers to no author.'.format(iid),
                                            fg='red'))
                     return None
                 else:
-                    yy, tt, jj = data
                     return '\t{0}\t\t{3}\t<{2},{1}>\t{4}.{5}.{6}. '.format(iid, oid, cls, inf, yy, tt, jj)
             else:
                 return None
         # Tags
         elif objtype == 'tags':
-            iid, oid, cls, cnt = tpl
+            iid, oid, cls, cnt, fn, ln, yy, tt, jj, rid, roid, sm = tpl
 
             if cls == 'author':
-                self.__cursor.execute(f'SELECT firstname, lastname FROM authors WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if fn is None:
                     click.echo(click.style('[SQLite] Tag {0} belongs to no author.'.format(iid),
                                            fg='red'))
                     return None
                 else:
-                    fn, ln = data
                     return '\t{0}\t\t{3}\t<{2},{1}>\t{5},{4}'.format(iid, oid, cls, cnt, fn, ln)
             elif cls == 'article':
-                self.__cursor.execute(f'SELECT year, title, journal FROM articles WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if yy is None:
                     click.echo(click.style('[SQLite] Tag {0} belongs to no article.'.format(iid), fg='red'))
                     return None
                 else:
-                    yy, tt, jj = data
                     return '\t{0}\t\t{3}\t<{2},{1}>\t{4}.{5}.{6}. '.format(iid, oid, cls, cnt, yy, tt, jj)
             elif cls == 'annotations':
-                self.__cursor.execute(f'SELECT objuuid, objclass, summary FROM annotations WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if rid is None:
                     click.echo(click.style('[SQLite] Tag {0} belongs to no annotation.'.format(iid), fg='red'))
                     return None
                 else:
-                    rid, roid, sm = data
                     return '\t{0}\t\t{3}\t<{2},{1}>\t{4} <<{6},{5}>> '.format(iid, oid, cls, cnt, sm, rid, roid)
             else:
                 return None
         # Files
         elif objtype == 'files':
-            iid, oid, cls, fnm, fty, dsc, fsz = tpl
+            iid, oid, cls, fnm, fty, dsc, fsz, fn, ln, yy, tt, jj, rid, roid, sm = tpl
 
             if cls == 'author':
-                self.__cursor.execute(f'SELECT firstname, lastname FROM authors WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if fn is None:
                     click.echo(click.style('[SQLite] Tag {0} belongs to no author.'.format(iid), fg='red'))
                     return None
                 else:
-                    fn, ln = data
                     return '\t{0}\t\t{3} [{4}, {8} bytes] {5}\t<{2},{1}>\t{7}, {6}'.format(iid, oid, cls, fnm,
                                                                                            fty, dsc, fn, ln, fsz)
             elif cls == 'article':
-                self.__cursor.execute(f'SELECT year, title, journal FROM articles WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if yy is None:
                     click.echo(click.style('[SQLite] Tag {0} belongs to no article.'.format(iid),
                                            fg='red'))
                     return None
                 else:
-                    yy, tt, jj = data
                     return '\t{0}\t\t{3} [{4}] {5}\t<{2},{1}>\t{6}.{7}.{8}.'.format(iid, oid, cls, fnm,
                                                                                     fty, dsc, yy, tt, jj)
             elif cls == 'annotations':
-                self.__cursor.execute(f'SELECT objuuid, objclass, summary FROM annotations WHERE uuid=\"{oid}\"')
-                data = self.__cursor.fetchone()
-
-                if not data:
+                if rid is None:
                     click.echo(click.style('[SQLite] Tag {0} belongs to no annotation.'.format(iid), fg='red'))
                     return None
                 else:
-                    rid, roid, sm = data
                     return '\t{0}\t\t{3} [{4}] {5}\t<{2},{1}>\t <<{6},{7}>>'.format(iid, oid, cls, fnm,
                                                                                     fty, dsc, rid, roid)
             else:
                 return None
         # References
         elif objtype == 'refs':
-            iid, oid, cls, rid = tpl
-
-            self.__cursor.execute(f'SELECT year, title, journal FROM articles WHERE id={rid}')
-            rdata = self.__cursor.fetchone()
+            iid, oid, cls, rid, tid, ryy, rtt, rjj, fn, ln, yy, tt, jj, rfid, rfobc, sm = tpl
 
-            if not rdata:
+            if tid is None:
                 click.echo(click.style('[SQLite] Reference {0} points to no stash article.'.format(iid), fg='red'))
                 return None
             else:
-                ryy, rtt, rjj = rdata
-
                 if cls == 'author':
-                    self.__cursor.execute(f'SELECT firstname, lastname FROM authors WHERE uuid=\"{oid}\"')
-                    data = self.__cursor.fetchone()
-
-                    if not data:
+                    if fn is None:
                         click.echo(click.style('[SQLite] Reference {0} belongs to no author.'.format(iid),
                                                fg='red'))
                         return None
                     else:
-                        fn, ln = data
                         return '\t{0}\t\t<{2},{1}> {4}, {3} ----> [5] {6}.{7}.{8}.'.format(iid, oid, cls, fn, ln,
                                                                                            rid, ryy, rtt, rjj)
                 elif cls == 'article':
-                    self.__cursor.execute('SELECT year, title, journal FROM articles WHERE id={0}'.format(oid))
-                    data = self.__cursor.fetchone()
-
-                    if not data:
+                    if yy is None:
                         click.echo(click.style('[SQLite] Reference {0} belongs to no article.'.format(iid),
                                                fg='red'))
                     else:
-                        yy, tt, jj = data
                         return '\t{0}\t\t<{2},{1}> {3}.{4}.{5}. ----> [6] {7}.{8}.{9}.'.format(iid, oid, cls, yy, tt,
                                                                                                jj, rid, ryy, rtt, rjj)
                 elif cls == 'annotations':
-                    self.__cursor.execute(f'SELECT objuuid, objclass, summary FROM annotations WHERE uuid=\"{oid}\"')
-                    data = self.__cursor.fetchone()
-
-                    if not data:
+                    if rfid is None:
                         click.echo(
                             click.style('[SQLite] Reference {0} belongs to no annotation.'.format(iid), fg='red'))
                     else:
-                        rfid, rfobc, sm = data
                         return '\t{0}\t\t<{2},{1}> {3} <<{5},{4}>> ----> [5] {6}.{7}.{8}.'.format(iid, oid, cls, sm,
                                                                                                   rfid, rfobc, ryy,
                                                                                                   rtt, rjj)
@@ -553,7 +1019,24 @@ class SQLiteHandler:
         else:
             return None
 
-    # List objects in the database
+    # Render the rows of a listing as they are pulled from the cursor, one chunk at a time. The reader holding the
+    # cursor goes back to the pool once the listing is exhausted or dropped.
+    def __streamrows(self, conn, cursor, rows, objtable):
+        try:
+            while rows:
+                for row in rows:
+                    line = self.__listrendertuple(row, objtable)
+
+                    if line is not None:
+                        yield line + '\n'
+
+                rows = cursor.fetchmany(self.__fetchchunk)
+        finally:
+            cursor.close()
+            self.__connections.release(conn)
+
+    # List objects in the database. The outcome is a generator of rendered lines, so only one chunk of rows is ever
+    # resident and the first lines are available as soon as the first chunk has been read.
     def list(self, objtable):
         if not self.__cursor:
             click.echo(click.style('[SQLite] Database connection does not exist.', fg='red'))
@@ -566,26 +1049,188 @@ class SQLiteHandler:
                 click.echo(click.style('[SQLite] Unknown object type.', fg='red'))
                 return None
             else:
-                # Files require special treatment to avoid pulling blobs
-                if objtable != 'files':
-                    self.__cursor.execute(f'SELECT * FROM {objtable}')
-                else:
-                    self.__cursor.execute(f'SELECT uuid, objuuid, objclass, fname, ftype, descr, fsize FROM {objtable}')
-
-                rows = self.__cursor.fetchall()
+                # A dedicated cursor, so that statements issued while the listing is consumed do not reset it
+                conn = self.__connections.acquire()
+                cursor = conn.cursor()
+                cursor.execute(self.__statements[f'list_{objtable}'])
+                rows = cursor.fetchmany(self.__fetchchunk)
 
             if not rows:
+                cursor.close()
+                self.__connections.release(conn)
                 click.echo(click.style('[SQLite] Database contains no {0}.'.format(objtable), fg='magenta'))
                 return None
             else:
-                return '\n'.join(map(lambda x: self.__listrendertuple(x, objtable), rows))
+                return self.__streamrows(conn, cursor, rows, objtable)
+
+    # Render the listing label of a single object
+    # Refkeys do not appear in labels, but are worth completing on
+    @staticmethod
+    def __listkeys(tpl, objtype):
+        return tpl[1] if objtype == 'articles' else None
+
+    # With keys, a (label, keys) pair is returned instead
+    def renderlabel(self, oid, table=None, keys=False):
+        if not self.__cursor:
+            return (None, None) if keys else None
+
+        if table is None:
+            otype = self.resolvetype(oid)
+
+            if otype is None:
+                return (None, None) if keys else None
+
+            table = self.__typetotablemap[otype]
+
+        # The listing statement restricted to one row; its text is constant per table, so it is cached as well
+        self.__cursor.execute(self.__statements[f'list_{table}'] + f' WHERE {table}.uuid = ?', (oid,))
+        data = self.__cursor.fetchone()
+        label = self.__listrendertuple(data, table) if data else None
+
+        if keys:
+            return label, self.__listkeys(data, table) if data else None
+
+        return label
+
+    # Stream (id, label) pairs, or (id, label, keys) triples, for every object that can be rendered. With `own`, they
+    # are read from other threads, on a connection of their own; see __pagedrows.
+    def iterlabels(self, keys=False, own=False):
+        if not self.__cursor:
+            return
+
+        for table in list(self.__typetotablemap.values()):
+            for t in self.__pagedrows(table) if own else self.__tablerows(table):
+                label = self.__listrendertuple(t, table)
+
+                if label is None:
+                    continue
+                elif keys:
+                    yield uuid.UUID(t[0]), label, self.__listkeys(t, table)
+                else:
+                    yield uuid.UUID(t[0]), label
+
+    def __tablerows(self, table):
+        with self.__connections.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.__statements[f'list_{table}'])
+
+            try:
+                rows = cursor.fetchmany(self.__fetchchunk)
+
+                while rows:
+                    yield from rows
+                    rows = cursor.fetchmany(self.__fetchchunk)
+            finally:
+                cursor.close()
+
+    # The listing of a table in pages, walked by id; every listing starts with it. Each page is a statement of its own,
+    # run to completion before the connection is given back: under a rollback journal, a statement left open would
+    # hold back commits for as long as the rows are consumed.
+    def __pagedrows(self, table):
+        statement = self.__statements[f'list_{table}'] + f' WHERE {table}.uuid > ? ORDER BY {table}.uuid LIMIT ?'
+        last = ''
+
+        while True:
+            with self.__connections.reading(own=True) as conn:
+                rows = conn.execute(statement, (last, self.__fetchchunk)).fetchall()
+
+            if not rows:
+                return
+
+            yield from rows
+            last = rows[-1][0]
+
+    # Keep the context hash, if one is in use and has been built, in step with writes. While a batch is open, changes
+    # are held (a table of None stands for a removal) and only replayed once it is released.
+    def __relabel(self, oid, table):
+        if self.__heldlabels is not None:
+            self.__heldlabels.append((oid, table))
+        elif (self.__cntxhash is not None) and self.__cntxhash.built:
+            self.__cntxhash.refresh(oid, *self.renderlabel(oid, table, keys=True))
+
+    def __unlabel(self, oid):
+        if self.__heldlabels is not None:
+            self.__heldlabels.append((oid, None))
+        elif self.__cntxhash is not None:
+            self.__cntxhash.discard(oid)
+
+    # Ranked full-text search. Every term must match, as a prefix, in one of the given columns (all of them by default);
+    # results come best first according to bm25 and are rendered as in listings.
+    def find(self, terms: list, table=None, columns=None, limit=50):
+        if not self.__cursor:
+            click.echo(click.style('[SQLite] Database connection does not exist.', fg='red'))
+            return None
+
+        tokens = re.findall(r'\w+', ' '.join(terms))
+
+        if not tokens:
+            click.echo(click.style('[SQLite] Nothing to search for.', fg='magenta'))
+            return None
+
+        query = ' AND '.join(f'"{tok}"*' for tok in tokens)
+
+        if columns:
+            query = '{{{0}}} : ({1})'.format(' '.join(columns), query)
+
+        if table is None:
+            self.__execute('findall_search', (query, limit))
+        else:
+            self.__execute('find_search', (query, table, limit))
+
+        hits = self.__cursor.fetchall()
+
+        if not hits:
+            click.echo(click.style('[SQLite] No matches found.', fg='magenta'))
+            return None
+
+        return '\n'.join(filter(None, (self.renderlabel(oid, kind) for oid, kind in hits)))
+
+    # Completion served by the search index, for use until the context hash has indexed every label: text that may
+    # start an identifier is looked up as one, and words starting with every term are matched. Files and references
+    # are not searchable, and so are not offered. Returns (id, label) pairs.
+    def suggest(self, text, limit=20):
+        if not self.__cursor:
+            return []
+
+        text = text.strip().lower()
+        hits = []
+
+        if re.fullmatch(r'[0-9a-f][0-9a-f-]*', text):
+            self.__execute('prefix_search', (text, text + '\uffff', limit))
+            hits.extend(self.__cursor.fetchall())
+
+        tokens = re.findall(r'\w+', text)
+
+        if tokens and len(hits) < limit:
+            self.__execute('complete_search', (' AND '.join(f'"{tok}"*' for tok in tokens), limit))
+            hits.extend(self.__cursor.fetchall())
+
+        labels = ((uuid.UUID(oid), self.renderlabel(oid, kind)) for oid, kind in list(dict(hits).items())[:limit])
+        return [(oid, label) for oid, label in labels if label is not None]
+
+    # Report how SQLite plans to execute the hot statements, mainly to check that they are served by indexes
+    def explain(self):
+        if not self.__cursor:
+            click.echo(click.style('[SQLite] Database connection does not exist.', fg='red'))
+            return None
+
+        report = []
+
+        for name in self.__hotstatements:
+            stmt = self.__statements[name]
+            self.__cursor.execute('EXPLAIN QUERY PLAN ' + stmt, ('',) * stmt.count('?'))
+            plan = self.__cursor.fetchall()
+            report.append(f'{name}')
+            report.extend(f'\t{detail}' for _, _, _, detail in plan)
+
+        return '\n'.join(report)
 
     def exists_fetch(self, oid: uuid.UUID, otype):
         if otype not in self.__typetotablemap.keys():
             click.echo(click.style('[SQLite] Unknown object type.', fg='red'))
             return False
         else:
-            self.__cursor.execute(f'SELECT uuid FROM {self.__typetotablemap[otype]} WHERE uuid=\"{oid}\"')
+            self.__execute(f'exists_{self.__typetotablemap[otype]}', (oid,))
             return True if self.__cursor.fetchone() else False
 
     def exists(self, obj):
@@ -603,7 +1248,7 @@ class SQLiteHandler:
             click.echo(click.style('[SQLite] Object not present in stash.', fg='magenta'))
             return None
         else:
-            self.__cursor.execute(f'SELECT * FROM {self.__typetotablemap[otype]}')
+            self.__execute(f'fetch_{self.__typetotablemap[otype]}', (oid,))
             data = self.__cursor.fetchone()
 
             if data:
@@ -628,21 +1273,141 @@ class SQLiteHandler:
         otype = fhash[oid]
         return self.object_fetch(oid, otype)
 
+    def __saveinternal(self, obj, fhash: dict):
+        objecttoinsertfunction = {
+            Author: self.__authortorow,
+            Article: self.__articletorow,
+            Annotation: self.__annotationtorow,
+            Tag: self.__tagtorow,
+            RefFile: self.__filetorow,
+            Reference: self.__reftorow
+        }
+        objecttoinsertfunction[type(obj)](obj, fhash)
+
+    # Record that objects are stored under their current ids, along with the authors written with an article
+    @staticmethod
+    def __markpersisted(objs):
+        for obj in objs:
+            obj.markpersisted()
+
+            if type(obj) is Article:
+                for auth in obj.authors:
+                    auth.markpersisted()
+
     def save(self, obj, fhash: dict):
         if obj is None:
             click.echo(click.style('[SQLite] Cannot save null object.', fg='red'))
-        elif (obj.id == obj.priorid) and (obj.fromDB):
+        elif obj.id == obj.priorid:
             click.echo(click.style('[SQLite] Ignoring saving for existing unmodified object in DB.', fg='red'))
         else:
-            objecttoinsertfunction = {
-                Author: self.__authortorow,
-                Article: self.__articletorow,
-                Annotation: self.__annotationtorow,
-                Tag: self.__tagtorow,
-                RefFile: self.__filetorow,
-                Reference: self.__reftorow
-            }
-            objecttoinsertfunction[type(obj)](obj, fhash)
+            self.__saveinternal(obj, fhash)
+            self.__markpersisted([obj])
+
+    # Batched counterpart of save. All objects are written inside a single transaction: new rows are grouped per table
+    # and written with executemany, while objects replacing a prior version go through the row functions above, since
+    # they must remove and re-own what the prior version left behind. Files also go through their row function, as
+    # their content is streamed into the row once it exists. If any object fails, nothing is written, and neither the
+    # fetch hash nor the context hash sees any of the batch: their changes are staged until it is released.
+    # Returns the number of rows written per table, or None if the batch was rolled back.
+    def savemany(self, objs, fhash: dict):
+        if not self.__cursor:
+            click.echo(click.style('[SQLite] Database connection does not exist.', fg='red'))
+            return None
+
+        objecttotuplefunction = {
+            Author: self.__authortotuple,
+            Article: self.__articletotuple,
+            Annotation: self.__annotationtotuple,
+            Tag: self.__tagtotuple,
+            Reference: self.__reftotuple
+        }
+        rows = {table: [] for table in ['authors', 'articles', 'authorsperarticle', 'annotations', 'tags', 'files',
+                                        'refs']}
+        saved = StagedFetchHash()
+        written = []
+        direct = {table: 0 for table in rows.keys()}
+
+        began = self.__begin()
+        self.__execute('begin_batch')
+        self.__heldlabels = []
+
+        try:
+            for obj in objs:
+                if obj is None or obj.id == obj.priorid:
+                    continue
+
+                written.append(obj)
+
+                if obj.priorid is not None:
+                    self.__saveinternal(obj, saved)
+                    direct[self.__typetotablemap[type(obj)]] += 1
+                elif type(obj) is RefFile:
+                    self.__filetorow(obj, saved)
+                    direct['files'] += 1
+                elif type(obj) is Author:
+                    # Authors may already have been queued by an article in this same batch, or be stored already
+                    if saved.get(obj.id) is None:
+                        if not self.exists(obj):
+                            rows['authors'].append(self.__authortotuple(obj))
+                        saved[obj.id] = Author
+                else:
+                    rows[self.__typetotablemap[type(obj)]].append(objecttotuplefunction[type(obj)](obj))
+                    saved[obj.id] = type(obj)
+
+                    if type(obj) is Article:
+                        for auth in obj.authors:
+                            # Authors already persisted under their current id need no lookup
+                            if (auth.id != auth.priorid) and (saved.get(auth.id) is None) and (not self.exists(auth)):
+                                rows['authors'].append(self.__authortotuple(auth))
+                                saved[auth.id] = Author
+                            rows['authorsperarticle'].append((obj.id, auth.id))
+
+            for table, tablerows in rows.items():
+                if tablerows:
+                    self.__cursor.executemany(self.__statements[f'insert_{table}'], tablerows)
+
+            # Search documents for the batched rows
+            self.__insertsearch([
+                *(self.__searchtuple('authors', tp) for tp in rows['authors']),
+                *(self.__searchtuple('articles', (tp[0], tp[3], tp[4])) for tp in rows['articles']),
+                *(self.__searchtuple('annotations', (tp[0], tp[3], tp[4])) for tp in rows['annotations']),
+                *(self.__searchtuple('tags', (tp[0], tp[3])) for tp in rows['tags'])
+            ])
+
+        except Exception as e:
+            self.__execute('rollback_batch')
+            self.__execute('release_batch')
+
+            if began:
+                self.__conn.rollback()
+
+            self.__heldlabels = None
+            click.echo(click.style(f'[SQLite] Batch save failed, no objects were saved ({e}).', fg='red'))
+            return None
+
+        self.__execute('release_batch')
+
+        if not self.__deferred:
+            self.__connections.commit()
+
+        self.__markpersisted(written)
+        saved.applyto(fhash)
+        held, self.__heldlabels = self.__heldlabels, None
+
+        for oid, table in held:
+            if table is None:
+                self.__unlabel(oid)
+            else:
+                self.__relabel(oid, table)
+
+        # Rows written in bulk were not labelled on the way
+        replayed = {oid for oid, _ in held}
+
+        for oid, otype in saved.items():
+            if otype is not None and oid not in replayed:
+                self.__relabel(oid, self.__typetotablemap[otype])
+
+        return {table: len(tablerows) + direct[table] for table, tablerows in rows.items()}
 
     def __deleteinternal(self, did: uuid.UUID, objtype: type, fhash: dict):
         objecttodeletefunction = {
@@ -663,24 +1428,255 @@ class SQLiteHandler:
             # Type-to-insert from object to database
             self.__deleteinternal(did, fhash[did], fhash)
 
-    def buildfetchhash(self):
-        click.echo('[SQLite] Attempting to construct a fetch hash...')
+    # Type of the object stored under an id, or None if no table holds it
+    def resolvetype(self, oid):
+        if not self.__cursor:
+            return None
+
+        self.__execute('resolve_table', (oid,))
+        data = self.__cursor.fetchone()
+        return self.__tabletotypemapper[data[0]] if data else None
+
+    # Group rows of the article-author join into (article row, ((first, last), ...)) pairs, one chunk at a time. The
+    # connection of the cursor is released once the rows are exhausted.
+    def __grouparticles(self, conn, cursor):
+        current = None
+        names = []
+
+        try:
+            rows = cursor.fetchmany(self.__fetchchunk)
+
+            while rows:
+                for row in rows:
+                    if current is None or row[0] != current[0]:
+                        if current is not None:
+                            yield current, tuple(names)
+
+                        current = row[:10]
+                        names = []
+
+                    if row[11] is not None:
+                        names.append((row[10], row[11]))
+
+                rows = cursor.fetchmany(self.__fetchchunk)
+
+            if current is not None:
+                yield current, tuple(names)
+        finally:
+            cursor.close()
+            self.__connections.release(conn)
+
+    # Stream every article with the names of its authors as (article row, ((first, last), ...)) pairs. A single ordered
+    # join replaces per-article author lookups, and only one chunk of rows is resident at a time.
+    def iterarticles(self):
+        if not self.__cursor:
+            return iter(())
+
+        conn = self.__connections.acquire()
+        cursor = conn.cursor()
+        cursor.execute(self.__statements['dump_articles'])
+        return self.__grouparticles(conn, cursor)
+
+    # Citations for a list of article ids, in the same order, with None for ids that are not articles. Citations not
+    # yet cached are rendered from a single query over all their articles.
+    def cite(self, ids, fmt):
+        if not self.__cursor:
+            click.echo(click.style('[SQLite] Database connection does not exist.', fg='red'))
+            return None
+        elif fmt not in formatters:
+            click.echo(click.style(f'[SQLite] Unknown citation format {fmt}.', fg='red'))
+            return None
+
+        ids = [CitationCache.key(oid) for oid in ids]
+        citations = {oid: self.__citations.get(oid, fmt) for oid in ids}
+        missing = [str(oid) for oid, citation in citations.items() if citation is None]
+
+        if missing:
+            conn = self.__connections.acquire()
+            cursor = conn.cursor()
+            cursor.execute(self.__statements['cite_articles'], (json.dumps(missing),))
+
+            for row, names in self.__grouparticles(conn, cursor):
+                oid = CitationCache.key(row[0])
+                citations[oid] = formatters[fmt](row, names)
+                self.__citations.put(oid, fmt, citations[oid])
+
+        return [citations[oid] for oid in ids]
+
+    # Stream the whole stash as SQL statements, which restore it into an empty database. The search index cannot be
+    # restored row by row, as FTS5 keeps it in shadow tables of its own: its tables are created and filled anew
+    # instead, once the data is in. The structure version comes last, so that migrations are not applied again.
+    def iterdump(self):
+        if not self.__conn:
+            return
+
+        with self.__connections.reading() as conn:
+            cursor = conn.cursor()
+            schema = cursor.execute(self.__statements['dump_schema']).fetchall()
+            version, = cursor.execute('PRAGMA user_version').fetchone()
+            yield 'BEGIN TRANSACTION;'
+
+            for kind, name, sql in schema:
+                yield f'{sql};'
+
+                if kind != 'table':
+                    continue
+
+                # Each row is written as an INSERT by SQLite itself; quote() renders any value as a literal
+                columns = [info[1] for info in cursor.execute(f'PRAGMA table_info("{name}")').fetchall()]
+                values = " || ',' || ".join(f'quote("{column}")' for column in columns)
+                cursor.execute(f'''SELECT 'INSERT INTO "{name}" VALUES(' || {values} || ');' FROM "{name}"''')
+                rows = cursor.fetchmany(self.__fetchchunk)
+
+                while rows:
+                    for row, in rows:
+                        yield row
+
+                    rows = cursor.fetchmany(self.__fetchchunk)
+
+            yield f'{self.__searchtable.strip()};'
+            yield f'{self.__searchkeystable.strip()};'
+
+            for stmt in self.__searchrebuild:
+                yield f'{stmt};'
+
+            # Pragmas cannot be bound; the version is one of our own integers
+            yield f'PRAGMA user_version = {version};'
+            yield 'COMMIT;'
+
+    # Which of the given reference keys are already held by articles
+    def heldrefkeys(self, refkeys):
+        held = set()
+
+        if not self.__cursor:
+            return held
+
+        refkeys = list(refkeys)
+
+        for start in range(0, len(refkeys), self.__fetchchunk):
+            part = refkeys[start:start + self.__fetchchunk]
+            self.__cursor.execute(self.__statements['held_refkeys'], (json.dumps(part),))
+            held.update(rk for rk, in self.__cursor.fetchall())
+
+        return held
+
+    # Stream all authors in the stash, one chunk of rows at a time
+    def iterauthors(self):
+        if not self.__cursor:
+            return
+
+        with self.__connections.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.__statements['list_authors'])
+
+            try:
+                rows = cursor.fetchmany(self.__fetchchunk)
+
+                while rows:
+                    for row in rows:
+                        yield self.__tupletoauthor(row)
+
+                    rows = cursor.fetchmany(self.__fetchchunk)
+            finally:
+                cursor.close()
+
+    # Stream all (id, type) pairs in the stash without holding them in memory
+    def iterids(self):
+        if not self.__cursor:
+            return
+
+        for table in list(self.__typetotablemap.values()):
+            with self.__connections.reading() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.__statements[f'ids_{table}'])
+
+                try:
+                    rows = cursor.fetchmany(self.__fetchchunk)
+
+                    while rows:
+                        for t in rows:
+                            yield uuid.UUID(t[0]), self.__tabletotypemapper[table]
+
+                        rows = cursor.fetchmany(self.__fetchchunk)
+                finally:
+                    cursor.close()
+
+    # Stream the rows of a named statement in chunks, for consumers that work on whole chunks at a time
+    def iterchunks(self, name: str, params=()):
+        if not self.__cursor:
+            return
+
+        with self.__connections.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.__statements[name], params)
+
+            try:
+                rows = cursor.fetchmany(self.__chunkrows)
+
+                while rows:
+                    yield rows
+                    rows = cursor.fetchmany(self.__chunkrows)
+            finally:
+                cursor.close()
+
+    # A single value from a named statement, read on a pooled reader
+    def __scalar(self, name: str, params=()):
+        with self.__connections.reading() as conn:
+            return conn.execute(self.__statements[name], params).fetchone()[0]
+
+    def count(self, table: str):
+        if not self.__cursor:
+            return 0
+
+        return self.__scalar(f'count_{table}')
+
+    def countids(self):
+        if not self.__cursor:
+            return 0
+
+        return self.__scalar('count_ids')
+
+    # Fetch hash resolved on demand. Startup cost is constant; only the most recently used ids stay in memory.
+    def lazyfetchhash(self, capacity=65536):
+        click.echo('[SQLite] Using a lazy fetch hash.')
 
         if self.__cursor is None:
             click.echo(click.style('[SQLite] Fetch hash construction failed.', fg='red'))
             return None
         else:
-            fhash = {}
+            return LazyFetchHash(self, capacity)
 
-            for table in list(self.__typetotablemap.values()):
-                self.__cursor.execute(f'SELECT DISTINCT uuid FROM {table}')
+    # Eager fetch hash: every id in the stash is loaded at once
+    def buildfetchhash(self):
+        click.echo('[SQLite] Attempting to construct a fetch hash...')
 
-                for t in self.__cursor.fetchall():
-                    fhash[uuid.UUID(t[0])] = self.__tabletotypemapper[table]
+        if self.__cursor is None:
+            click.echo(click.style('[SQLite] Fetch hash construction failed.', fg='red'))
+            return None
+        else:
+            fhash = {oid: otype for oid, otype in self.iterids()}
 
             click.echo('[SQLite] Fetch hash constructed.')
             return fhash
 
+    # Whether objects can be read from other threads while the session goes on
+    @property
+    def concurrentreads(self):
+        return self.__connections is not None and self.__connections.shared
+
+    # Context hash rendered on first use and maintained incrementally by save and delete. A capacity bounds the
+    # number of labels kept in memory; zero keeps them all.
+    def contexthash(self, capacity=0):
+        if self.__cursor is None:
+            click.echo(click.style('[SQLite] Database connection does not exist.', fg='red'))
+            return None
+
+        if self.__cntxhash is None:
+            self.__cntxhash = ContextHash(self, capacity)
+
+        return self.__cntxhash
+
+    # Eager context hash: every object in the stash is rendered at once
     def buildcontexthash(self):
         click.echo('[SQLite] Attempting to construct a context hash...')
 
@@ -688,16 +1684,6 @@ class SQLiteHandler:
             click.echo(click.style('[SQLite] Database connection does not exist.', fg='red'))
             return None
         else:
-            chash = {}
-
-            for table in list(self.__typetotablemap.values()):
-                if table == 'files':
-                    self.__cursor.execute(f'SELECT uuid, objuuid, objclass, fname, ftype, descr, fsize FROM {table}')
-                else:
-                    self.__cursor.execute(f'SELECT * FROM {table}')
-
-                for t in self.__cursor.fetchall():
-                    chash[uuid.UUID(t[0])] = self.__listrendertuple(t, table)
-
+            chash = dict(self.iterlabels())
             click.echo('[SQLite] Context hash constructed.')
             return chash
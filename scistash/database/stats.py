@@ -0,0 +1,128 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+import numpy as np
+import time
+
+
+# Statistics over the whole stash. Everything that can be aggregated is aggregated by SQLite; what comes back are
+# either a handful of numbers or one column of numbers, which NumPy turns into distributions. No row ever becomes an
+# object.
+class StashStatistics:
+    __tables = ['authors', 'articles', 'authorsperarticle', 'annotations', 'tags', 'files', 'refs', 'blobs']
+    __decorators = ['annotations', 'tags', 'files', 'refs']
+    __percentiles = [50, 90, 99, 100]
+
+    def __init__(self, dbhandler, top=10, snapshot=None):
+        self.__db = dbhandler
+        self.__top = top
+        self.__snapshot = snapshot
+
+    def __rows(self, name, params=()):
+        return [row for rows in self.__db.iterchunks(name, params) for row in rows]
+
+    # One numeric column, built from whole chunks of rows
+    def __column(self, name, dtype=np.int64):
+        parts = [np.fromiter((row[0] for row in rows), dtype=dtype, count=len(rows))
+                 for rows in self.__db.iterchunks(name)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+
+    def collect(self):
+        started = time.perf_counter()
+        stats = {'counts': dict(zip(self.__tables, self.__rows('stats_counts')[0]))}
+
+        years = np.array(self.__rows('stats_years'), dtype=np.int64).reshape(-1, 2)
+        stats['years'] = years
+
+        total, retracted = self.__rows('stats_retracted')[0]
+        stats['retracted'] = (retracted, retracted / total if total else 0.0)
+
+        stats['topauthors'] = self.__rows('stats_topauthors', (self.__top,))
+
+        if self.__snapshot is None:
+            # Authors absent from the join have no coauthors at all
+            degrees = self.__column('stats_coauthors')
+            histogram = np.bincount(degrees, minlength=1) if len(degrees) else np.zeros(1, dtype=np.int64)
+            histogram[0] += stats['counts']['authors'] - len(degrees)
+        else:
+            histogram = np.bincount(self.__degrees(self.__snapshot), minlength=1)
+
+        stats['coauthors'] = histogram
+
+        sizes = self.__column('stats_filesizes')
+        stats['filesizes'] = np.percentile(sizes, self.__percentiles) if len(sizes) else None
+        stats['filebytes'] = (int(sizes.sum()), self.__rows('stats_blobbytes')[0][0])
+
+        orphans = self.__rows('stats_orphans')[0]
+        stats['orphans'] = dict(zip(self.__decorators + ['dangling refs', 'broken author links'], orphans))
+
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    # Distinct coauthors per author from the adjacency of a snapshot. Every article with k authors contributes its k * k
+    # (author, author) pairs, generated all at once; pairs are then deduplicated by sorting their combined codes.
+    @staticmethod
+    def __degrees(snapshot):
+        ptr = np.asarray(snapshot['article_authorptr'])
+        authors = np.asarray(snapshot['article_authors'], dtype=np.int64)
+        count = snapshot.authors
+        sizes = np.diff(ptr)
+        perlink = np.repeat(sizes, sizes)
+        starts = np.repeat(ptr[:-1], sizes)
+
+        left = np.repeat(authors, perlink)
+        firsts = np.cumsum(perlink) - perlink
+        offsets = np.arange(len(left)) - np.repeat(firsts, perlink)
+        right = authors[np.repeat(starts, perlink) + offsets]
+
+        pairs = np.unique((left * count + right)[left != right])
+        return np.bincount(pairs // count, minlength=count) if count else np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def __bars(labels, values, width=40):
+        peak = max(values) if len(values) else 0
+        return [f'    {label:>8} {value:>9} {"#" * int(round(width * value / peak)) if peak else ""}'
+                for label, value in zip(labels, values)]
+
+    def report(self):
+        stats = self.collect()
+        lines = ['Rows per table:']
+        lines += [f'    {table:<20} {count:>10}' for table, count in stats['counts'].items()]
+
+        lines += ['', 'Articles per year:']
+        lines += self.__bars([str(y) for y in stats['years'][:, 0]], stats['years'][:, 1])
+
+        retracted, rate = stats['retracted']
+        lines += ['', f'Retracted articles: {retracted} ({rate:.2%})']
+
+        lines += ['', f'Top {self.__top} authors by articles:']
+        lines += [f'    {count:>8}  {last}, {first}' for first, last, count in stats['topauthors']]
+
+        # Degrees are grouped in powers of two past the first few, so that long tails stay readable
+        histogram = stats['coauthors']
+        edges = [0, 1, 2, 3, 4] + [2 ** k for k in range(3, max(3, int(len(histogram)).bit_length()) + 1)]
+        edges = [e for e in edges if e < len(histogram)] + [len(histogram)]
+        sums = np.add.reduceat(histogram, edges[:-1])
+        labels = [str(lo) if hi - lo == 1 else f'{lo}-{hi - 1}' for lo, hi in zip(edges[:-1], edges[1:])]
+        lines += ['', 'Authors by number of distinct coauthors:']
+        lines += self.__bars(labels, sums)
+
+        lines += ['', 'Attachment sizes (bytes):']
+
+        if stats['filesizes'] is None:
+            lines.append('    no attachments')
+        else:
+            lines += [f'    {"p" + str(p) if p < 100 else "max":>8} {int(v):>12}'
+                      for p, v in zip(self.__percentiles, stats['filesizes'])]
+            attached, stored = stats['filebytes']
+            lines.append(f'    {attached} bytes attached, {stored} bytes stored')
+
+        lines += ['', 'Orphaned decorators and broken links:']
+        lines += [f'    {name:<20} {count:>10}' for name, count in stats['orphans'].items()]
+
+        lines += ['', f'Computed in {stats["seconds"]:.3f} s']
+        return '\n'.join(lines)
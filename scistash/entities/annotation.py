@@ -10,6 +10,7 @@ import uuid
 
 
 class Annotation(IdentifiableEntity):
+    __slots__ = ('__objuuid', '__objcls', '__summary', '__info')
 
     def __init__(self, objuuid: uuid.UUID, objcls: type, sm: str, info: str, fdb: bool):
         super().__init__()
@@ -17,13 +18,8 @@ class Annotation(IdentifiableEntity):
         self.__objcls = objcls
         self.__summary = sm
         self.__info = info
-        self.__id = uuid.uuid3(uuid.NAMESPACE_OID, str(self.__objuuid) + self.__summary + self.__info)
         self.fromDB = fdb
 
-    @property
-    def id(self):
-        return self.__id
-
     @property
     def objuuid(self):
         return self.__objuuid
@@ -55,11 +51,12 @@ class Annotation(IdentifiableEntity):
     @summary.setter
     def summary(self, val):
         self.__summary = val
+        self.invalidate()
 
     @info.setter
     def info(self, val):
         self.__info = val
-        super().id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     def stringify(self):
         return str(self.__objuuid) + self.__summary + self.__info
@@ -6,10 +6,10 @@
 # This software is intended for personal use and does not imply any guarantees
 # in functionality or performance.
 from scistash.entities.citable import CitableEntity
-import uuid
 
 
 class Article(CitableEntity):
+    __slots__ = ('__journal', '__volume', '__number', '__pages', '__retracted')
 
     def __init__(self, refkey='', authors=None, title='', year=0, journal='', volume=0,
                  number=0, pages=(0, 0), retracted=False, fdb=False):
@@ -19,7 +19,6 @@ class Article(CitableEntity):
         self.__number = number
         self.__pages = pages
         self.__retracted = retracted
-        self.__id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
         self.fromDB = fdb
 
     @property
@@ -57,27 +56,27 @@ class Article(CitableEntity):
     @journal.setter
     def journal(self, val):
         self.__journal = val
-        super().id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     @volume.setter
     def volume(self, val):
         self.__volume = val
-        super().id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     @number.setter
     def number(self, val):
         self.__number = val
-        super().id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     @pages.setter
     def pages(self, val):
         self.__pages = val
-        super().id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     def stringify(self):
         return ''.join([
             self.refkey,
-            ''.join(self.authors),
+            ''.join(auth.stringify() for auth in self.authors),
             self.title,
             str(self.year),
             self.journal,
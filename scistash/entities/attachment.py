@@ -10,17 +10,17 @@ import uuid
 
 
 class Attachment(IdentifiableEntity):
+    __slots__ = ('__objid', '__objcls', '__content')
 
     def __init__(self, objid: uuid.UUID, objcls:str, content):
         super().__init__()
         self.__objid = objid
         self.__objcls = objcls
         self.__content = content
-        self.__id = str(uuid.uuid3(uuid.NAMESPACE_OID, self.stringify()))
 
-    @property
-    def id(self):
-        return self.__id
+    # Attachments are identified by the textual form of their uuid
+    def computeid(self):
+        return str(super().computeid())
 
     @property
     def objid(self):
@@ -6,22 +6,17 @@
 # This software is intended for personal use and does not imply any guarantees
 # in functionality or performance.
 from scistash.entities.identifiable import IdentifiableEntity
-import uuid
 
 
 class Author(IdentifiableEntity):
+    __slots__ = ('__firstname', '__lastname')
 
     def __init__(self, first: str, last: str, fdb: bool):
         super().__init__()
         self.__firstname = first
         self.__lastname = last
-        self.__id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
         self.fromDB = fdb
 
-    @property
-    def id(self):
-        return self.id
-
     @property
     def firstname(self):
         return self.__firstname
@@ -45,12 +40,12 @@ class Author(IdentifiableEntity):
     @firstname.setter
     def firstname(self, val):
         self.__firstname = val
-        super().id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     @lastname.setter
     def lastname(self, val):
         self.__lastname = val
-        super().id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     def stringify(self):
         return self.firstname+self.lastname
@@ -11,6 +11,8 @@ import uuid
 
 
 class CitableEntity(IdentifiableEntity):
+    __slots__ = ('__refkey', '__authors', '__title', '__year')
+
     def __init__(self, refkey='', authors=None, title='', year=0):
         super().__init__()
         self.__refkey = refkey
@@ -39,23 +41,23 @@ class CitableEntity(IdentifiableEntity):
 
     @refkey.setter
     def refkey(self, val):
-        self.__key = val
-        self.id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.__refkey = val
+        self.invalidate()
 
     @authors.setter
     def authors(self, val):
         self.__authors = val
-        self.id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     @title.setter
     def title(self, val):
         self.__title = val
-        self.id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     @year.setter
     def year(self, val):
         self.__year = str(val)
-        self.id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+        self.invalidate()
 
     def addauthor(self, a: Author):
         found = list(filter(lambda x: x.id == a.id, self.__authors))
@@ -64,18 +66,21 @@ class CitableEntity(IdentifiableEntity):
             return False
         else:
             self.__authors.append(a)
-            self.id = uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+            self.invalidate()
             return True
 
-    def delauthor(self, uuid:uuid):
-        found = list(filter(lambda x: x.id == a.id, self.__authors))
+    def delauthor(self, aid: uuid.UUID):
+        found = list(filter(lambda x: x.id == aid, self.__authors))
 
         # At any moment, there must only be one instance of any unique author in 'found'
         if found:
             self.__authors.remove(found[0])
+            self.invalidate()
+            return True
         else:
             return False
 
     def __str__(self):
-        authstr = '; '.join(self.authors[:-1])+' and ' + self.authors[-1]
+        names = [auth.formalref() for auth in self.authors]
+        authstr = ' and '.join(filter(None, ['; '.join(names[:-1])] + names[-1:]))
         return '==> Entity: {3}\n\tYear: {2}\n\tAuthors: {0}\n\tTitle: {1}'.format(authstr, self.title, self.year, self.id)
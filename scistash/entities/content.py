@@ -0,0 +1,127 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from abc import ABC, abstractmethod
+from pathlib import Path
+import io
+
+# Attachments are read and written in chunks of this size, whatever their total size
+CHUNKSIZE = 1 << 20
+
+
+# Lazy, seekable view over the content of an attached file. Nothing is read until asked for: the content can be
+# streamed in fixed-size chunks, opened as a seekable binary handle, or materialized in full. Subclasses provide open.
+class LazyContent(ABC):
+    __slots__ = ('__size', '__digest')
+
+    def __init__(self, size: int, digest=None):
+        self.__size = size
+        self.__digest = digest
+
+    @property
+    def size(self):
+        return self.__size
+
+    # Binary, seekable, readable handle over the content; usable as a context manager
+    @abstractmethod
+    def open(self):
+        pass
+
+    def chunks(self, chunksize=CHUNKSIZE):
+        with self.open() as handle:
+            while True:
+                chunk = handle.read(chunksize)
+
+                if not chunk:
+                    return
+
+                yield chunk
+
+    # Streaming SHA-256 of the content, computed once unless already known
+    def digest(self):
+        if self.__digest is None:
+            # Imported here: loading the hash library is a noticeable part of startup, and most sessions never hash
+            import hashlib
+            h = hashlib.sha256()
+
+            for chunk in self.chunks():
+                h.update(chunk)
+
+            self.__digest = h.hexdigest()
+
+        return self.__digest
+
+    def materialize(self):
+        return b''.join(self.chunks())
+
+    def __bytes__(self):
+        return self.materialize()
+
+    def __len__(self):
+        return self.__size
+
+
+# Content still sitting in a file on disk
+class FileContent(LazyContent):
+    __slots__ = ('__path',)
+
+    def __init__(self, path: Path):
+        super().__init__(path.stat().st_size)
+        self.__path = path
+
+    @property
+    def path(self):
+        return self.__path
+
+    def open(self):
+        return self.__path.open('rb')
+
+
+# Content already in memory
+class MemoryContent(LazyContent):
+    __slots__ = ('__data',)
+
+    def __init__(self, data: bytes):
+        super().__init__(len(data))
+        self.__data = bytes(data)
+
+    def open(self):
+        return io.BytesIO(self.__data)
+
+    def materialize(self):
+        return self.__data
+
+
+# Content stored as a blob in the stash, read through SQLite incremental blob I/O. Blobs are collected once no file
+# refers to them and their rowids may then be reused, so a handle given a digest looks its row up by that digest on
+# every open rather than trusting the rowid it was made with.
+class BlobContent(LazyContent):
+    __slots__ = ('__conn', '__table', '__column', '__rowid', '__key')
+
+    def __init__(self, conn, table: str, column: str, rowid: int, size: int, digest=None):
+        super().__init__(size, digest)
+        self.__conn = conn
+        self.__table = table
+        self.__column = column
+        self.__rowid = rowid
+        self.__key = digest
+
+    def open(self):
+        if not self.size:
+            return io.BytesIO(b'')
+
+        rowid = self.__rowid
+
+        if self.__key is not None:
+            row = self.__conn.execute(f'SELECT rowid FROM {self.__table} WHERE digest = ?', (self.__key,)).fetchone()
+
+            if row is None:
+                raise FileNotFoundError(f'content {self.__key} is no longer in the stash')
+
+            rowid, = row
+
+        return self.__conn.blobopen(self.__table, self.__column, rowid, readonly=True)
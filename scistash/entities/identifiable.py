@@ -8,28 +8,49 @@
 import uuid
 
 class IdentifiableEntity:
+    # Entities are held in large numbers: slots keep them free of per-instance dictionaries
+    __slots__ = ('__id', '__priorid', '__fromDB', '__dirty')
+
+    # Ids are derived from the contents of an entity. They are computed on first read and only computed again on the
+    # first read after a change, however many fields changed in between. The prior id is the id under which the
+    # entity was last persisted, or None if it never was.
     def __init__(self):
         self.__id = None
         self.__priorid = None
         self.__fromDB = False
+        self.__dirty = True
+
+    def computeid(self):
+        return uuid.uuid3(uuid.NAMESPACE_OID, self.stringify())
+
+    # Called by setters: the current id no longer describes the entity
+    def invalidate(self):
+        self.__dirty = True
 
     @property
     def id(self):
+        if self.__dirty:
+            self.__id = self.computeid()
+            self.__dirty = False
+
         return self.__id
 
     @property
     def priorid(self):
         return self.__priorid
 
-    @id.setter
-    def id(self, val):
-        self.__priorid = self.__id
-        self.__id = val
+    # The entity is now stored under its current id
+    def markpersisted(self):
+        self.__priorid = self.id
 
     @property
     def fromDB(self):
         return self.__fromDB
 
+    # Entities read from the stash are persisted as they are
     @fromDB.setter
     def fromDB(self, val: bool):
         self.__fromDB = val
+
+        if val:
+            self.markpersisted()
@@ -10,6 +10,7 @@ import uuid
 
 
 class Reference(Attachment):
+    __slots__ = ()
 
     def __init__(self, objid, objcls, refkey: uuid.UUID, fdb: bool):
         super().__init__(objid, objcls, refkey)
@@ -6,25 +6,31 @@
 # This software is intended for personal use and does not imply any guarantees
 # in functionality or performance.
 from scistash.entities.attachment import Attachment
+from scistash.entities.content import LazyContent, FileContent, MemoryContent
 from pathlib import Path
 
 
 class RefFile(Attachment):
+    __slots__ = ('__fname', '__ftype', '__desc', '__fsize')
 
-    def __init__(self, objid, objcls, path: Path, ftyp: str, desc: str, fsz: int, cnt: bytes, fdb: bool):
+    def __init__(self, objid, objcls, path: Path, ftyp: str, desc: str, fsz: int, cnt, fdb: bool):
         self.__fname = path.name
         self.__ftype = ftyp
         self.__desc = desc
-        self.fromDB = fdb
 
+        # Content is never read eagerly: it stays where it is until it is streamed or materialized
         if cnt is None:
             # Creating from file
-            self.__fsize = path.stat().st_size
-            super().__init__(objid, objcls, path.read_bytes())
-        else:
-            self.__fsize = fsz
+            content = FileContent(path)
+        elif isinstance(cnt, LazyContent):
             # Creating from db
-            super().__init__(objid, objcls, cnt)
+            content = cnt
+        else:
+            content = MemoryContent(cnt)
+
+        self.__fsize = content.size if cnt is None else fsz
+        super().__init__(objid, objcls, content)
+        self.fromDB = fdb
 
     @property
     def fname(self):
@@ -41,26 +47,29 @@ class RefFile(Attachment):
 
     @property
     def desc(self):
-        return self.desc
+        return self.__desc
 
     @fname.setter
     def fname(self, val):
         self.__fname = val
+        self.invalidate()
 
     @ftype.setter
     def ftype(self, val):
         self.__ftype = val
+        self.invalidate()
 
     @desc.setter
     def desc(self, val):
-        self.desc = type
+        self.__desc = val
+        self.invalidate()
 
     def stringify(self):
-        # Note: if the file is large, this will be expensive
+        # The content enters the id through its streamed digest, never as a whole in memory
         # TODO: the current limit in sqlite is 10^9 bytes (1 GB). Larger files require other DB managers
         #       (PostgreSQL's TOAST data type). This may be ideal if this software becomes implemented in the context
         #       of large research facilities, and is extended to include other objects beyond papers (e.g. sensor data).
-        return str(self.id) + str(self.objid) + self.objcls + self.__fname + self.__ftype + self.__desc + str(self.content)
+        return str(self.objid) + self.objcls + self.__fname + self.__ftype + self.__desc + self.content.digest()
 
     def __str__(self):
         return '==> Reference file: {0}\n\tReferee: <{1},{2}>\n\tName: {3}\n\tSize: {4}\n\tType: {5}\n\tDescription: {6}\n'.format(
@@ -9,6 +9,7 @@ from scistash.entities.attachment import Attachment
 
 
 class Tag(Attachment):
+    __slots__ = ()
 
     def __init__(self, objid, objcls, text: str, fdb: bool):
         super().__init__(objid, objcls, text)
@@ -0,0 +1,37 @@
+# Copyright @ 2018
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from fuzzyfinder import fuzzyfinder
+from prompt_toolkit.completion import Completer, Completion
+
+
+class StashCompleter(Completer):
+    def __init__(self):
+        self.__vocabulary = ''
+
+    def setvocab(self, vocabulary):
+        self.__vocabulary = vocabulary
+
+    def get_completions(self, document, complete_event):
+        word_before_cursor = document.get_word_before_cursor(WORD=True)
+        matches = fuzzyfinder(word_before_cursor, self.__vocabulary)
+        for m in matches:
+            yield Completion(m, start_position=-len(word_before_cursor))
+
+
+# Completes object identifiers from the context hash. Everything typed so far is matched against its label index; a
+# completion inserts the identifier and shows the label.
+class LabelCompleter(Completer):
+    def __init__(self, cntxhash, limit=20):
+        self.__cntxhash = cntxhash
+        self.__limit = limit
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+
+        for oid, label in self.__cntxhash.complete(text, self.__limit):
+            yield Completion(str(oid), start_position=-len(text), display=' '.join(label.split()))
@@ -5,35 +5,26 @@
 #
 # This software is intended for personal use and does not imply any guarantees
 # in functionality or performance.
-from fuzzyfinder import fuzzyfinder
-from prompt_toolkit import prompt
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.completion import Completer, Completion
+# Only what every session needs is imported here. The prompt (prompt_toolkit, fuzzyfinder), the importer and the
+# dumper are imported where they are first used, so that scripts and short sessions do not pay for them.
 from scistash.database.sqlitedb import SQLiteHandler
 from scistash.database.memorydb import MemoryDBHandler
 from scistash.entities.author import Author
 from scistash.entities.article import Article
 from scistash.entities.annotation import Annotation
+from scistash.bibtex.cite import formatters
+from scistash.repl.timings import PhaseTimer
+import contextlib
+import functools
 import click
 import uuid
-
-
-class StashCompleter(Completer):
-    def __init__(self):
-        self.__vocabulary = ''
-
-    def setvocab(self, vocabulary):
-        self.__vocabulary = vocabulary
-
-    def get_completions(self, document, complete_event):
-        word_before_cursor = document.get_word_before_cursor(WORD=True)
-        matches = fuzzyfinder(word_before_cursor, self.__vocabulary)
-        for m in matches:
-            yield Completion(m, start_position=-len(word_before_cursor))
+import sys
+import io
 
 
 class ReplHandler:
+    # Command tree. Leaves name commands, each run by the method __dispatch_<name>; 'meta' leaves are handled by
+    # process_input itself. The tree is compiled once into flat tables, see compilelevels.
     levels = {
         'stash': {
             'current': {
@@ -78,8 +69,8 @@ class ReplHandler:
                 'find': {
                     'uuid': 'auth_find_uuid',
                     'year': 'auth_find_year',
-                    'fname': 'auth_find_fname',
-                    'lname': 'auth_find_lname',
+                    'fname': 'auth_find_fname',         # DONE
+                    'lname': 'auth_find_lname',         # DONE
                     'title': 'auth_find_title'
                 },
             },
@@ -89,14 +80,14 @@ class ReplHandler:
                     'fname': 'art_find_fname',
                     'lname': 'art_find_lname',
                     'year': 'art_find_year',
-                    'title': 'art_find_title'
+                    'title': 'art_find_title'           # DONE
                 },
                 'new': 'art_new',
                 'checkout': 'art_checkout',
                 'delete': 'art_delete',
                 'cite': {
-                    'bibtex': 'art_cite_bibtex',
-                    'apa': 'art_cite_apa'
+                    'bibtex': 'art_cite_bibtex',        # DONE
+                    'apa': 'art_cite_apa'               # DONE
                 },
                 'retract': 'art_retract'
             },
@@ -110,7 +101,7 @@ class ReplHandler:
                     'fname': 'annot_find_fname',
                     'lname': 'annot_find_lname',
                     'year': 'annot_find_year',
-                    'title': 'annot_find_title'
+                    'title': 'annot_find_title'         # DONE
                 },
             },
             'sdb': {
@@ -122,14 +113,17 @@ class ReplHandler:
                     'files': 'sdb_list_files',          # DONE
                     'refs': 'sdb_list_refs'             # DONE
                 },
-                'stats': 'sdb_stats',
+                'stats': 'sdb_stats',                   # DONE
+                'snapshot': 'sdb_snapshot',             # DONE
+                'explain': 'sdb_explain',               # DONE
+                'find': 'sdb_find',                     # DONE
                 'dump': {
-                    'csv': 'sdb_dump_csv',
-                    'sql': 'sdb_dump_sql',
-                    'bibtex': 'sdb_dump_bibtex',
-                    'apa': 'sdb_dump_apa'
+                    'csv': 'sdb_dump_csv',              # DONE
+                    'sql': 'sdb_dump_sql',              # DONE
+                    'bibtex': 'sdb_dump_bibtex',        # DONE
+                    'apa': 'sdb_dump_apa'               # DONE
                 },
-                'import': 'sdb_import'
+                'import': 'sdb_import'                  # DONE
             },
             'help': 'meta',
             'clear': 'meta',                        # DONE
@@ -139,24 +133,87 @@ class ReplHandler:
         }
     }
 
-    def __init__(self, db, dryrun=False, create=True, memquota=0):
+    # Script output is collected and written out in blocks of this many characters
+    __outputblock = 1 << 20
+
+    # Compiled levels: full paths of commands to their names, full paths of contexts to the words valid in them, and
+    # the declared commands that have no handler yet
+    __compiled = None
+
+    # Compile levels into paths, which turns parsing into one dictionary lookup per word. The tree is validated on the
+    # way: every leaf must be a command name, no command may be reachable from two paths, and every handler must be
+    # reachable from some path.
+    @classmethod
+    def compilelevels(cls):
+        # Compiled once per class, so that a class redefining levels gets its own tables
+        if cls.__dict__.get('_ReplHandler__compiled') is not None:
+            return cls.__compiled
+
+        routes = {}
+        contexts = {}
+        errors = []
+
+        def walk(level, path):
+            contexts[path] = list(level.keys())
+
+            for word, target in level.items():
+                if type(target) is dict:
+                    walk(target, path + (word,))
+                elif type(target) is not str:
+                    errors.append(f'{" ".join(path + (word,))} is neither a command nor a context')
+                elif target != 'meta':
+                    routes[path + (word,)] = target
+
+        walk(cls.levels, ())
+
+        paths = {}
+
+        for path, cmd in routes.items():
+            paths.setdefault(cmd, []).append(' '.join(path))
+
+        errors += [f'{cmd} is declared more than once ({", ".join(where)})'
+                   for cmd, where in paths.items() if len(where) > 1]
+
+        prefix = '_ReplHandler__dispatch_'
+        handlers = {name[len(prefix):] for name in dir(cls) if name.startswith(prefix)}
+        errors += [f'handler for {cmd} is not reachable from any command' for cmd in sorted(handlers - paths.keys())]
+
+        if errors:
+            raise ValueError('Malformed command tree: ' + '; '.join(errors))
+
+        cls.__compiled = (routes, contexts, sorted(paths.keys() - handlers))
+        return cls.__compiled
+
+    def __init__(self, db, dryrun=False, create=True, memquota=0, labelcap=0, profile='default', timer=None):
+        self.__timer = PhaseTimer() if timer is None else timer
+        self.__timer.mark('import')
         click.echo(click.style('Scientific Reference Stasher', fg='green', bold=True))
         click.echo('Santiago Núñez-Corrales <nunezco2@illinois.edu>\n')
         click.echo('For available commands, enter \'help\' into the REPL.\n')
+        # Command tables, bound to this handler once; a malformed tree stops here, before the stash is opened
+        routes, self.__contexts, unavailable = self.compilelevels()
+        self.__commands = {cmd: getattr(self, f'_ReplHandler__dispatch_{cmd}') for cmd in routes.values()
+                           if cmd not in unavailable}
+        self.__commands.update({cmd: functools.partial(self.__unavailable, cmd) for cmd in unavailable})
+        self.__routes = {path: self.__commands[cmd] for path, cmd in routes.items()}
         # Database handlers
         self.__pending = MemoryDBHandler(memquota)
-        self.__db = SQLiteHandler(db, dryrun, create)
+        self.__db = SQLiteHandler(db, dryrun, create, profile)
         self.__createdb = create
+        self.__timer.mark('connect')
         # Contextual and fetch hashes
-        self.__fetchhash = self.__db.buildfetchhash()
-        self.__cntxhash = self.__db.buildcontexthash()
+        self.__fetchhash = self.__db.lazyfetchhash()
+        self.__cntxhash = self.__db.contexthash(labelcap)
+        self.__timer.mark('hashes')
         # Operation stack handler
         self.__opstack = ['stash']
-        # Prompt handler
-        self.__scomp = StashCompleter()
-        self.__scomp.setvocab(self.levels.get('stash').keys())
+        # Prompt handlers, created by run
+        self.__scomp = None
+        self.__lcomp = None
         self.__currprompt = ''
         self.__current = None
+        self.__interactive = True
+
     @property
     def db(self):
         return self.__db
@@ -178,25 +235,116 @@ class ReplHandler:
         else:
             self.__currprompt = '|'.join(self.__opstack)
 
+    # Words valid in the current context
     def opstacktolevel(self):
-        out = self.levels
+        return self.__contexts[tuple(self.__opstack)]
 
-        for i in self.__opstack:
-            out = out.get(i)
+    # Input asked for by a command. Scripts cannot answer, so there a command missing arguments is aborted.
+    def __ask(self, message, **kwargs):
+        if not self.__interactive:
+            raise click.Abort()
 
-        return out
+        from prompt_toolkit import prompt
+        return prompt(message, **kwargs)
+
+    # Output of a command, paged when interactive. It may be a string or a stream of lines.
+    def __show(self, outcome):
+        if self.__interactive:
+            click.echo_via_pager(outcome)
+        elif isinstance(outcome, str):
+            click.echo(outcome)
+        else:
+            for chunk in outcome:
+                click.echo(chunk, nl=False)
 
     def run(self):
+        from prompt_toolkit import prompt
+        from prompt_toolkit.history import FileHistory
+        from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+        from scistash.repl.completer import StashCompleter, LabelCompleter
+
+        self.__scomp = StashCompleter()
+        self.__lcomp = LabelCompleter(self.__cntxhash)
+
+        # Completion should not wait for every label the first time it is used
+        if self.__cntxhash is not None:
+            self.__cntxhash.prepare()
+
+        history = FileHistory('history.stash')
+
         while True:
             # Set the prompt based on the operation stack
             self.makeprompt()
             self.__scomp.setvocab(self.opstacktolevel())
+
+            if self.__timer.enabled:
+                self.__timer.mark('first prompt')
+                self.__timer.report()
+                self.__timer = PhaseTimer()
+
             user_input = prompt(self.__currprompt + '> ',
-                                history=FileHistory('history.stash'),
+                                history=history,
                                 auto_suggest=AutoSuggestFromHistory(),
                                 completer=self.__scomp)
             self.process_input(user_input.split())
 
+    # Run a script, one command per line (lines starting with # are comments), through the same parsing and dispatch as
+    # the prompt. Nothing is paged or asked for, output is written out in large blocks, and the whole script is a
+    # single transaction: it is committed at the end, or rolled back at the first command that fails or needs input.
+    # Returns whether the script ran to completion.
+    def runscript(self, stream):
+        self.__interactive = False
+        self.__db.defercommits()
+        terminal = sys.stdout
+        stdin = sys.stdin
+        out = io.StringIO()
+        failure = None
+        first = True
+
+        def flush():
+            terminal.write(out.getvalue())
+            terminal.flush()
+            out.seek(0)
+            out.truncate()
+
+        # Confirmations would otherwise consume the script itself when it comes from standard input
+        sys.stdin = io.StringIO()
+
+        try:
+            with contextlib.redirect_stdout(out):
+                for number, line in enumerate(stream, 1):
+                    if line.lstrip().startswith('#'):
+                        continue
+
+                    try:
+                        self.process_input(line.split())
+                    except click.Abort:
+                        failure = (number, line.strip(), 'input required')
+                        break
+                    except Exception as e:
+                        failure = (number, line.strip(), e)
+                        break
+
+                    if first:
+                        self.__timer.mark('first command')
+                        first = False
+
+                    if out.tell() >= self.__outputblock:
+                        flush()
+        finally:
+            sys.stdin = stdin
+            flush()
+
+        if failure is not None:
+            self.__db.rollback()
+            click.echo(click.style('Line {0} ({1}): {2}. Nothing was committed.'.format(*failure), fg='red'))
+
+        self.__timer.mark('script')
+        self.__db.close(commit=failure is None)
+        self.__timer.mark('commit')
+        self.__timer.report()
+        return failure is None
+
     def process_input(self, user_input):
         if not user_input:
             return
@@ -233,117 +381,47 @@ class ReplHandler:
                 find                Search an author
                 save                Save information of the most recently updated author
             """
-            click.echo_via_pager(outtext)
+            self.__show(outtext)
         elif user_input[0] == 'end':
             if len(self.__opstack) is 1:
                 click.echo(click.style('Already at top level.', fg='magenta'))
             else:
                 self.__opstack = self.__opstack[:-1]
         else:
-            # Process each command depending on where the last runnable command stops
-            def recursiveparse(level, cmdlist, context):
-                # Case 1: the list has been exhausted with a non-executable command path
-                if not cmdlist:
-                    return context, 'none', [], level.keys()
-                # Case 2: we have either a keyword that does not exhaust the terms or an unknown term
-                elif len(cmdlist) == 1:
-                    # Check if it is a valid command, i.e. in the current keys of the dictionary
-                    if cmdlist[0] in list(level.keys()):
-                        if type(level.get(cmdlist[0])) is str:
-                            # This is an executable command
-                            return context, level.get(cmdlist[0]), [], level.keys()
-                        else:
-                            # This is a non-executable command
-                            return context + [cmdlist[0]], 'none', [], level.get(cmdlist[0]).keys()
-                    else:
-                        # Not a valid command or parameter
-                        return context, 'none', [], level.keys()
-                # Case 3: we have more elements, in which one is in the non-executable command path and the second is
-                else:
-                    # Check if the first parameter is a command
-                    if not cmdlist[0] in list(level.keys()):
-                        # Not a valid command or parameter
-                        return context, 'none', [], level.keys()
-                    # Check if the first parameter is an executable command
-                    elif type(level.get(cmdlist[0])) is str:
-                        return context, level.get(cmdlist[0]), cmdlist[1:], level.keys()
-                    # Check if the second element is a valid keyword
-                    elif not cmdlist[1] in list(level.get(cmdlist[0]).keys()):
-                        return context, 'none', [], level.keys()
-                    # Check if the second element is an executable command (no children)
-                    elif type(level.get(cmdlist[0]).get(cmdlist[1])) is str:
-                        return context+[cmdlist[0]], level.get(cmdlist[0]).get(cmdlist[1]), cmdlist[2:], \
-                               level.get(cmdlist[0]).keys()
-                    else:
-                        # All other cases
-                        return recursiveparse(level.get(cmdlist[0]), cmdlist[1:], context + [cmdlist[0]])
-
-            ctx, cmd, args, voc = recursiveparse(self.opstacktolevel(), user_input, [])
+            path, handler, args = self.__route(user_input)
 
-            if (not ctx) and (cmd == 'none') and (not args):
+            if path is None:
                 click.echo(click.style('Command not valid in this context.', fg='red'))
+            elif handler is not None:
+                handler(args)
             else:
-                if cmd != 'none':
-                    self.dispatch(cmd, args)
-                else:
-                    self.__opstack += ctx
+                self.__opstack = list(path)
+
+    # Follow the words of an input from the current context. Returns the path reached with the handler and arguments of
+    # the command found there, the path of a context when the words end inside one, or None for unknown words.
+    def __route(self, words):
+        path = tuple(self.__opstack)
 
-    # Implementation of each command
+        for at, word in enumerate(words):
+            path += (word,)
+            handler = self.__routes.get(path)
+
+            if handler is not None:
+                return path, handler, words[at + 1:]
+            elif path not in self.__contexts:
+                return None, None, None
+
+        return path, None, []
+
+    # Run a command by name
     def dispatch(self, cmd, args):
-        ###########################################
-        # Current
-        ###########################################
-        if cmd == 'curr_id':
-            self.__dispatch_curr_id(args)
-        elif cmd == 'curr_fetch':
-            self.__dispatch_curr_fetch(args)
-        elif cmd == 'curr_show':
-            self.__dispatch_curr_show(args)
-        elif cmd == 'curr_save':
-            self.__dispatch_curr_save(args)
-        elif cmd == 'curr_scratch':
-            self.__dispatch_curr_scratch(args)
-        ###########################################
-        # Pending
-        ###########################################
-        elif cmd == 'pend_show':
-            self.__dispatch_pend_show(args)
-        elif cmd == 'pend_scratch':
-            self.__dispatch_pend_scratch(args)
-        elif cmd == 'pend_scratch_all':
-            self.__dispatch_pend_scratch_all(args)
-        elif cmd == 'pend_save':
-            self.__dispatch_pend_save(args)
-        elif cmd == 'pend_chko_auth':
-            self.__dispatch_pend_chko_auth(args)
-        elif cmd == 'pend_chko_art':
-            self.__dispatch_pend_chko_art(args)
-        elif cmd == 'pend_chko_annot':
-            self.__dispatch_pend_chko_annot(args)
-        ###########################################
-        # Authors
-        ###########################################
-        elif cmd == 'auth_new':
-            self.__dispatch_auth_new(args)
-        elif cmd == 'auth_new':
-            self.__dispatch_auth_new(args)
-        ###########################################
-        # SDB
-        ###########################################
-        elif cmd == 'sdb_list_auths':
-            self.__dispatch_sdb_list_auths(args)
-        elif cmd == 'sdb_list_arts':
-            self.__dispatch_sdb_list_arts(args)
-        elif cmd == 'sdb_list_annots':
-            self.__dispatch_sdb_list_annots(args)
-        elif cmd == 'sdb_list_tags':
-            self.__dispatch_sdb_list_tags(args)
-        elif cmd == 'sdb_list_files':
-            self.__dispatch_sdb_list_files(args)
-        elif cmd == 'sdb_list_refs':
-            self.__dispatch_sdb_list_refs(args)
-        else:
-            pass
+        handler = self.__commands.get(cmd)
+
+        if handler is not None:
+            handler(args)
+
+    def __unavailable(self, cmd, args):
+        click.echo(click.style(f'Command {cmd} is not available yet.', fg='magenta'))
 
     ###########################################
     # Current
@@ -357,8 +435,7 @@ class ReplHandler:
 
     def __dispatch_curr_fetch(self, args: list):
         if not args:
-            user_input = prompt('Entity identifier: ',
-                                completer=self.__cntxhash.values())
+            user_input = self.__ask('Entity identifier: ', completer=self.__lcomp)
             args.append(user_input.split()[0])
 
         try:
@@ -494,8 +571,8 @@ class ReplHandler:
                         self.__pending.put(author, self.__fetchhash)
                     # Case 3: create a new author from scratch and add it
                     else:
-                        fname = prompt('First name: ')
-                        lname = prompt('Last name: ')
+                        fname = self.__ask('First name: ')
+                        lname = self.__ask('Last name: ')
                         author = Author(fname, lname, False)
                         self.__pending.put(author, self.__fetchhash)
                     if not self.current.authors.addauthor(author):
@@ -579,6 +656,9 @@ class ReplHandler:
     ###########################################
 
     def __dispatch_pend_show(self, args):
+        if self.__cntxhash is not None:
+            click.echo(click.style(self.__cntxhash.usage(), fg='blue'))
+
         if not args:
             self.__pending.show('all')
         else:
@@ -627,12 +707,74 @@ class ReplHandler:
             self.current = auth
             click.echo(click.style('New author created.', fg='blue'))
         else:
-            fname = prompt('First name: ')
-            lname = prompt('Last name: ')
+            fname = self.__ask('First name: ')
+            lname = self.__ask('Last name: ')
             auth = Author(fname, lname, False)
             self.current = auth
             click.echo(click.style('New author created.', fg='blue'))
 
+    def __findvia(self, args, table, columns, what):
+        if not args:
+            args = self.__ask(f'{what}: ').split()
+
+        outcome = self.__db.find(args, table, columns)
+
+        if outcome is not None:
+            self.__show(outcome)
+
+    def __dispatch_auth_find_fname(self, args):
+        self.__findvia(args, 'authors', ['firstname'], 'First name')
+
+    def __dispatch_auth_find_lname(self, args):
+        self.__findvia(args, 'authors', ['lastname'], 'Last name')
+
+    ###########################################
+    # Articles
+    ###########################################
+
+    def __dispatch_art_find_title(self, args):
+        self.__findvia(args, 'articles', ['title', 'journal'], 'Title')
+
+    # Cite the articles given by id, or the current article if none is given
+    def __citevia(self, args, fmt):
+        if not args and type(self.current) is Article:
+            art = self.current
+            row = (art.id, art.refkey, art.year, art.title, art.journal, art.volume, art.number, art.pages[0],
+                   art.pages[1], art.retracted)
+            click.echo(formatters[fmt](row, tuple((a.firstname, a.lastname) for a in art.authors)))
+            return
+
+        if not args:
+            args = self.__ask('Article identifier(s): ').split()
+
+        try:
+            ids = [uuid.UUID(arg) for arg in args]
+        except ValueError as e:
+            click.echo(click.style('Malformed uuid ({0}).'.format(e), fg='red'))
+            return
+
+        citations = self.__db.cite(ids, fmt)
+
+        if citations is not None:
+            for oid, citation in zip(ids, citations):
+                if citation is None:
+                    click.echo(click.style(f'Article {oid} does not exist.', fg='magenta'))
+
+            self.__show('\n'.join(filter(None, citations)))
+
+    def __dispatch_art_cite_bibtex(self, args):
+        self.__citevia(args, 'bibtex')
+
+    def __dispatch_art_cite_apa(self, args):
+        self.__citevia(args, 'apa')
+
+    ###########################################
+    # Annotations
+    ###########################################
+
+    def __dispatch_annot_find_title(self, args):
+        self.__findvia(args, 'annotations', ['summary', 'info'], 'Title')
+
     ###########################################
     # SDB
     ###########################################
@@ -641,34 +783,166 @@ class ReplHandler:
         outcome = self.__db.list('authors')
 
         if outcome is not None:
-            click.echo_via_pager(outcome)
+            self.__show(outcome)
 
     def __dispatch_sdb_list_arts(self, args):
         outcome = self.__db.list('articles')
 
         if outcome is not None:
-            click.echo_via_pager(outcome)
+            self.__show(outcome)
 
     def __dispatch_sdb_list_annots(self, args):
         outcome = self.__db.list('annotations')
 
         if outcome is not None:
-            click.echo_via_pager(outcome)
+            self.__show(outcome)
 
     def __dispatch_sdb_list_tags(self, args):
         outcome = self.__db.list('tags')
 
         if outcome is not None:
-            click.echo_via_pager(outcome)
+            self.__show(outcome)
 
     def __dispatch_sdb_list_files(self, args):
         outcome = self.__db.list('files')
 
         if outcome is not None:
-            click.echo_via_pager(outcome)
+            self.__show(outcome)
 
     def __dispatch_sdb_list_refs(self, args):
         outcome = self.__db.list('refs')
 
         if outcome is not None:
-            click.echo_via_pager(outcome)
+            self.__show(outcome)
+
+    def __dispatch_sdb_explain(self, args):
+        outcome = self.__db.explain()
+
+        if outcome is not None:
+            self.__show(outcome)
+
+    def __dispatch_sdb_find(self, args):
+        self.__findvia(args, None, None, 'Search')
+
+    # sdb import FILE [FILE ...] [-j WORKERS]; with -j, files are parsed in WORKERS processes (0 for one per core)
+    def __dispatch_sdb_import(self, args):
+        if not args:
+            args = self.__ask('BibTeX file(s): ').split()
+
+        workers = 1
+
+        if '-j' in args:
+            at = args.index('-j')
+
+            try:
+                workers = int(args[at + 1])
+            except (IndexError, ValueError):
+                click.echo(click.style('Option -j requires a number of workers.', fg='red'))
+                return
+
+            args = args[:at] + args[at + 2:]
+
+        if not args:
+            click.echo(click.style('No file to import.', fg='magenta'))
+            return
+
+        from scistash.bibtex.importer import BibTeXImporter
+        importer = BibTeXImporter(self.__db, self.__fetchhash, workers=workers)
+
+        for path in args:
+            stats = importer.run(path)
+
+            if stats is not None:
+                click.echo(click.style('[BibTeX] Imported {0} articles and {1} new authors from {2} entries in {3:.1f} s '
+                                       '({4} duplicate keys skipped, {5} failed).'.format(
+                                           stats['articles'], stats['authors'], stats['entries'], stats['seconds'],
+                                           stats['duplicates'], stats['failed']), fg='green'))
+
+    # sdb dump FORMAT FILE [-z]; with -z, or a file name ending in .gz, the output is gzip-compressed
+    def __dumpvia(self, args, fmt):
+        compress = '-z' in args
+        args = [arg for arg in args if arg != '-z']
+
+        if not args:
+            args = self.__ask('Output file: ').split()
+
+        if not args:
+            click.echo(click.style('No output file given.', fg='magenta'))
+            return
+
+        from scistash.database.dumper import StashDumper
+        count = StashDumper(self.__db).dump(fmt, args[0], compress)
+
+        if count is not None:
+            click.echo(click.style(f'[Dump] Wrote {count} {"statements" if fmt == "sql" else "articles"} to {args[0]}.',
+                                   fg='green'))
+
+    def __dispatch_sdb_dump_csv(self, args):
+        self.__dumpvia(args, 'csv')
+
+    def __dispatch_sdb_dump_sql(self, args):
+        self.__dumpvia(args, 'sql')
+
+    def __dispatch_sdb_dump_bibtex(self, args):
+        self.__dumpvia(args, 'bibtex')
+
+    def __dispatch_sdb_dump_apa(self, args):
+        self.__dumpvia(args, 'apa')
+
+    # sdb stats [TOP] [--snapshot DIR]; with a snapshot, coauthor degrees come from its adjacency
+    def __dispatch_sdb_stats(self, args):
+        directory = None
+
+        if '--snapshot' in args:
+            at = args.index('--snapshot')
+            directory = args[at + 1] if at + 1 < len(args) else None
+            args = args[:at] + args[at + 2:]
+
+            if directory is None:
+                click.echo(click.style('No snapshot directory given.', fg='magenta'))
+                return
+
+        try:
+            top = int(args[0]) if args else 10
+        except ValueError:
+            click.echo(click.style('The number of top authors must be an integer.', fg='red'))
+            return
+
+        try:
+            # NumPy is only needed for analytics
+            from scistash.database.stats import StashStatistics
+            from scistash.database.snapshot import StashSnapshot
+        except ImportError as e:
+            click.echo(click.style(f'Statistics require NumPy ({e}).', fg='red'))
+            return
+
+        snapshot = None
+
+        if directory is not None:
+            snapshot = StashSnapshot.load(directory)
+
+            if snapshot is None:
+                return
+
+        self.__show(StashStatistics(self.__db, top, snapshot).report())
+
+    # sdb snapshot DIR: columnar snapshot of articles and authors for analytics
+    def __dispatch_sdb_snapshot(self, args):
+        if not args:
+            args = self.__ask('Snapshot directory: ').split()
+
+        if not args:
+            click.echo(click.style('No snapshot directory given.', fg='magenta'))
+            return
+
+        try:
+            # NumPy is only needed for analytics
+            from scistash.database.snapshot import StashSnapshot
+        except ImportError as e:
+            click.echo(click.style(f'Snapshots require NumPy ({e}).', fg='red'))
+            return
+
+        snapshot = StashSnapshot.build(self.__db)
+        snapshot.save(args[0])
+        click.echo(click.style(f'[Snapshot] Wrote {snapshot.articles} articles and {snapshot.authors} authors to '
+                               f'{args[0]}.', fg='green'))
@@ -0,0 +1,36 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+import time
+import click
+
+
+# Wall-clock time of consecutive startup phases. Each mark closes the phase running since the previous one (or since
+# the given start); nothing is reported unless enabled.
+class PhaseTimer:
+
+    def __init__(self, enabled=False, started=None):
+        self.__enabled = enabled
+        self.__started = time.perf_counter() if started is None else started
+        self.__last = self.__started
+        self.__phases = []
+
+    @property
+    def enabled(self):
+        return self.__enabled
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.__phases.append((phase, now - self.__last))
+        self.__last = now
+
+    def report(self):
+        if not self.__enabled:
+            return
+
+        phases = ', '.join(f'{phase} {seconds * 1000:.1f} ms' for phase, seconds in self.__phases)
+        click.echo(f'[Timings] {phases}; total {(self.__last - self.__started) * 1000:.1f} ms')
@@ -0,0 +1,78 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.repl.loop import ReplHandler
+from scistash.database.sqlitedb import SQLiteHandler
+import sqlite3
+import time
+import uuid
+import io
+
+BIBTEX = '''
+@article{smith2013,
+  author = {Smith, John and Doe, Jane},
+  title = {On Stashes},
+  journal = {J},
+  year = {2013},
+  volume = {1},
+  pages = {1--10}
+}
+'''
+
+
+def stash(tmp_path):
+    bib = tmp_path / 'refs.bib'
+    bib.write_text(BIBTEX)
+    db = str(tmp_path / 'stash.db')
+    assert ReplHandler(db, False, True).runscript(io.StringIO(f'sdb import {bib}\n'))
+    aid, = [uuid.UUID(oid) for oid, in sqlite3.connect(db).execute('SELECT uuid FROM articles')]
+    return db, aid
+
+
+# Until the label index is ready, completion is served by the search index
+def test_suggest_by_id_and_words(tmp_path):
+    db, aid = stash(tmp_path)
+    handler = SQLiteHandler(db, False, False)
+    assert [oid for oid, _ in handler.suggest(str(aid)[:6])] == [aid]
+    assert [oid for oid, _ in handler.suggest('stash')] == [aid]
+    handler.close()
+
+
+def test_prepared_index_completes(tmp_path):
+    db, aid = stash(tmp_path)
+    handler = SQLiteHandler(db, False, False)
+    cntxhash = handler.contexthash()
+    cntxhash.prepare()
+    deadline = time.monotonic() + 10
+
+    while not cntxhash.ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert cntxhash.ready
+    assert [oid for oid, _ in cntxhash.complete('smith2013')] == [aid]
+    handler.close()
+
+
+# The background build reads from its own connection; under a rollback journal it must not hold back commits
+def test_labels_read_aside_leave_commits_through(tmp_path):
+    # More authors than one fetch returns, so that a plain listing would still be running
+    bib = tmp_path / 'many.bib'
+    entry = '@article{{a{0},\n  author = {{Last{0}, First}},\n  title = {{T{0}}},\n  year = {{2000}}\n}}\n'
+    bib.write_text(''.join(entry.format(i) for i in range(1000)))
+    db = str(tmp_path / 'stash.db')
+    assert ReplHandler(db, False, True).runscript(io.StringIO(f'sdb import {bib}\n'))
+    handler = SQLiteHandler(db, False, False)
+    labels = handler.iterlabels(keys=True, own=True)
+    assert next(labels)
+
+    other = sqlite3.connect(db, timeout=0.5)
+    other.execute('CREATE TABLE scratch (x)')
+    other.commit()
+    other.close()
+
+    labels.close()
+    handler.close()
@@ -0,0 +1,61 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.repl.loop import ReplHandler
+from scistash.database.sqlitedb import SQLiteHandler
+from scistash.database.dumper import StashDumper
+from scistash.entities.rfile import RefFile
+from scistash.entities.tag import Tag
+from pathlib import Path
+import sqlite3
+import uuid
+import io
+
+BIBTEX = '''
+@article{smith2013,
+  author = {Smith, John and Doe, Jane},
+  title = {On Stashes},
+  journal = {Journal of Stashing},
+  year = {2013},
+  volume = {1},
+  pages = {1--10}
+}
+'''
+
+
+def rows(db):
+    conn = sqlite3.connect(db)
+    tables = [name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+              if not name.startswith('search')]
+    found = {table: sorted(conn.execute(f'SELECT * FROM {table}')) for table in tables}
+    found['search'] = sorted(conn.execute('SELECT uuid, kind FROM search WHERE search MATCH ?', ('stash*',)))
+    found['version'] = conn.execute('PRAGMA user_version').fetchall()
+    conn.close()
+    return found
+
+
+# A dump restores into an empty database as it is, search index included
+def test_sql_dump_restores(tmp_path):
+    bib = tmp_path / 'refs.bib'
+    bib.write_text(BIBTEX)
+    db = str(tmp_path / 'stash.db')
+    assert ReplHandler(db, False, True).runscript(io.StringIO(f'sdb import {bib}\n'))
+
+    handler = SQLiteHandler(db, False, False)
+    fhash = handler.lazyfetchhash()
+    aid, = [uuid.UUID(oid) for oid, in sqlite3.connect(db).execute('SELECT uuid FROM articles')]
+    handler.save(Tag(aid, 'article', 'stashing', False), fhash)
+    handler.save(RefFile(aid, 'article', Path('notes.txt'), 'txt', 'Notes', 5, b'hello', False), fhash)
+    assert StashDumper(handler).dump('sql', tmp_path / 'stash.sql') > 0
+    handler.close()
+
+    restored = sqlite3.connect(tmp_path / 'restored.db')
+    restored.executescript((tmp_path / 'stash.sql').read_text())
+    restored.close()
+    original = rows(db)
+    assert len(original['search']) == 2 and original['blobs']
+    assert rows(tmp_path / 'restored.db') == original
@@ -0,0 +1,35 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.repl.loop import ReplHandler
+from scistash.database.sqlitedb import SQLiteHandler
+import sqlite3
+import io
+
+BIBTEX = '''
+@article{smith2013,
+  author = {Smith, John and Doe, Jane and Zhou, Wei and Abel, Ann},
+  title = {On Stashes},
+  journal = {J},
+  year = {2013},
+  volume = {1},
+  pages = {1--10}
+}
+'''
+
+
+# Article labels name the authors in the order they were given
+def test_article_label_keeps_author_order(tmp_path):
+    bib = tmp_path / 'refs.bib'
+    bib.write_text(BIBTEX)
+    db = str(tmp_path / 'stash.db')
+    assert ReplHandler(db, False, True).runscript(io.StringIO(f'sdb import {bib}\n'))
+
+    aid, = [oid for oid, in sqlite3.connect(db).execute('SELECT uuid FROM articles')]
+    handler = SQLiteHandler(db, False, False)
+    assert 'Smith ,Doe ,Zhou ,Abel.' in handler.renderlabel(aid, 'articles')
+    handler.close()
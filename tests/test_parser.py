@@ -0,0 +1,34 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.bibtex.parser import iterchunks, iterentries, parseentries
+import io
+
+BIBTEX = b'''% header
+@article(a1,
+  title = "Half {open",
+  year = 2001
+)
+@article{a2, title = {Ok}} @misc{a3, title = {Same line}}
+@article{a4,
+  note = "a } b"
+}
+'''
+
+
+# Entries end at the delimiter they opened with, braces inside quoted values aside
+def test_entries_bounded_by_their_delimiters():
+    pieces = list(iterentries(io.BytesIO(BIBTEX)))
+    assert sum(consumed for _, consumed in pieces) == len(BIBTEX)
+    assert [[key for _, key, _ in parseentries(text)] for text, _ in pieces if text] == [['a1'], ['a2', 'a3'], ['a4']]
+
+
+# A macro defined after another entry on the same line still applies to the chunks that follow
+def test_macros_defined_anywhere_in_a_piece():
+    bib = b'@misc{m1, title = {A}} @string{jp = "J. Phys."}\n' + b'@article{a1, journal = jp}\n' * 2
+    chunks = list(iterchunks(io.BytesIO(bib), chunksize=1))
+    assert [macros for _, macros, _ in chunks] == [{}, {'jp': 'J. Phys.'}, {'jp': 'J. Phys.'}]
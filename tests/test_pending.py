@@ -0,0 +1,26 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.database.sqlitedb import SQLiteHandler
+from scistash.database.memorydb import MemoryDBHandler
+from scistash.entities.author import Author
+import pytest
+
+
+# Pending objects are saved the same way whether the fetch hash is resolved lazily or built eagerly as a plain dict
+@pytest.mark.parametrize('eager', [False, True])
+def test_put_and_save(tmp_path, eager):
+    db = SQLiteHandler(str(tmp_path / 'stash.db'), False, True)
+    fhash = db.buildfetchhash() if eager else db.lazyfetchhash()
+    pending = MemoryDBHandler()
+    author = Author('Ada', 'Lovelace', False)
+    pending.put(author, fhash)
+    assert fhash[author.id] is Author and not db.exists(author)
+
+    pending.save('all', db, fhash)
+    assert fhash[author.id] is Author and db.exists(author) and pending.testMemEmpty()
+    db.close()
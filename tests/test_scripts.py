@@ -0,0 +1,46 @@
+# Copyright @ 2019
+#
+# Santiago Nunez-Corrales <snunezcr@gmail.com>
+# A Scientific Reference Stasher (SciStash)
+#
+# This software is intended for personal use and does not imply any guarantees
+# in functionality or performance.
+from scistash.repl.loop import ReplHandler
+import sqlite3
+import io
+
+BIBTEX = '''
+@article{smith2013,
+  author = {Smith, John and Doe, Jane},
+  title = {On Stashes},
+  journal = {J},
+  year = {2013},
+  volume = {1},
+  pages = {1--10}
+}
+'''
+
+
+def run(tmp_path, script):
+    bib = tmp_path / 'refs.bib'
+    bib.write_text(BIBTEX)
+    db = tmp_path / 'stash.db'
+    succeeded = ReplHandler(str(db), False, not db.exists()).runscript(io.StringIO(script.format(bib=bib)))
+    conn = sqlite3.connect(db)
+    counts = [conn.execute(f'SELECT count(*) FROM {t}').fetchone()[0] for t in ['articles', 'authors']]
+    conn.close()
+    return succeeded, counts
+
+
+def test_script_commits(tmp_path):
+    assert run(tmp_path, 'sdb import {bib}\n') == (True, [1, 2])
+
+
+# A command needing input fails the script after the import was saved; the import must not survive it
+def test_failed_script_commits_nothing(tmp_path):
+    assert run(tmp_path, 'sdb import {bib}\nauthors new\n') == (False, [0, 0])
+
+
+def test_failed_script_keeps_earlier_commits(tmp_path):
+    run(tmp_path, 'sdb import {bib}\n')
+    assert run(tmp_path, 'sdb import {bib}\nauthors new\n') == (False, [1, 2])